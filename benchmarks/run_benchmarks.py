@@ -0,0 +1,183 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from time import perf_counter
+
+import numpy as np
+
+from benchmarks.synthetic import CAMPUS_SIZE, synthetic_campus, synthetic_rosters
+from src.advanced_models import BoundedConfidenceElectionModel
+from src.loader import load_campus
+from src.model import ElectionModel
+from src.monte_carlo import run_monte_carlo
+from src.topology import CampusTopology
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SIZES = [1000, 5000, 20000, 100000]
+# Graph-backed stages are skipped above these sizes and recorded with the reason
+MAX_GRAPH_EDGES = 3_000_000
+AGENT_MAX_SIZE = 5000
+MODELS = {'ElectionModel': ElectionModel, 'BoundedConfidenceElectionModel': BoundedConfidenceElectionModel}
+
+def git_commit():
+    """Short hash of HEAD, or 'unknown' outside a git checkout."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def timed(fn, *args, **kwargs):
+    """Calls fn with stdout silenced and returns (result, seconds)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = perf_counter()
+        result = fn(*args, **kwargs)
+        return result, perf_counter() - start
+
+class SizeBenchmark:
+    """Times every stage of the pipeline on one synthetic population size."""
+    def __init__(self, size, args, workdir):
+        self.size = size
+        self.args = args
+        self.workdir = workdir
+        self.stages = {}
+        self.skipped = {}
+
+    def record(self, stage, seconds, **extra):
+        self.stages[stage] = dict(seconds=seconds, **extra)
+
+    def skip(self, stage, reason):
+        self.skipped[stage] = reason
+
+    def run(self):
+        args = self.args
+        (students, edges), seconds = timed(synthetic_campus, self.size, seed=args.seed, campus_size=args.campus_size)
+        self.record('generate', seconds, edges=len(edges))
+        students_path = os.path.join(self.workdir, 'students.csv')
+        edges_path = os.path.join(self.workdir, 'edges.parquet')
+        students.to_csv(students_path, index=False)
+        edges.to_parquet(edges_path, index=False)
+        del edges
+
+        cache_dir = os.path.join(self.workdir, '.cache')
+        campus, seconds = timed(load_campus, students_path, edges_path, cache_dir=cache_dir)
+        self.record('load_campus_cold', seconds)
+        campus, seconds = timed(load_campus, students_path, edges_path, cache_dir=cache_dir)
+        self.record('load_campus_warm', seconds)
+        self.num_edges = int(campus.indices.size // 2)
+
+        if self.num_edges > args.max_graph_edges:
+            reason = f"{self.num_edges} edges exceeds --max-graph-edges {args.max_graph_edges}"
+            for stage in ['to_graph', 'topology', 'model_init', 'release_manifestos', 'step', 'monte_carlo']:
+                self.skip(stage, reason)
+            return self.result()
+
+        graph, seconds = timed(campus.to_graph)
+        self.record('to_graph', seconds)
+        del graph
+        topology, seconds = timed(CampusTopology, campus, rosters=synthetic_rosters(students, seed=args.seed))
+        self.record('topology', seconds)
+        del campus
+
+        for engine in ('agent', 'vectorized'):
+            if engine == 'agent' and self.size > args.agent_max_size:
+                self.skip('agent', f"size exceeds --agent-max-size {args.agent_max_size}")
+                continue
+            for name, model_class in MODELS.items():
+                self.bench_model(topology, name, model_class, engine)
+
+        if args.replicas:
+            engine = 'agent' if self.size <= args.agent_max_size else 'vectorized'
+            _, seconds = timed(run_monte_carlo, topology, num_runs=args.replicas, num_steps=args.steps,
+                               slander_step=min(2, args.steps - 1), slander_targets=10, seed=args.seed,
+                               processes=args.processes, engine=engine, progress=False)
+            self.record('monte_carlo', seconds, engine=engine, replicas=args.replicas, steps=args.steps)
+        return self.result()
+
+    def bench_model(self, topology, name, model_class, engine):
+        key = f"{name}[{engine}]"
+        model, seconds = timed(model_class, topology, engine=engine, seed=self.args.seed)
+        self.record(f'{key}.init', seconds)
+        _, seconds = timed(model.release_manifestos)
+        self.record(f'{key}.release_manifestos', seconds)
+        step_times = []
+        for i in range(self.args.steps):
+            if i == min(2, self.args.steps - 1):
+                model.slander_drop("m1", [agent.node_id for agent in model.agents[:10]])
+            _, seconds = timed(model.step)
+            step_times.append(seconds)
+        self.record(f'{key}.step', float(np.mean(step_times)), steps=len(step_times),
+                    min=float(np.min(step_times)), max=float(np.max(step_times)))
+
+    def result(self):
+        return {'size': self.size, 'edges': getattr(self, 'num_edges', None),
+                'stages': self.stages, 'skipped': self.skipped}
+
+def run(args):
+    """Runs every requested size and returns the machine-readable report."""
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'platform': {'python': platform.python_version(), 'machine': platform.machine(),
+                     'system': platform.platform(), 'cpus': os.cpu_count()},
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': [],
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} students...")
+        with tempfile.TemporaryDirectory() as workdir:
+            result = SizeBenchmark(size, args, workdir).run()
+        for stage, stats in result['stages'].items():
+            print(f"  {stage:<60} {stats['seconds']:10.4f}s")
+        for stage, reason in result['skipped'].items():
+            print(f"  {stage:<60} skipped ({reason})")
+        report['results'].append(result)
+    return report
+
+def compare(old_path, new_path):
+    """Prints the per-stage speedup of ``new_path`` over ``old_path``."""
+    with open(old_path) as f:
+        old = {r['size']: r['stages'] for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = {r['size']: r['stages'] for r in json.load(f)['results']}
+    for size in sorted(set(old) & set(new)):
+        print(f"{size} students")
+        for stage in sorted(set(old[size]) & set(new[size])):
+            before, after = old[size][stage]['seconds'], new[size][stage]['seconds']
+            print(f"  {stage:<60} {before:10.4f}s -> {after:10.4f}s  x{before / after if after else float('inf'):.2f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the simulation pipeline on synthetic campus graphs.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--steps', type=int, default=5)
+    parser.add_argument('--replicas', type=int, default=4, help="Monte Carlo replicas per scenario; 0 skips the stage")
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--campus-size', type=int, default=CAMPUS_SIZE)
+    parser.add_argument('--agent-max-size', type=int, default=AGENT_MAX_SIZE)
+    parser.add_argument('--max-graph-edges', type=int, default=MAX_GRAPH_EDGES)
+    parser.add_argument('--output', help="Defaults to benchmarks/results/<commit>.json")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Compares two result files and exits")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = run(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
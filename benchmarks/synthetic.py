@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from src.process_hostel_data import build_students
+from src.regenerate_edges import generate_edges
+
+# Hostel and department codes seen in data/students.csv, with their relative sizes
+HOSTELS = {'MR': 819, 'SR': 400, 'SK': 390, 'RM': 388, 'GN': 379, 'KR': 377, 'VY': 373, 'BD': 356,
+           'BG': 267, 'VK': 258, 'AK': 249, 'RP': 246, 'CVR': 187, 'ML': 130, 'MSA': 120, 'RHB': 69}
+DEPTS = {'A7': 733, 'PH': 637, 'H1': 532, 'A4': 332, 'B3': 330, 'A3': 322, 'B4': 302, 'B5': 298,
+         'B2': 269, 'B1': 266, 'AA': 237, 'A1': 191, 'A2': 181, 'A8': 177, 'A5': 147, 'AB': 90}
+BATCHES = {2025: 1498, 2024: 1521, 2023: 1145, 2022: 780, 2021: 167}
+# Populations are split into campuses of this size; the club and academic layers
+# are dense within a campus, so this keeps the edge count linear in the population
+CAMPUS_SIZE = 1000
+
+def _draw(rng, weights, size):
+    keys = list(weights)
+    p = np.array(list(weights.values()), dtype=float)
+    return np.asarray(keys, dtype=object)[rng.choice(len(keys), size=size, p=p / p.sum())]
+
+def synthetic_hostel_data(num_students, seed=0, campus_size=CAMPUS_SIZE):
+    """Raw hostel data ('BITS ID', 'HOSTEL CODE', 'campus') shaped like the real export."""
+    rng = np.random.default_rng(seed)
+    campus = np.arange(num_students) // campus_size
+    batch = _draw(rng, BATCHES, num_students)
+    dept = _draw(rng, DEPTS, num_students)
+    serial = np.arange(num_students) % campus_size
+    ids = [f"{b}{d}PS{s:04d}C{c}" for b, d, s, c in zip(batch, dept, serial, campus)]
+    return pd.DataFrame({'BITS ID': ids, 'HOSTEL CODE': _draw(rng, HOSTELS, num_students), 'campus': campus})
+
+def synthetic_campus(num_students, seed=0, campus_size=CAMPUS_SIZE):
+    """Builds a synthetic students table and its edge layers with the repo's own generators."""
+    hostel_data = synthetic_hostel_data(num_students, seed=seed, campus_size=campus_size)
+    students = build_students(hostel_data, seed=seed)
+    students['campus'] = hostel_data['campus'].to_numpy()
+    edges = generate_edges(students, seed=seed)
+    return students, edges
+
+def synthetic_rosters(students, seed=0):
+    """Junior-senior, SSMS, mess rep and AMC rosters drawn from the synthetic population.
+
+    Every first-year student gets a senior from their department, and roughly one
+    student in a hundred holds a mess or AMC post, so the roster layers scale with
+    the population as they would on a real campus.
+    """
+    rng = np.random.default_rng(seed)
+    ids = students['id'].to_numpy()
+    juniors = np.flatnonzero(students['batch'].to_numpy() == students['batch'].max())
+    seniors = np.flatnonzero(students['batch'].to_numpy() < students['batch'].max())
+    junior_senior_df = pd.DataFrame(columns=['junior_id', 'senior_id'])
+    if len(juniors) and len(seniors):
+        junior_senior_df = pd.DataFrame({'junior_id': ids[juniors], 'senior_id': ids[rng.choice(seniors, size=len(juniors))]})
+    officers = rng.permutation(len(ids))
+    num_reps, num_amc = max(1, len(ids) // 100), max(1, len(ids) // 500)
+    mess_reps_df = pd.DataFrame({'student_id': ids[officers[:num_reps]]})
+    amc_members_df = pd.DataFrame({'student_id': ids[officers[num_reps:num_reps + num_amc]], 'post': 'Member'})
+    ssms_election_results_df = pd.DataFrame({'student_id': ids[officers[:num_amc]], 'post': 'Mess Secretary'})
+    return junior_senior_df, ssms_election_results_df, mess_reps_df, amc_members_df
@@ -1,30 +1,77 @@
+from dataclasses import replace
 
+from src.agent_store import OWN_NEXT
 from src.model import ElectionModel
+from src.engine import VectorizedOpinionEngine, INFLUENCE_FACTOR
+from src.parameters import ModelParameters
+from src.propagation import gather_rows
 import numpy as np
 
+def bounded_confidence_update(indptr, indices, opinions, confidence_threshold, influence_factor=INFLUENCE_FACTOR, rows=None):
+    """Bounded-confidence step over a CSR neighbor structure, for every candidate at once.
+
+    Each agent moves towards the unweighted mean of the neighbors whose opinion is
+    within ``confidence_threshold`` of its own; candidates with no such neighbor are
+    left unchanged. With ``rows`` only those agents' next opinions are returned.
+    """
+    if rows is None:
+        rows, neighbors, own_opinions = np.arange(len(indptr) - 1), indices, opinions
+    else:
+        neighbors, own_opinions = gather_rows(indptr, indices, rows)[1], opinions[rows]
+    num_agents = len(rows)
+    owner = np.repeat(np.arange(num_agents), np.diff(indptr)[rows])
+    next_opinions = own_opinions.copy()
+    for k in range(opinions.shape[1]):
+        own, neighbor = own_opinions[owner, k], opinions[neighbors, k]
+        within = np.abs(own - neighbor) < confidence_threshold
+        count = np.bincount(owner, weights=within, minlength=num_agents)
+        total = np.bincount(owner, weights=np.where(within, neighbor, 0.0), minlength=num_agents)
+        influenced = count > 0
+        next_opinions[influenced, k] = ((1 - influence_factor) * own_opinions[influenced, k]
+                                        + influence_factor * total[influenced] / count[influenced])
+    return next_opinions
+
+class BoundedConfidenceEngine(VectorizedOpinionEngine):
+    """Vectorized engine applying the bounded-confidence update rule."""
+    def load_network(self):
+        super().load_network()
+        self.indptr, self.indices = self.influence.indptr, self.influence.indices
+
+    def next_opinions(self, opinions, slander, influence_factor=None, rows=None):
+        factor = self.influence_factor if influence_factor is None else influence_factor
+        return bounded_confidence_update(self.indptr, self.indices, opinions, self.model.confidence_threshold, factor, rows)
+
 class BoundedConfidenceElectionModel(ElectionModel):
-    def __init__(self, graph, confidence_threshold=0.2, **kwargs):
-        super().__init__(graph, **kwargs)
-        self.confidence_threshold = confidence_threshold
+    engine_class = BoundedConfidenceEngine
+
+    def __init__(self, graph, confidence_threshold=None, parameters=None, **kwargs):
+        parameters = parameters if parameters is not None else ModelParameters()
+        if confidence_threshold is not None:
+            parameters = replace(parameters, confidence_threshold=confidence_threshold)
+        super().__init__(graph, parameters=parameters, **kwargs)
+
+    @property
+    def confidence_threshold(self):
+        return self.parameters.confidence_threshold
 
     def calculate_next_opinion(self, agent):
-        agent.next_opinion = {post: op.copy() for post, op in agent.opinion.items()}
-        neighbor_nodes = list(self.grid.neighbors(agent.node_id))
-        if not neighbor_nodes:
-            return
+        # Opinions are read once per agent as a list of scores in self.candidates order
+        store, influence_factor = self.store, self.parameters.influence_factor
+        own = store.opinions[agent.row].tolist()
+        next_opinion = list(own)
+        influence = self.influence
+        neighbors = store.opinions[influence.indices[influence.indptr[agent.row]:influence.indptr[agent.row + 1]]].tolist()
 
-        for post, candidates in self.candidates_by_post.items():
-            for cand in candidates:
+        for columns in store.posts.values():
+            for k in columns.values():
                 # Find neighbors within the confidence threshold
-                influential_neighbors = []
-                for neighbor_node_id in neighbor_nodes:
-                    neighbor_agent = self.grid.nodes[neighbor_node_id]['agent']
-                    if abs(agent.opinion[post][cand.id] - neighbor_agent.opinion[post][cand.id]) < self.confidence_threshold:
-                        influential_neighbors.append(neighbor_agent)
+                influential_neighbors = [n for n in neighbors if abs(own[k] - n[k]) < self.confidence_threshold]
 
                 if not influential_neighbors:
                     continue
 
                 # Update opinion based on the average opinion of influential neighbors
-                avg_opinion = np.mean([n.opinion[post][cand.id] for n in influential_neighbors])
-                agent.next_opinion[post][cand.id] = (1 - 0.1) * agent.opinion[post][cand.id] + 0.1 * avg_opinion
+                avg_opinion = np.mean([n[k] for n in influential_neighbors])
+                next_opinion[k] = (1 - influence_factor) * own[k] + influence_factor * avg_opinion
+        store.next_opinions[agent.row] = next_opinion
+        store.next_state[agent.row] = OWN_NEXT
@@ -0,0 +1,184 @@
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from src.propagation import SUSCEPTIBLE
+
+# What an agent's next_opinion holds: nothing yet, its own row of next_opinions, or
+# its live opinion (after the first advance the agent engine aliases the two)
+NO_NEXT = 0
+OWN_NEXT = 1
+ALIASED = 2
+
+FOOTPRINT_COLUMNS = ['component', 'field', 'bytes', 'bytes_per_agent']
+
+def array_bytes(value):
+    """Bytes held by an ndarray or scipy sparse matrix, 0 for anything else."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, 'indptr'):
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    return 0
+
+class StoreField:
+    """StudentAgent attribute backed by the agent's element of one AgentStore array."""
+    def __init__(self, field, cast=float):
+        self.field = field
+        self.cast = cast
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        return self.cast(getattr(agent.store, self.field)[agent.row])
+
+    def __set__(self, agent, value):
+        getattr(agent.store, self.field)[agent.row] = value
+
+class PostView(Mapping):
+    """Dict-like view of one agent's opinions of the candidates for one post."""
+    __slots__ = ('store', 'name', 'row', 'columns')
+
+    def __init__(self, store, name, row, columns):
+        self.store = store
+        self.name = name
+        self.row = row
+        self.columns = columns
+
+    def __getitem__(self, cand_id):
+        return float(getattr(self.store, self.name)[self.row, self.columns[cand_id]])
+
+    def __setitem__(self, cand_id, score):
+        getattr(self.store, self.name)[self.row, self.columns[cand_id]] = score
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def copy(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+class OpinionView(Mapping):
+    """Dict-like view of one agent's ``{post: {candidate id: score}}`` opinions.
+
+    Reads and writes go straight to row ``row`` of the store's ``name`` array; the
+    view is empty until the agent's opinions are released.
+    """
+    __slots__ = ('store', 'name', 'row')
+
+    def __init__(self, store, name, row):
+        self.store = store
+        self.name = name
+        self.row = row
+
+    def __getitem__(self, post):
+        return PostView(self.store, self.name, self.row, self.store.posts[post])
+
+    def __setitem__(self, post, scores):
+        array = getattr(self.store, self.name)
+        for cand_id, k in self.store.posts[post].items():
+            array[self.row, k] = scores[cand_id] if cand_id in scores else np.nan
+        self.store.released[self.row] = True
+
+    def __contains__(self, post):
+        return bool(self.store.released[self.row]) and post in self.store.posts
+
+    def __iter__(self):
+        return iter(self.store.posts if self.store.released[self.row] else ())
+
+    def __len__(self):
+        return len(self.store.posts) if self.store.released[self.row] else 0
+
+    def copy(self):
+        return {post: self[post].copy() for post in self}
+
+    def __repr__(self):
+        return repr(self.copy())
+
+class AgentStore:
+    """Per-agent state of an ElectionModel as typed arrays in topology order.
+
+    StudentAgent is a view over one row of these arrays, so a model holds its
+    state in a few contiguous buffers instead of a dict per agent. Opinion columns
+    follow ``model.candidates``, with NaN until the manifestos are released;
+    misinformation states use the MisinformationKernel codes and ``infected_by``
+    indexes ``model.misinformation`` (-1 for none). ``deal`` is the id of the
+    agent's deal in the model's DealMarket ledger (-1 for none).
+    """
+    def __init__(self, model):
+        topology = model.topology
+        n, c = len(topology), len(model.candidates)
+        self.num_agents = n
+        self.posts = {post: {cand.id: model.candidates.index(cand) for cand in candidates}
+                      for post, candidates in model.candidates_by_post.items()}
+
+        self.baseline_turnout = np.array(topology.baseline_turnout_propensity, dtype=np.float64)
+        self.slander_susceptibility = np.array(topology.slander_susceptibility, dtype=np.float64)
+        self.skepticism = np.array(topology.skepticism, dtype=np.float64)
+        self.is_ssms_winner = np.array(topology.is_ssms_winner, dtype=bool)
+        self.is_mess_rep = np.array(topology.is_mess_rep, dtype=bool)
+        self.is_amc_member = np.array(topology.is_amc_member, dtype=bool)
+        self.power_broker_score = np.zeros(n)
+
+        self.released = np.zeros(n, dtype=bool)
+        self.opinions = np.full((n, c), np.nan)
+        self.next_opinions = np.full((n, c), np.nan)
+        self.next_state = np.full(n, NO_NEXT, dtype=np.int8)
+        self.turnout = self.baseline_turnout.copy()
+        self.next_turnout = np.full(n, np.nan)
+
+        self.state = np.full(n, SUSCEPTIBLE, dtype=np.int8)
+        self.infected_by = np.full(n, -1, dtype=np.int16)
+        self.deal = np.full(n, -1, dtype=np.int64)
+
+    def arrays(self):
+        """Every per-agent array by field name."""
+        return {name: value for name, value in vars(self).items() if isinstance(value, np.ndarray)}
+
+    def write_opinions(self, name, row, opinions):
+        """Overwrites row ``row`` of array ``name`` with a ``{post: {candidate id: score}}`` mapping."""
+        array = getattr(self, name)
+        array[row] = np.nan
+        for post, scores in opinions.items():
+            columns = self.posts[post]
+            for cand_id, score in scores.items():
+                array[row, columns[cand_id]] = score
+
+    def footprint(self):
+        """Bytes held per field, as a Series."""
+        return pd.Series({name: value.nbytes for name, value in self.arrays().items()}, name='bytes')
+
+def memory_footprint(model):
+    """Bytes owned by one ElectionModel, per component and field.
+
+    The topology and its cached CSR matrices are shared across models and left out.
+    """
+    store = model.store
+    n = max(store.num_agents, 1)
+    rows = [('store', name, int(nbytes)) for name, nbytes in store.footprint().items()]
+    rows.append(('agents', 'objects', sum(sys.getsizeof(agent) + sys.getsizeof(vars(agent)) for agent in model.agents)))
+
+    shared = {id(value) for value in store.arrays().values()}
+    topology = model.topology
+    for matrix in list(topology._influence_cache.values()) + list(topology.multiplex._cache.values()):
+        shared.update((id(matrix), id(matrix.indptr), id(matrix.indices)))
+    owners = {'engine': model.engine, 'propagation': model.propagation, 'market': model.market, 'ledger': model.market.ledger}
+    for component, owner in owners.items():
+        if owner is None:
+            continue
+        for name, value in vars(owner).items():
+            nbytes = array_bytes(value)
+            if nbytes and id(value) not in shared:
+                rows.append((component, name, nbytes))
+    collector = model.datacollector
+    rows.append(('collector', 'buffer', array_bytes(collector.data) + array_bytes(collector.steps)))
+
+    frame = pd.DataFrame(rows, columns=FOOTPRINT_COLUMNS[:3])
+    frame['bytes_per_agent'] = frame['bytes'] / n
+    return frame
@@ -0,0 +1,281 @@
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.deals import BROKER_THRESHOLD, DEAL_BOOST, offer_round
+from src.engine import SLANDER_TARGET, VectorizedOpinionEngine
+from src.model import ElectionModel
+from src.monte_carlo import replica_seeds
+from src.propagation import EXPOSED, FACT_CHECKER, INFECTED, REBUTTAL_FACTOR, SLANDER_PENALTY, SUSCEPTIBLE, ordered_sweep
+from src.rng import RandomStreams
+from src.topology import CampusTopology
+
+def _per_replica(value, num_replicas, dtype):
+    return np.broadcast_to(np.asarray(value, dtype=dtype), (num_replicas,)).copy()
+
+@dataclass
+class BatchResult:
+    """Per-replica outputs of a BatchSimulation run."""
+    infected: np.ndarray
+    opinions: np.ndarray
+    turnout: np.ndarray
+    states: np.ndarray
+    candidate_ids: list
+    parameters: pd.DataFrame
+
+    def mean_opinions(self):
+        """(replicas x candidates) mean opinion over agents."""
+        return pd.DataFrame(self.opinions.mean(axis=1), columns=self.candidate_ids)
+
+class BatchSimulation:
+    """Advances R replicas of ElectionModel at once as (replicas x agents x candidates) arrays.
+
+    Replica r follows ``ElectionModel(engine="vectorized", propagation="staged")``
+    (or ``"synchronous"``) seeded with ``seeds[r]`` draw for draw: every replica
+    keeps its own RandomStreams and makes the same draws in the same order. Staged
+    propagation is the agent engine's, so replicas also match the default
+    ``propagation="agent"``. Agent and replica are flattened into one index
+    ``r * N + i`` for the misinformation state; staged misinformation is swept
+    replica by replica, while synchronous misinformation and the opinion update
+    are single array passes over all replicas.
+
+    ``rebuttal_enabled``, ``influence_factor``, ``slander_targets`` (a count of
+    leading agents, as in run_scenario, or a list of row arrays) and
+    ``slander_step`` (None for no drop) take a scalar or one value per replica.
+    ``parameters`` (ModelParameters) applies to every replica; ``influence_factor``
+    defaults to its value. ``layers`` and ``combiner`` pick the edge layer
+    configuration every replica runs on, as in ElectionModel.set_layers.
+    """
+    def __init__(self, graph, seeds, rebuttal_enabled=False, influence_factor=None,
+                 slander_targets=0, slander_step=None, synchronous=False, model_class=ElectionModel, parameters=None,
+                 layers=None, combiner="last"):
+        self.topology = graph if isinstance(graph, CampusTopology) else CampusTopology(graph)
+        self.template = model_class(self.topology, engine="vectorized", propagation="synchronous" if synchronous else "staged",
+                                    parameters=parameters, layers=layers, combiner=combiner)
+        engine = self.template.engine
+        self.synchronous = synchronous
+        self.seeds = list(seeds)
+        R, N = len(self.seeds), len(self.topology)
+        self.num_replicas, self.num_agents = R, N
+        self.candidate_ids = engine.candidate_ids
+        self.num_candidates = len(self.candidate_ids)
+
+        self.rebuttal_enabled = _per_replica(rebuttal_enabled, R, bool)
+        self.influence_factor = _per_replica(engine.influence_factor if influence_factor is None else influence_factor, R, np.float64)
+        self.slander_step = _per_replica(-1 if slander_step is None else slander_step, R, np.int64)
+        if np.isscalar(slander_targets) or all(np.isscalar(rows) for rows in slander_targets):
+            counts = _per_replica(slander_targets, R, np.int64)
+            self.slander_targets = [np.arange(min(k, N)) for k in counts]
+        else:
+            self.slander_targets = [np.asarray(rows, dtype=np.int64) for rows in slander_targets]
+
+        # Static per-agent arrays shared by every replica
+        self.influence = engine.influence
+        self.indptr, self.indices = self.influence.indptr, self.influence.indices
+        self.total_weight = engine.total_weight
+        self.has_neighbors = engine.has_neighbors
+        self.turnout_boost = engine.turnout_boost
+        self.baseline_turnout = engine.baseline_turnout
+        self.skepticism = np.tile(self.template.propagation.skepticism, R)
+        self.susceptibility = np.tile(self.template.propagation.susceptibility, R)
+        self.plausibility = self.template.propagation.plausibility
+        self.severity = self.template.propagation.severity
+        self.linear = type(engine) is VectorizedOpinionEngine
+
+        self.streams = [RandomStreams(seed) for seed in self.seeds]
+        self.power_broker_score = np.stack([streams['agents'].random(N) for streams in self.streams])
+        self.has_deal = np.zeros((R, N), dtype=bool)
+        scores = self.template.manifesto_scores(self.template.candidates)
+        self.opinions = np.broadcast_to(scores, (R, N, self.num_candidates)).copy()
+        self.turnout = np.broadcast_to(self.baseline_turnout, (R, N)).copy()
+        self.state = np.zeros(R * N, dtype=np.int8)
+        self.infected_by = np.full(R * N, -1, dtype=np.int16)
+        self.active = np.empty(0, dtype=np.int64)
+        self.penalty = np.zeros(R * N)
+        self.penalized = np.empty(0, dtype=np.int64)
+        self.ticks = 0
+        self.infected = []
+        # One row per replica when built by grid(), with the swept values; see run()
+        self.grid_table = None
+
+    @classmethod
+    def grid(cls, graph, num_runs, seed=0, **grid):
+        """One replica per (grid point, run); every point reuses the same run seeds.
+
+        ``grid`` maps a per-replica parameter to the values to sweep, e.g.
+        ``rebuttal_enabled=[False, True], influence_factor=[0.05, 0.1]``.
+        """
+        seeds = replica_seeds(seed, num_runs)
+        names = list(grid)
+        points = list(itertools.product(*(grid[name] for name in names)))
+        rows = [dict(zip(names, point), run=r, seed=seeds[r]) for point in points for r in range(num_runs)]
+        grid_table = pd.DataFrame(rows, columns=names + ['run', 'seed'])
+        params = {name: [row[name] for row in rows] for name in names}
+        batch = cls(graph, grid_table['seed'].tolist(), **params)
+        batch.grid_table = grid_table
+        return batch
+
+    def _draw(self, stream, sizes):
+        """Concatenated uniform draws, ``sizes[r]`` from replica r's ``stream``."""
+        return np.concatenate([self.streams[r][stream].random(n) for r, n in enumerate(sizes.tolist())] or [np.empty(0)])
+
+    def _sizes(self, flat):
+        return np.bincount(flat // self.num_agents, minlength=self.num_replicas)
+
+    def _gather(self, flat):
+        """(source, neighbor) flat index pairs for every CSR entry of the given flat rows."""
+        offset = flat - flat % self.num_agents
+        starts = self.indptr[flat - offset]
+        counts = self.indptr[flat - offset + 1] - starts
+        source = np.repeat(flat, counts)
+        positions = np.arange(len(source)) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return source, self.indices[positions] + (source - source % self.num_agents)
+
+    def slander_drop(self, replicas, misinformation=0):
+        """Exposes each given replica's slander targets to a piece of misinformation."""
+        flat = np.concatenate([r * self.num_agents + self.slander_targets[r] for r in replicas] or [np.empty(0, dtype=np.int64)])
+        flat = flat[self.state[flat] == SUSCEPTIBLE]
+        self.state[flat] = EXPOSED
+        self.infected_by[flat] = misinformation
+        self.active = np.union1d(self.active, flat)
+
+    def _resolve_exposure(self, exposed):
+        sizes = self._sizes(exposed)
+        carrying = self.infected_by[exposed] >= 0
+        # Per replica: every check coin, then every belief coin, as the kernel draws them
+        check, believe = np.empty(len(exposed)), np.empty(len(exposed))
+        start = 0
+        for r, n in enumerate(sizes.tolist()):
+            check[start:start + n] = self.streams[r]['propagation'].random(n)
+            believe[start:start + n] = self.streams[r]['propagation'].random(n)
+            start += n
+        to_fact_checker = carrying & (check < self.skepticism[exposed])
+        plausibility = self.plausibility[np.maximum(self.infected_by[exposed], 0)]
+        to_infected = carrying & ~to_fact_checker & (believe < self.susceptibility[exposed] * plausibility)
+        return exposed[to_fact_checker], exposed[to_infected]
+
+    def _spread(self, spreaders, targets_state):
+        source, neighbor = self._gather(spreaders)
+        candidate = targets_state(neighbor)
+        source, neighbor = source[candidate], neighbor[candidate]
+        hit = self._draw('propagation', self._sizes(source)) < self.template.parameters.transmission_probability
+        neighbor, first = np.unique(neighbor[hit], return_index=True)
+        return neighbor, self.infected_by[source[hit][first]]
+
+    def _rebut(self, fact_checkers, targets_state):
+        fact_checkers = fact_checkers[self.rebuttal_enabled[fact_checkers // self.num_agents]]
+        source, neighbor = self._gather(fact_checkers)
+        candidate = targets_state(neighbor)
+        source, neighbor = source[candidate], neighbor[candidate]
+        hit = self._draw('propagation', self._sizes(source)) < self.skepticism[source] * REBUTTAL_FACTOR
+        return np.unique(neighbor[hit])
+
+    def _propagate(self):
+        state = self.state
+        active = self.active
+        active_state = state[active]
+        # Clear the last tick's penalty on the rows that carried it, as MisinformationKernel does
+        self.penalty[self.penalized] = 0.0
+
+        if self.synchronous:
+            exposed = active[active_state == EXPOSED]
+            infected = active[active_state == INFECTED]
+            fact_checkers = active[active_state == FACT_CHECKER]
+            to_fact_checker, to_infected = self._resolve_exposure(exposed)
+            newly_exposed, carried = self._spread(infected, lambda n: state[n] == SUSCEPTIBLE)
+            reset = self._rebut(fact_checkers, lambda n: (state[n] == EXPOSED) | (state[n] == INFECTED))
+            state[to_fact_checker] = FACT_CHECKER
+            state[to_infected] = INFECTED
+            state[newly_exposed] = EXPOSED
+            self.infected_by[newly_exposed] = carried
+            state[reset] = SUSCEPTIBLE
+            self.infected_by[reset] = -1
+        else:
+            kernel, N = self.template.propagation, self.num_agents
+            spreading = (active_state == EXPOSED) | (active_state == INFECTED)
+            newly_exposed = []
+            for r in np.unique(active[spreading] // N).tolist():
+                rows = active[active // N == r] - r * N
+                replica = slice(r * N, (r + 1) * N)
+                exposed = ordered_sweep(self.indptr, self.indices, state[replica], self.infected_by[replica], rows,
+                                        self.streams[r].uniform('misinformation'), kernel.skepticism, kernel.susceptibility,
+                                        self.plausibility, self.severity, self.template.parameters.transmission_probability,
+                                        self.rebuttal_enabled[r], self.penalty[replica])
+                newly_exposed.append(exposed + r * N)
+            newly_exposed = np.concatenate(newly_exposed or [np.empty(0, dtype=np.int64)])
+
+        active = np.union1d(active, newly_exposed)
+        self.active = active[state[active] != SUSCEPTIBLE]
+        if self.synchronous:
+            infected = self.active[(state[self.active] == INFECTED) & (self.infected_by[self.active] >= 0)]
+            self.penalty[infected] = self.severity[self.infected_by[infected]] * SLANDER_PENALTY
+            self.penalized = infected
+        else:
+            self.penalized = active
+
+    def _propose_deals(self):
+        open_brokers = (self.power_broker_score > BROKER_THRESHOLD) & ~self.has_deal
+        for r in range(self.num_replicas):
+            brokers = np.flatnonzero(open_brokers[r])
+            choices, _, _, accepted = offer_round(self.streams[r]['deals'], brokers, self.num_candidates)
+            self.has_deal[r, brokers[accepted]] = True
+            if self.ticks > 0:
+                rows, columns = brokers[accepted], choices[accepted]
+                self.opinions[r, rows, columns] = np.minimum(1.0, self.opinions[r, rows, columns] + DEAL_BOOST)
+
+    def _slander_penalty(self):
+        return self.penalty.reshape(self.num_replicas, self.num_agents)
+
+    def _next_opinions(self, opinions, slander):
+        if not self.linear:
+            # Custom engine rules run replica by replica, each with its own influence factor
+            engine = self.template.engine
+            return np.stack([engine.next_opinions(opinions[r], slander[r], influence_factor=self.influence_factor[r])
+                             for r in range(self.num_replicas)])
+        R, N, C = opinions.shape
+        next_opinions = opinions.copy()
+        neighbor_avg = (self.influence @ opinions.transpose(1, 0, 2).reshape(N, R * C)).reshape(N, R, C).transpose(1, 0, 2)
+        active = self.total_weight > 0
+        factor = self.influence_factor[:, None, None]
+        next_opinions[:, active] = ((1 - factor) * opinions[:, active]
+                                    + factor * neighbor_avg[:, active] / self.total_weight[active, None])
+
+        target = self.template.engine.columns.get(SLANDER_TARGET)
+        if target is not None:
+            slandered = (slander > 0) & self.has_neighbors
+            next_opinions[:, :, target] = np.where(slandered, np.maximum(0, next_opinions[:, :, target] - slander), next_opinions[:, :, target])
+        return next_opinions
+
+    def step(self):
+        """Advances every replica by one tick, as ElectionModel.step does."""
+        for r in np.flatnonzero(self.slander_step == self.ticks):
+            self.slander_drop([r])
+        self.infected.append(np.bincount(self.active[self.state[self.active] == INFECTED] // self.num_agents, minlength=self.num_replicas))
+        self._propose_deals()
+        self._propagate()
+        opinions = self.opinions
+        next_opinions = self._next_opinions(opinions, self._slander_penalty())
+        enthusiasm = np.abs(opinions - 0.5).sum(axis=2) / self.num_candidates
+        elasticity = self.template.parameters.turnout_elasticity
+        self.turnout = np.clip(((1 - elasticity) * self.baseline_turnout + elasticity * enthusiasm * 2) * self.turnout_boost, 0, 1)
+        self.opinions = next_opinions
+        self.ticks += 1
+
+    def run(self, num_steps):
+        """Runs ``num_steps`` ticks and returns the per-replica results."""
+        for _ in range(num_steps):
+            self.step()
+        parameters = self.grid_table
+        if parameters is None:
+            parameters = pd.DataFrame({'seed': self.seeds, 'rebuttal_enabled': self.rebuttal_enabled,
+                                       'influence_factor': self.influence_factor, 'slander_step': self.slander_step})
+        return BatchResult(
+            infected=np.stack(self.infected, axis=1) if self.infected else np.zeros((self.num_replicas, 0), dtype=np.int64),
+            opinions=self.opinions,
+            turnout=self.turnout,
+            states=self.state.reshape(self.num_replicas, self.num_agents),
+            candidate_ids=self.candidate_ids,
+            parameters=parameters,
+        )
@@ -0,0 +1,387 @@
+import hashlib
+import multiprocessing as mp
+import os
+from dataclasses import astuple, dataclass, fields, replace
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import LinAlgError, cho_factor, cho_solve
+from scipy.stats import norm, qmc
+
+from src.batch import BatchSimulation
+from src.loader import CACHE_DIR
+from src.model import ElectionModel
+from src.monte_carlo import replica_seeds
+from src.parameters import ModelParameters
+from src.topology import CampusTopology
+
+CALIBRATION_DIR = os.path.join(CACHE_DIR, "calibration")
+# Search box per ModelParameters field; transmission and turnout elasticity follow
+# README Appendix A, the others bracket the values the model was written with
+PARAMETER_RANGES = {
+    'influence_factor': (0.02, 0.3),
+    'junior_senior_multiplier': (1.0, 2.5),
+    'role_multiplier': (1.0, 2.5),
+    'transmission_probability': (0.03, 0.15),
+    'turnout_elasticity': (0.1, 0.4),
+    'confidence_threshold': (0.05, 0.5),
+}
+# Fitted by default; add 'confidence_threshold' for BoundedConfidenceElectionModel
+DEFAULT_PARAMETERS = ['influence_factor', 'junior_senior_multiplier', 'role_multiplier',
+                      'transmission_probability', 'turnout_elasticity']
+METHODS = ('lhs', 'bo')
+# Successive halving keeps the best 1/ETA of the points at each rung and gives the
+# survivors ETA times as many runs, from MIN_RUNS up to MAX_RUNS
+ETA = 3
+MIN_RUNS = 4
+MAX_RUNS = 36
+# Relative errors are taken against at least this much, so targets near zero stay finite
+SCALE_FLOOR = 0.01
+# Bayesian optimization surrogate: RBF length scales tried on the unit cube, and
+# the random candidates the expected improvement is maximized over
+LENGTH_SCALES = (0.05, 0.1, 0.2, 0.4, 0.8)
+NUM_CANDIDATES = 2048
+HISTORY_COLUMNS = ['point', 'method', 'round', 'runs', 'loss']
+
+# Topology and run settings shared with worker processes; set once per worker by _init_worker
+_TOPOLOGY = None
+_SETTINGS = None
+
+def summary_statistics(result, num_agents, groups=()):
+    """Backtesting statistics (README Appendix B) of each replica of a BatchResult.
+
+    ``turnout`` and ``turnout.sd`` are the mean and spread of the final turnout
+    propensity over agents, ``infected.peak`` and ``infected.final`` the cascade
+    size as a fraction of agents, ``opinion.<candidate>`` the mean final opinion,
+    and for every ``(attribute, codes, names)`` group ``turnout.<attribute>=<name>``
+    the mean turnout of that cluster. Returns a (replicas x statistics) DataFrame.
+    """
+    turnout = result.turnout
+    infected = result.infected / max(num_agents, 1)
+    columns = {
+        'turnout': turnout.mean(axis=1),
+        'turnout.sd': turnout.std(axis=1),
+        'infected.peak': infected.max(axis=1) if infected.shape[1] else np.zeros(len(turnout)),
+        'infected.final': infected[:, -1] if infected.shape[1] else np.zeros(len(turnout)),
+    }
+    for k, cand_id in enumerate(result.candidate_ids):
+        columns[f"opinion.{cand_id}"] = result.opinions[:, :, k].mean(axis=1)
+    for attribute, codes, names in groups:
+        for g, name in enumerate(names):
+            columns[f"turnout.{attribute}={name}"] = turnout[:, codes == g].mean(axis=1)
+    return pd.DataFrame(columns)
+
+def _init_worker(topology, settings):
+    global _TOPOLOGY, _SETTINGS
+    _TOPOLOGY, _SETTINGS = topology, settings
+
+def _evaluate(task):
+    parameters, seeds = task
+    settings = _SETTINGS
+    slander_targets = settings['slander_targets']
+    if not np.isscalar(slander_targets):
+        slander_targets = [slander_targets] * len(seeds)
+    batch = BatchSimulation(_TOPOLOGY, seeds, rebuttal_enabled=settings['rebuttal_enabled'], slander_targets=slander_targets,
+                            slander_step=settings['slander_step'], synchronous=settings['synchronous'],
+                            model_class=settings['model_class'], parameters=parameters)
+    return summary_statistics(batch.run(settings['num_steps']), len(_TOPOLOGY), settings['groups'])
+
+def expected_improvement(mean, sd, best):
+    """Expected improvement below ``best`` of a Gaussian prediction."""
+    z = (best - mean) / sd
+    return (best - mean) * norm.cdf(z) + sd * norm.pdf(z)
+
+class ParameterSpace:
+    """Box of ModelParameters fields searched by a Calibration.
+
+    Points are handled as vectors in the unit cube, one coordinate per name, and
+    mapped linearly onto ``ranges``; fields outside the space keep their value
+    in ``base``.
+    """
+    def __init__(self, names=DEFAULT_PARAMETERS, ranges=None, base=None):
+        ranges = {**PARAMETER_RANGES, **(ranges or {})}
+        known = {field.name for field in fields(ModelParameters)}
+        unknown = set(names) - known
+        if unknown:
+            raise ValueError(f"Unknown parameters: {sorted(unknown)}")
+        self.names = list(names)
+        self.low = np.array([ranges[name][0] for name in self.names], dtype=np.float64)
+        self.high = np.array([ranges[name][1] for name in self.names], dtype=np.float64)
+        self.base = base if base is not None else ModelParameters()
+
+    def __len__(self):
+        return len(self.names)
+
+    def parameters(self, unit):
+        """ModelParameters at a unit-cube vector."""
+        values = self.low + np.clip(unit, 0, 1) * (self.high - self.low)
+        return replace(self.base, **{name: float(value) for name, value in zip(self.names, values)})
+
+    def vector(self, parameters):
+        """Unit-cube vector of a ModelParameters."""
+        values = np.array([getattr(parameters, name) for name in self.names], dtype=np.float64)
+        return (values - self.low) / (self.high - self.low)
+
+    def latin_hypercube(self, num_points, rng):
+        """``num_points`` unit vectors spread over the box by Latin hypercube sampling."""
+        return qmc.LatinHypercube(len(self), rng=rng).random(num_points)
+
+class GaussianProcess:
+    """Zero-mean Gaussian process with an isotropic RBF kernel, the BO surrogate.
+
+    Targets are standardized before fitting; the length scale is the one of
+    LENGTH_SCALES with the highest marginal likelihood, and ``noise`` absorbs
+    the run-to-run scatter of the losses.
+    """
+    def __init__(self, noise=1e-2):
+        self.noise = noise
+
+    @staticmethod
+    def _kernel(a, b, length_scale):
+        distances = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        return np.exp(-0.5 * distances / length_scale ** 2)
+
+    def fit(self, X, y):
+        self.X = X
+        self.offset, self.scale = y.mean(), y.std() or 1.0
+        z = (y - self.offset) / self.scale
+        best = -np.inf
+        for length_scale in LENGTH_SCALES:
+            try:
+                factor = cho_factor(self._kernel(X, X, length_scale) + self.noise * np.eye(len(X)), lower=True)
+            except LinAlgError:
+                continue
+            alpha = cho_solve(factor, z)
+            likelihood = -0.5 * z @ alpha - np.log(np.diag(factor[0])).sum()
+            if likelihood > best:
+                best = likelihood
+                self.length_scale, self.factor, self.alpha = length_scale, factor, alpha
+        return self
+
+    def predict(self, X):
+        """Posterior mean and standard deviation at the rows of ``X``."""
+        cross = self._kernel(X, self.X, self.length_scale)
+        mean = cross @ self.alpha
+        variance = 1 - (cross * cho_solve(self.factor, cross.T).T).sum(axis=1)
+        return mean * self.scale + self.offset, np.sqrt(np.maximum(variance, 1e-12)) * self.scale
+
+@dataclass
+class CalibrationResult:
+    """Best parameters found, every evaluated point and the best point's statistics."""
+    best: ModelParameters
+    loss: float
+    history: pd.DataFrame
+    statistics: pd.Series
+    targets: pd.Series
+
+class Calibration:
+    """Fits ModelParameters to observed backtesting statistics.
+
+    ``targets`` maps statistic names (see summary_statistics) to observed values
+    and ``weights`` optionally weighs them; the loss is the weighted sum of squared
+    relative errors of the statistics averaged over runs. A point is evaluated by
+    a BatchSimulation over the run seeds, the same seeds for every point so points
+    are compared under common random numbers, with points spread over a process
+    pool. Every (point, seed) evaluation is cached to disk under ``cache_dir``,
+    keyed by the topology and run settings, so repeated or extended searches only
+    run what is new.
+
+    ``run`` searches by Latin hypercube (``method='lhs'``) or Bayesian
+    optimization (``'bo'``); both screen each batch of points with successive
+    halving, so unpromising points stop after MIN_RUNS runs.
+    """
+    def __init__(self, graph, targets, weights=None, space=None, num_steps=10, slander_step=4, slander_targets=50,
+                 rebuttal_enabled=False, synchronous=False, model_class=ElectionModel, group_by=(),
+                 seed=0, processes=None, cache_dir=CALIBRATION_DIR):
+        self.topology = graph if isinstance(graph, CampusTopology) else CampusTopology(graph)
+        self.space = space if space is not None else ParameterSpace()
+        self.targets = pd.Series(targets, dtype=np.float64)
+        self.weights = pd.Series(weights or {}, dtype=np.float64).reindex(self.targets.index).fillna(1.0)
+        self.seed = seed
+        self.processes = processes
+        self.cache_dir = cache_dir
+
+        groups = []
+        for attribute in group_by:
+            codes, names = pd.factorize(pd.Series(self.topology.node_attribute(attribute), dtype=object))
+            groups.append((attribute, codes, list(names)))
+        if not np.isscalar(slander_targets):
+            slander_targets = np.array([self.topology.index[node_id] for node_id in slander_targets], dtype=np.int64)
+        self.settings = dict(num_steps=num_steps, slander_step=slander_step, slander_targets=slander_targets,
+                             rebuttal_enabled=rebuttal_enabled, synchronous=synchronous, model_class=model_class, groups=groups)
+        self.experiment = self.digest()
+        # Every screened point, and one history row per point
+        self.points = []
+        self.history = pd.DataFrame(columns=HISTORY_COLUMNS + self.space.names)
+
+    def digest(self):
+        """Cache key of the experiment: topology, agent attributes and run settings."""
+        topology, settings = self.topology, self.settings
+        model_class = settings['model_class']
+        digest = hashlib.sha256(f"{model_class.__module__}.{model_class.__qualname__}".encode())
+        for name in ('num_steps', 'slander_step', 'rebuttal_enabled', 'synchronous'):
+            digest.update(f":{settings[name]}".encode())
+        digest.update(np.asarray(settings['slander_targets'], dtype=np.int64).tobytes())
+        digest.update('\0'.join(map(str, topology.node_ids)).encode())
+        structure = topology.influence_matrix(np.zeros(len(topology), dtype=bool))
+        for array in (structure.indptr, structure.indices, structure.data, topology.interest_bits,
+                      topology.baseline_turnout_propensity, topology.slander_susceptibility, topology.skepticism,
+                      topology.is_ssms_winner, topology.is_mess_rep, topology.is_amc_member):
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        for attribute, codes, names in settings['groups']:
+            digest.update(f"{attribute}:{names}".encode())
+            digest.update(codes.tobytes())
+        return digest.hexdigest()[:16]
+
+    def _cache_path(self, parameters):
+        if not self.cache_dir:
+            return None
+        key = hashlib.sha256(repr(astuple(parameters)).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, self.experiment, key + ".npz")
+
+    def _load(self, parameters):
+        path = self._cache_path(parameters)
+        if not path or not os.path.exists(path):
+            return None
+        with np.load(path) as arrays:
+            return pd.DataFrame(arrays['statistics'], index=arrays['seeds'], columns=arrays['columns'])
+
+    def _save(self, parameters, frame):
+        path = self._cache_path(parameters)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            np.savez(path, statistics=frame.to_numpy(), seeds=frame.index.to_numpy(dtype=np.int64),
+                     columns=np.array(frame.columns, dtype=str))
+
+    def evaluate(self, points, seeds):
+        """Statistics of every point (ModelParameters) over the given run seeds.
+
+        Returns one (seeds x statistics) DataFrame per point. Cached runs are
+        reused; the missing ones run in one BatchSimulation per point, across a
+        process pool.
+        """
+        frames = [self._load(parameters) for parameters in points]
+        tasks, owners = [], []
+        for i, (parameters, frame) in enumerate(zip(points, frames)):
+            missing = [seed for seed in seeds if frame is None or seed not in frame.index]
+            if missing:
+                tasks.append((parameters, missing))
+                owners.append(i)
+
+        processes = min(self.processes or os.cpu_count(), max(len(tasks), 1))
+        if processes == 1:
+            _init_worker(self.topology, self.settings)
+            results = map(_evaluate, tasks)
+        else:
+            ctx = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else mp.get_context()
+            pool = ctx.Pool(processes, initializer=_init_worker, initargs=(self.topology, self.settings))
+            results = pool.imap(_evaluate, tasks)
+        try:
+            for i, (parameters, missing), result in zip(owners, tasks, results):
+                result.index = pd.Index(missing)
+                frames[i] = result if frames[i] is None else pd.concat([frames[i], result])
+                self._save(parameters, frames[i])
+        finally:
+            if processes != 1:
+                pool.close()
+                pool.join()
+
+        unknown = set(self.targets.index) - set(frames[0].columns) if frames else set()
+        if unknown:
+            raise ValueError(f"Unknown target statistics: {sorted(unknown)}")
+        return [frame.loc[list(seeds)] for frame in frames]
+
+    def loss(self, statistics):
+        """Weighted sum of squared relative errors of the run-averaged statistics."""
+        mean = statistics[self.targets.index].mean()
+        scale = np.maximum(np.abs(self.targets), SCALE_FLOOR)
+        return float((self.weights * ((mean - self.targets) / scale) ** 2).sum())
+
+    def successive_halving(self, points, min_runs=MIN_RUNS, max_runs=MAX_RUNS, eta=ETA):
+        """Evaluates ``points`` on more and more runs, keeping the best 1/eta at each rung.
+
+        Returns the runs each point reached and its loss over them.
+        """
+        seeds = replica_seeds(self.seed, max_runs)
+        runs_reached = np.zeros(len(points), dtype=np.int64)
+        losses = np.full(len(points), np.nan)
+        alive = list(range(len(points)))
+        runs = min(min_runs, max_runs)
+        while alive:
+            frames = self.evaluate([points[i] for i in alive], seeds[:runs])
+            for i, frame in zip(alive, frames):
+                losses[i], runs_reached[i] = self.loss(frame), runs
+            if runs >= max_runs:
+                break
+            alive = sorted(alive, key=lambda i: losses[i])[:max(1, len(alive) // eta)]
+            # A lone survivor goes straight to the full budget
+            runs = max_runs if len(alive) == 1 else min(runs * eta, max_runs)
+        return runs_reached, losses
+
+    def _record(self, points, runs, losses, method, round_):
+        start = len(self.points)
+        self.points.extend(points)
+        rows = pd.DataFrame([[getattr(parameters, name) for name in self.space.names] for parameters in points], columns=self.space.names)
+        rows.insert(0, 'loss', losses)
+        rows.insert(0, 'runs', runs)
+        rows.insert(0, 'round', round_)
+        rows.insert(0, 'method', method)
+        rows.insert(0, 'point', np.arange(start, start + len(points)))
+        self.history = rows if self.history.empty else pd.concat([self.history, rows], ignore_index=True)
+
+    def _screen(self, units, method, round_, **halving):
+        points = [self.space.parameters(unit) for unit in units]
+        runs, losses = self.successive_halving(points, **halving)
+        self._record(points, runs, losses, method, round_)
+
+    def propose(self, batch_size, rng):
+        """Next ``batch_size`` unit vectors by expected improvement of the log loss.
+
+        The batch is built greedily: each pick is added to the surrogate with its
+        predicted mean as if it had been observed (the kriging believer), so the
+        picks spread out instead of piling onto one optimum.
+        """
+        X = np.array([self.space.vector(parameters) for parameters in self.points])
+        y = np.log(self.history['loss'].to_numpy(dtype=np.float64) + 1e-12)
+        best = X[np.argmin(y)]
+        candidates = np.vstack([self.space.latin_hypercube(NUM_CANDIDATES, rng),
+                                np.clip(best + rng.normal(scale=0.05, size=(NUM_CANDIDATES // 4, len(self.space))), 0, 1)])
+        surrogate = GaussianProcess()
+        chosen = []
+        for _ in range(batch_size):
+            surrogate.fit(X, y)
+            mean, sd = surrogate.predict(candidates)
+            j = int(np.argmax(expected_improvement(mean, sd, y.min())))
+            chosen.append(candidates[j])
+            X, y = np.vstack([X, candidates[j]]), np.append(y, mean[j])
+            candidates = np.delete(candidates, j, axis=0)
+        return np.array(chosen)
+
+    def run(self, method='bo', num_points=27, rounds=4, batch_size=9, min_runs=MIN_RUNS, max_runs=MAX_RUNS, eta=ETA):
+        """Searches the parameter space and returns a CalibrationResult.
+
+        ``'lhs'`` screens ``num_points`` Latin hypercube points. ``'bo'`` starts
+        from the same design and adds ``rounds`` batches of ``batch_size`` points
+        proposed by expected improvement. Every batch goes through successive
+        halving from ``min_runs`` to ``max_runs`` runs. Calling run again continues
+        the search from the points already in ``history``.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        rng = np.random.default_rng([self.seed, len(self.history)])
+        halving = dict(min_runs=min_runs, max_runs=max_runs, eta=eta)
+        self._screen(self.space.latin_hypercube(num_points, rng), method, 0, **halving)
+        if method == 'bo':
+            for round_ in range(1, rounds + 1):
+                self._screen(self.propose(batch_size, rng), method, round_, **halving)
+        return self.result(max_runs)
+
+    def result(self, max_runs=MAX_RUNS):
+        """CalibrationResult for the best fully evaluated point in ``history``."""
+        finished = self.history[self.history['runs'] == self.history['runs'].max()]
+        row = finished.loc[finished['loss'].idxmin()]
+        best = self.points[int(row['point'])]
+        runs = int(row['runs'])
+        statistics = self.evaluate([best], replica_seeds(self.seed, max_runs)[:runs])[0].mean()
+        return CalibrationResult(best=best, loss=float(row['loss']), history=self.history.copy(),
+                                 statistics=statistics, targets=self.targets.copy())
@@ -0,0 +1,452 @@
+import heapq
+import inspect
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.model import ElectionModel
+from src.monte_carlo import slander_target_ids
+from src.propagation import EXPOSED, INFECTED, SLANDER_PENALTY, SUSCEPTIBLE, gather_rows
+
+# A tick is one campaign day; Candidate.speaking_capacity is a budget of hours per week
+TICKS_PER_WEEK = 7
+RALLY_HOURS = 2
+# Opinion gain of each audience member per rally hour, and of each reached agent per
+# media unit, before scaling by the candidate's credibility
+RALLY_BOOST = 0.02
+MEDIA_BOOST = 0.002
+MEDIA_POST_UNITS = 10
+
+# Campaign actions fire before a tick's row is collected and deal rounds after it,
+# as ElectionModel.step proposes deals after collecting
+BEFORE_COLLECT = 0
+AFTER_COLLECT = 1
+EVENT_PHASES = {
+    'release_manifestos': BEFORE_COLLECT,
+    'update_manifesto': BEFORE_COLLECT,
+    'slander_drop': BEFORE_COLLECT,
+    'inoculate': BEFORE_COLLECT,
+    'rally': BEFORE_COLLECT,
+    'media_post': BEFORE_COLLECT,
+    'deal_round': AFTER_COLLECT,
+    'set_layers': BEFORE_COLLECT,
+}
+SCHEDULE_COLUMNS = ['step', 'events', 'updated', 'changed', 'mode']
+# Rows holding more than this share of the edges are updated, and their neighbors
+# woken, by one sparse product over the whole graph instead of gathering their CSR rows
+GATHER_SHARE = 0.25
+
+@dataclass(order=True)
+class CampaignEvent:
+    """One timed campaign action, recurring every ``every`` ticks before ``until`` when set."""
+    tick: int
+    phase: int
+    order: int
+    kind: str = field(compare=False)
+    params: dict = field(default_factory=dict, compare=False)
+    every: Optional[int] = field(default=None, compare=False)
+    until: Optional[int] = field(default=None, compare=False)
+
+def changed_rows(old, new, tolerance=0.0):
+    """Per row, whether any value moved by more than ``tolerance``; NaN only matches NaN."""
+    moved = (np.abs(new - old) > tolerance) | (np.isnan(old) != np.isnan(new))
+    return moved.any(axis=1) if moved.ndim > 1 else moved
+
+def load_plan(path):
+    """Reads a campaign plan from a JSON file."""
+    with open(path) as f:
+        return json.load(f)
+
+def scenario_plan(num_steps, slander_step, slander_targets, defenders=()):
+    """The plan run_scenario follows: release, a deal round every tick, and the slander drop."""
+    events = [
+        {'tick': 0, 'kind': 'release_manifestos'},
+        {'tick': 0, 'kind': 'deal_round', 'every': 1},
+    ]
+    if 0 <= slander_step < num_steps:
+        events.append({'tick': slander_step, 'kind': 'inoculate', 'targets': list(defenders)})
+        events.append({'tick': slander_step, 'kind': 'slander_drop', 'misinformation': 'm1', 'targets': slander_targets})
+    return {'num_steps': num_steps, 'events': events}
+
+class CampaignScheduler:
+    """Runs an ElectionModel along a timeline of campaign events, recomputing only dirty agents.
+
+    Events wait in a priority queue ordered by tick, phase (see EVENT_PHASES) and
+    the order they were scheduled in. Each tick fires the due campaign actions,
+    collects, runs the due deal rounds and then updates only the dirty agents: those
+    whose own or a neighbor's opinion changed on the previous tick or was touched by
+    an event, plus the agents around live misinformation. Any other agent would
+    recompute exactly the state it already holds, so with ``tolerance=0`` a run
+    matches stepping the model with the same events, random draws included (note
+    that ElectionModel.step proposes deals every tick). A positive ``tolerance``
+    still applies smaller changes but does not wake the neighbors for them.
+
+    Ticks with no dirty agent, no exposed or infected agent and no event cost
+    nothing: the scheduler jumps over them, repeating the last collected row.
+    Candidate rallies and media posts are limited by ``speaking_capacity`` (hours
+    per week) and ``media_assets`` (units over the campaign, shared with the deals
+    of a budgeted DealMarket); an action beyond the budget is cut down to what is
+    left. A ``set_layers`` event switches the model to another edge layer
+    configuration, e.g. masking club ties for an exam week.
+    """
+    def __init__(self, model, tolerance=0.0):
+        self.model = model
+        self.tolerance = tolerance
+        self.queue = []
+        self.scheduled = 0
+        self.agents = list(model.agents)
+        n = len(self.agents)
+        self.everyone = np.arange(n)
+        self._load_network()
+        # Speaking budget spent per (candidate id, week) in hours; media units are tracked by model.market
+        self.speaking_hours = {}
+        self.audiences = {}
+
+        # Agents to recompute on the next tick, as a mask over the rows
+        self.dirty = np.ones(n, dtype=bool)
+        self.active = np.empty(0, dtype=np.int64)
+        # Whether the model changed since the last collected row
+        self.fresh = True
+
+    def schedule(self, tick, kind, every=None, until=None, **params):
+        """Queues an action for ``tick``; ``every`` repeats it up to (not including) ``until``."""
+        if kind not in EVENT_PHASES:
+            raise ValueError(f"Unknown campaign event: {kind}")
+        if tick < self.model.steps:
+            raise ValueError(f"Cannot schedule {kind} at tick {tick}, the model is at tick {self.model.steps}")
+        if every is not None and every < 1:
+            raise ValueError(f"every must be at least 1, got {every}")
+        inspect.signature(getattr(self, f"_{kind}")).bind(**params)
+        if 'candidate' in params:
+            self._candidate(params['candidate'])
+        heapq.heappush(self.queue, CampaignEvent(tick, EVENT_PHASES[kind], self.scheduled, kind, params, every, until))
+        self.scheduled += 1
+
+    def load(self, plan):
+        """Schedules a plan: a dict (or JSON file) with ``events`` and optionally ``candidate_events``.
+
+        Each event is a dict with ``tick`` and ``kind``, optional ``every`` and
+        ``until``, and the action's parameters. ``candidate_events`` holds keyword
+        arguments for schedule_candidate_events, running to the plan's ``num_steps``
+        unless it gives an ``end``.
+        """
+        if isinstance(plan, str):
+            plan = load_plan(plan)
+        for event in plan.get('events', []):
+            event = dict(event)
+            self.schedule(event.pop('tick'), event.pop('kind'), **event)
+        if 'candidate_events' in plan:
+            options = dict(plan['candidate_events'])
+            options.setdefault('end', plan.get('num_steps'))
+            self.schedule_candidate_events(**options)
+
+    def schedule_candidate_events(self, end, start=0, audience='hostel'):
+        """Schedules every rally and media post the candidates' budgets allow between ``start`` and ``end``.
+
+        Each candidate holds ``speaking_capacity // RALLY_HOURS`` rallies a week,
+        spread over the week and rotating through the groups of the ``audience``
+        node attribute, largest first, and spends ``media_assets`` in posts of
+        MEDIA_POST_UNITS spread over the campaign, cycling through its manifesto.
+        """
+        start = max(start, self.model.steps)
+        if end is None or end <= start:
+            return
+        groups = pd.Series(self.model.topology.node_attribute(audience), dtype=object).value_counts().index.tolist()
+        for c, cand in enumerate(self.model.candidates):
+            rallies = cand.speaking_capacity // RALLY_HOURS
+            held = 0
+            for week_start in range(start - start % TICKS_PER_WEEK, end, TICKS_PER_WEEK):
+                for r in range(rallies if groups else 0):
+                    tick = week_start + r * TICKS_PER_WEEK // rallies
+                    if start <= tick < end:
+                        group = groups[(c + held) % len(groups)]
+                        self.schedule(tick, 'rally', candidate=cand.id, audience={audience: group}, hours=RALLY_HOURS)
+                        held += 1
+            posts = cand.media_assets // MEDIA_POST_UNITS
+            for p in range(posts):
+                topic = cand.manifesto[p % len(cand.manifesto)] if cand.manifesto else None
+                self.schedule(start + p * (end - start) // posts, 'media_post', candidate=cand.id, topic=topic, units=MEDIA_POST_UNITS)
+
+    def _candidate(self, candidate_id):
+        candidate = next((c for c in self.model.candidates if c.id == candidate_id), None)
+        if not candidate:
+            raise ValueError(f"Unknown candidate: {candidate_id}")
+        return candidate
+
+    def _rows(self, node_ids):
+        index = self.model.topology.index
+        return np.array([index[node_id] for node_id in node_ids], dtype=np.int64)
+
+    def _audience(self, audience):
+        """Rows of an audience: ``{attribute: value}``, a list of node ids, or None for everyone."""
+        if audience is None:
+            return self.everyone
+        if not isinstance(audience, dict):
+            return self._rows(audience)
+        key = tuple(sorted(audience.items()))
+        if key not in self.audiences:
+            topology = self.model.topology
+            match = np.ones(len(topology), dtype=bool)
+            for attribute, value in key:
+                match &= np.array([v == value for v in topology.node_attribute(attribute)], dtype=bool)
+            self.audiences[key] = np.flatnonzero(match)
+        return self.audiences[key]
+
+    def _boost(self, candidate, rows, amount):
+        """Raises the released ``rows``' opinion of ``candidate`` by ``amount``, capped at 1."""
+        store = self.model.store
+        rows = rows[store.released[rows]]
+        k = self.model.candidates.index(candidate)
+        # The engine's opinion matrix is the store's once loaded, so this updates both
+        store.opinions[rows, k] = np.minimum(1.0, store.opinions[rows, k] + amount)
+        return rows
+
+    def _release_manifestos(self):
+        self.model.release_manifestos()
+        return self.everyone
+
+    def _update_manifesto(self, candidate, manifesto):
+        self.model.update_manifesto(candidate, manifesto)
+        return self.everyone
+
+    def _slander_drop(self, targets, misinformation='m1'):
+        node_ids = slander_target_ids(self.model, targets)
+        self.model.slander_drop(misinformation, node_ids)
+        return self._rows(node_ids)
+
+    def _inoculate(self, targets):
+        self.model.inoculate(targets)
+        return self._rows(targets)
+
+    def _deal_round(self):
+        return self.model.propose_deals(tick=self.model.steps)
+
+    def _set_layers(self, layers=None, combiner='last'):
+        """Masks or reweights edge layers, e.g. ``layers={'club': 0}`` for exam weeks; see ElectionModel.set_layers."""
+        self.model.set_layers(layers, combiner)
+        self._load_network()
+        return self.everyone
+
+    def _rally(self, candidate, audience=None, hours=RALLY_HOURS):
+        cand = self._candidate(candidate)
+        key = (cand.id, self.model.steps // TICKS_PER_WEEK)
+        hours = min(hours, cand.speaking_capacity - self.speaking_hours.get(key, 0))
+        if hours <= 0:
+            return self.everyone[:0]
+        self.speaking_hours[key] = self.speaking_hours.get(key, 0) + hours
+        return self._boost(cand, self._audience(audience), RALLY_BOOST * hours * cand.credibility)
+
+    def _media_post(self, candidate, topic=None, units=MEDIA_POST_UNITS):
+        """Reaches every agent interested in ``topic``, or in any of the candidate's manifesto when None."""
+        cand = self._candidate(candidate)
+        market = self.model.market
+        column = self.model.candidates.index(cand)
+        units = min(units, int(market.remaining()[column]))
+        if units <= 0:
+            return self.everyone[:0]
+        market.media_spent[column] += units
+        topology = self.model.topology
+        mask = topology.interest_mask([topic] if topic is not None else cand.manifesto)
+        rows = np.flatnonzero(topology.interest_bits & np.uint64(mask))
+        return self._boost(cand, rows, MEDIA_BOOST * units * cand.credibility)
+
+    def _fire(self, tick, phase):
+        """Fires the events due at ``tick`` in ``phase``, marking the agents they touched dirty."""
+        fired = 0
+        while self.queue and (self.queue[0].tick, self.queue[0].phase) <= (tick, phase):
+            event = heapq.heappop(self.queue)
+            touched = getattr(self, f"_{event.kind}")(**event.params)
+            fired += 1
+            if event.every is not None and (event.until is None or event.tick + event.every < event.until):
+                heapq.heappush(self.queue, CampaignEvent(event.tick + event.every, event.phase, event.order, event.kind,
+                                                         event.params, event.every, event.until))
+            if not len(touched):
+                continue
+            self.fresh = True
+            self._wake(touched)
+            if self.model.propagation is None:
+                self._track()
+        return fired
+
+    def _load_network(self):
+        """Takes the neighbor structure of the model's current layer configuration."""
+        n = len(self.agents)
+        self.network = self.model.influence
+        self.indptr, self.indices = self.network.indptr, self.network.indices
+        self.degree = np.diff(self.indptr)
+        self.adjacency = sparse.csr_matrix((np.ones(len(self.indices)), self.indices, self.indptr), shape=(n, n))
+
+    def _wake(self, rows):
+        """Marks ``rows`` and their neighbors dirty."""
+        if len(rows) == len(self.everyone):
+            self.dirty[:] = True
+        elif self._few(rows):
+            self.dirty[rows] = True
+            self.dirty[gather_rows(self.indptr, self.indices, rows)[1]] = True
+        else:
+            woken = np.zeros(len(self.everyone))
+            woken[rows] = 1
+            self.dirty |= (self.adjacency @ woken) > 0
+            self.dirty[rows] = True
+
+    def _few(self, rows):
+        return self.degree[rows].sum() < GATHER_SHARE * len(self.indices)
+
+    def _spreading(self):
+        """Exposed and infected agents, the only ones whose misinformation can move."""
+        kernel = self.model.propagation
+        active = kernel.active if kernel is not None else self.active
+        state = self.model.store.state[active]
+        return active[(state == EXPOSED) | (state == INFECTED)]
+
+    def _sweep(self, rows, visit):
+        """Calls ``visit`` on ``rows`` in row order, adding the later neighbors of every agent infected after its visit.
+
+        That is the order agents.do("step") applies agent-level misinformation in,
+        where an agent can expose and infect agents further down the same tick.
+        Returns the visited rows.
+        """
+        indptr, indices, state = self.indptr, self.indices, self.model.store.state
+        heap = rows.tolist()
+        queued = set(heap)
+        visited = []
+        while heap:
+            i = heapq.heappop(heap)
+            visit(i)
+            visited.append(i)
+            if state[i] == INFECTED:
+                for j in indices[indptr[i]:indptr[i + 1]].tolist():
+                    if j > i and j not in queued:
+                        queued.add(j)
+                        heapq.heappush(heap, j)
+        return np.array(visited, dtype=np.int64)
+
+    def _track(self):
+        """Refreshes the non-susceptible agents that agent-level misinformation visits."""
+        self.active = np.flatnonzero(self.model.store.state != SUSCEPTIBLE)
+
+    def _update(self):
+        """Advances the dirty agents and the misinformation by one tick; returns the rows updated and changed."""
+        model, store = self.model, self.model.store
+        kernel, engine = model.propagation, model.engine
+        spreading = self._spreading()
+        live = len(spreading) > 0
+
+        if kernel is not None and live:
+            kernel.step()
+        # An agent whose misinformation state moves this tick reads a different slander penalty
+        dirty = self.dirty
+        dirty[spreading] = True
+        dirty[self._spreading()] = True
+        if engine is None:
+            if kernel is None and live:
+                # The agent engine runs agent-level misinformation inside each agent's step
+                dirty[self.active] = True
+            rows = self._sweep(np.flatnonzero(dirty), lambda i: self.agents[i].step())
+            # step only writes the next_* arrays, so these are still the values held at the start of the tick
+            opinions, turnout = store.opinions[rows], store.turnout[rows]
+            for i in rows.tolist():
+                self.agents[i].advance()
+            if kernel is None and live:
+                self._track()
+            new_opinions, new_turnout = store.opinions[rows], store.turnout[rows]
+        else:
+            if kernel is not None:
+                slander = kernel.slander_penalty()
+            else:
+                slander = np.zeros(len(self.agents))
+                if live:
+                    state, agents = store.state, self.agents
+
+                    def visit(i):
+                        if state[i] == SUSCEPTIBLE:
+                            return
+                        agent = agents[i]
+                        agent.step_misinformation()
+                        if agent.misinformation_state == "infected" and agent.infected_by:
+                            slander[i] = agent.infected_by.severity * SLANDER_PENALTY
+
+                    self._sweep(self.active, visit)
+                    self._track()
+                    dirty[self._spreading()] = True
+            rows = np.flatnonzero(dirty)
+            if engine.opinions is None:
+                engine.load_agents()
+            opinions, turnout = engine.opinions[rows], engine.turnout[rows]
+            if self._few(rows):
+                new_opinions = engine.next_opinions(engine.opinions, slander, rows=rows)
+                new_turnout = engine.next_turnout(engine.opinions, rows)
+            else:
+                new_opinions = engine.next_opinions(engine.opinions, slander)[rows]
+                new_turnout = engine.next_turnout(engine.opinions)[rows]
+            engine.opinions[rows] = new_opinions
+            engine.turnout[rows] = new_turnout
+            engine.ticks += 1
+
+        changed = rows[changed_rows(opinions, new_opinions, self.tolerance)]
+        self.fresh = self.fresh or live or changed_rows(opinions, new_opinions).any() or changed_rows(turnout, new_turnout).any()
+        self.dirty = np.zeros(len(self.agents), dtype=bool)
+        self._wake(changed)
+        self.dirty[spreading] = True
+        self.dirty[self._spreading()] = True
+        return len(rows), len(changed)
+
+    def _collect(self, count):
+        collector = self.model.datacollector
+        if self.fresh:
+            collector.collect(self.model)
+            self.fresh = False
+            count -= 1
+        if count:
+            collector.repeat(count)
+
+    def run(self, num_steps):
+        """Runs the model up to ``num_steps`` ticks along the scheduled events.
+
+        Every agent starts dirty, so the model may be stepped by other means between
+        runs. Returns one row per tick updated and one per stretch of quiet ticks
+        skipped, with the events fired and the number of agents updated and changed.
+        """
+        model = self.model
+        if self.network is not model.influence:
+            self._load_network()
+        self.dirty[:] = True
+        self._track()
+        self.fresh = True
+        log = []
+        while model.steps < num_steps:
+            tick = model.steps
+            fired = self._fire(tick, BEFORE_COLLECT)
+            due = bool(self.queue) and (self.queue[0].tick, self.queue[0].phase) <= (tick, AFTER_COLLECT)
+            if not due and not self.dirty.any() and not len(self._spreading()):
+                end = min(self.queue[0].tick, num_steps) if self.queue else num_steps
+                self._collect(end - tick)
+                model.steps = end
+                if model.engine is not None:
+                    model.engine.ticks += end - tick
+                log.append((tick, fired, 0, 0, 'quiet'))
+                continue
+            self._collect(1)
+            fired += self._fire(tick, AFTER_COLLECT)
+            updated, changed = self._update()
+            model.steps += 1
+            log.append((tick, fired, updated, changed, 'tick'))
+        return pd.DataFrame(log, columns=SCHEDULE_COLUMNS)
+
+def run_campaign(graph, plan, num_steps=None, tolerance=0.0, model_class=ElectionModel, **model_kwargs):
+    """Builds a model, schedules a plan (dict or JSON file) and runs it to ``num_steps`` or the plan's.
+
+    ``model_kwargs`` go to ``model_class``, e.g. ``engine``, ``propagation``,
+    ``rebuttal_enabled`` or ``seed``. Returns the collected rows and the model.
+    """
+    if isinstance(plan, str):
+        plan = load_plan(plan)
+    model = model_class(graph, **model_kwargs)
+    scheduler = CampaignScheduler(model, tolerance=tolerance)
+    scheduler.load(plan)
+    scheduler.run(num_steps if num_steps is not None else plan['num_steps'])
+    return model.datacollector.get_model_vars_dataframe(), model
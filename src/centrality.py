@@ -0,0 +1,256 @@
+import hashlib
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.loader import CACHE_DIR
+
+CENTRALITY_DIR = os.path.join(CACHE_DIR, "centrality")
+# Defaults for sampled betweenness: every estimate is within EPSILON of the exact
+# normalized value with probability at least 1 - DELTA
+EPSILON = 0.05
+DELTA = 0.1
+# Sources processed together in one sparse-dense product per BFS level
+BLOCK_SIZE = 256
+MAX_ITER = 100
+TOLERANCE = 1e-6
+METRICS = ['degree', 'betweenness', 'eigenvector']
+
+def structure_matrix(indptr, indices):
+    """Unweighted symmetric adjacency from CSR arrays, one entry per neighbor pair."""
+    n = len(indptr) - 1
+    return sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(n, n))
+
+def sample_size(n, epsilon=EPSILON, delta=DELTA):
+    """Number of sampled sources for an (epsilon, delta) betweenness estimate of n nodes.
+
+    Each source contributes a dependency in [0, 1] after normalization, so Hoeffding
+    plus a union bound over the n nodes gives ln(2n / delta) / (2 epsilon^2).
+    """
+    if n == 0:
+        return 0
+    return min(n, math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2)))
+
+def _blocks(sources, block_size):
+    for start in range(0, len(sources), block_size):
+        yield sources[start:start + block_size]
+
+def bfs_distances(adjacency, sources):
+    """(nodes x sources) hop distances from each source, -1 where unreachable.
+
+    Level-synchronous BFS: every level is one sparse product over all sources at once.
+    """
+    n = adjacency.shape[0]
+    columns = np.arange(len(sources))
+    dist = np.full((n, len(sources)), -1, dtype=np.int32)
+    dist[sources, columns] = 0
+    frontier = np.zeros((n, len(sources)))
+    frontier[sources, columns] = 1
+    level = 0
+    while True:
+        new = (adjacency @ frontier > 0) & (dist < 0)
+        if not new.any():
+            return dist
+        level += 1
+        dist[new] = level
+        frontier = new.astype(np.float64)
+
+def dependencies(adjacency, sources):
+    """Brandes dependencies summed over ``sources``, per node.
+
+    The forward pass counts shortest paths level by level, the backward pass pushes
+    (1 + delta) / sigma back one level at a time, both as sparse-dense products over
+    every source in the block. A source's dependency on itself is dropped.
+    """
+    n = adjacency.shape[0]
+    total = np.zeros(n)
+    for block in _blocks(np.asarray(sources), BLOCK_SIZE):
+        columns = np.arange(len(block))
+        dist = np.full((n, len(block)), -1, dtype=np.int32)
+        dist[block, columns] = 0
+        sigma = np.zeros((n, len(block)))
+        sigma[block, columns] = 1
+        frontier = sigma.copy()
+        level = 0
+        while True:
+            reach = adjacency @ frontier
+            new = (reach > 0) & (dist < 0)
+            if not new.any():
+                break
+            level += 1
+            dist[new] = level
+            frontier = np.where(new, reach, 0)
+            sigma += frontier
+
+        delta = np.zeros((n, len(block)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for d in range(level, 0, -1):
+                pushed = adjacency @ np.where(dist == d, (1 + delta) / sigma, 0)
+                delta += np.where(dist == d - 1, sigma * pushed, 0)
+        delta[block, columns] = 0
+        total += delta.sum(axis=1)
+    return total
+
+def power_iteration(adjacency, start=None, max_iter=MAX_ITER, tol=TOLERANCE):
+    """Eigenvector centrality by power iteration on (A + I), as networkx computes it.
+
+    ``start`` warm-starts the iteration, e.g. from the vector before a layer was
+    added. Returns the L2-normalized vector and the number of iterations used.
+    """
+    n = adjacency.shape[0]
+    x = np.ones(n) if start is None else np.asarray(start, dtype=np.float64).copy()
+    x /= x.sum()
+    for iteration in range(1, max_iter + 1):
+        last = x
+        x = last + adjacency @ last
+        norm = np.linalg.norm(x)
+        x = x / norm if norm else x
+        if np.abs(x - last).sum() < n * tol:
+            return x, iteration
+    raise RuntimeError(f"Eigenvector centrality did not converge in {max_iter} iterations")
+
+class CentralityIndex:
+    """Degree, sampled betweenness and eigenvector centrality on a CSR graph.
+
+    Built from the CSR arrays of CampusData (or a CampusTopology), so no networkx
+    traversal is involved. Results are cached on disk under a hash of the node ids,
+    the CSR structure and the sampling parameters, so reloading the same edge file
+    costs one hash. ``add_layer`` folds new edges in without starting over: degrees
+    are adjusted, the power iteration is warm-started, and only the sampled sources
+    whose shortest paths the new edges can change are re-traversed.
+    """
+    def __init__(self, node_ids, indptr, indices, epsilon=EPSILON, delta=DELTA, seed=0, cache_dir=CENTRALITY_DIR):
+        self.node_ids = list(node_ids)
+        self.epsilon = epsilon
+        self.delta = delta
+        self.seed = seed
+        self.cache_dir = cache_dir
+        n = len(self.node_ids)
+        self.sources = np.sort(np.random.default_rng(seed).choice(n, sample_size(n, epsilon, delta), replace=False))
+        self.adjacency = structure_matrix(indptr, indices)
+        self._load_or_compute()
+
+    @classmethod
+    def from_campus(cls, campus, layers=None, **kwargs):
+        """Index over the CampusData graph, optionally restricted to some edge layers."""
+        indptr, indices = campus.indptr, campus.indices
+        if layers is not None:
+            keep = np.isin(campus.layer_codes, [campus.layers.index(layer) for layer in layers])
+            rows = np.repeat(np.arange(len(campus.node_ids)), np.diff(indptr))[keep]
+            indptr = np.zeros(len(campus.node_ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=len(campus.node_ids)), out=indptr[1:])
+            indices = indices[keep]
+        return cls(campus.node_ids, indptr, indices, **kwargs)
+
+    @classmethod
+    def from_topology(cls, topology, **kwargs):
+        """Index over a CampusTopology graph, junior-senior layer included."""
+        indptr, indices = topology.neighbors()
+        return cls(topology.node_ids, indptr, indices, **kwargs)
+
+    def digest(self, adjacency=None):
+        """Cache key: node ids, CSR structure and sampling parameters."""
+        adjacency = self.adjacency if adjacency is None else adjacency
+        digest = hashlib.sha256(f"{self.epsilon}:{self.delta}:{self.seed}".encode())
+        digest.update('\0'.join(map(str, self.node_ids)).encode())
+        digest.update(np.ascontiguousarray(adjacency.indptr, dtype=np.int64).tobytes())
+        digest.update(np.ascontiguousarray(adjacency.indices, dtype=np.int64).tobytes())
+        return digest.hexdigest()[:16]
+
+    def _cache_path(self, adjacency=None):
+        return os.path.join(self.cache_dir, self.digest(adjacency) + ".npz") if self.cache_dir else None
+
+    def _load_or_compute(self, start=None):
+        path = self._cache_path()
+        if path and os.path.exists(path):
+            with np.load(path) as arrays:
+                self.dependency, self.eigenvector = arrays['dependency'], arrays['eigenvector']
+            return
+        self.dependency = dependencies(self.adjacency, self.sources)
+        self.eigenvector, _ = power_iteration(self.adjacency, start)
+        self._save()
+
+    def _save(self):
+        path = self._cache_path()
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.savez(path, dependency=self.dependency, eigenvector=self.eigenvector)
+
+    def add_layer(self, pairs):
+        """Adds the (u, v) node id pairs of a new layer and updates every metric.
+
+        Pairs that are already neighbors leave the unweighted structure unchanged.
+        A sampled source s is re-traversed only if some new edge (u, v) has
+        d(s, u) != d(s, v); otherwise that edge lies on none of its shortest paths.
+        """
+        index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        pairs = np.array([(index[u], index[v]) for u, v in pairs], dtype=np.int64).reshape(-1, 2)
+        pairs = pairs[np.asarray(self.adjacency[pairs[:, 0], pairs[:, 1]]).ravel() == 0]
+        if len(pairs) == 0:
+            return
+        n = len(self.node_ids)
+        rows = np.concatenate([pairs[:, 0], pairs[:, 1][pairs[:, 0] != pairs[:, 1]]])
+        cols = np.concatenate([pairs[:, 1], pairs[:, 0][pairs[:, 0] != pairs[:, 1]]])
+        added = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+        old = self.adjacency
+        new = (old + added).tocsr()
+        new.data[:] = 1
+        new.sort_indices()
+
+        endpoints = np.unique(pairs)
+        cached = self._cache_path(new)
+        if cached and os.path.exists(cached):
+            self.adjacency = new
+            self._load_or_compute()
+            return
+        if len(endpoints) < len(self.sources):
+            # Distances from the endpoints are distances to them, since the graph is undirected
+            to_endpoints = np.concatenate([bfs_distances(old, block)[self.sources] for block in _blocks(endpoints, BLOCK_SIZE)], axis=1)
+            where = np.searchsorted(endpoints, pairs)
+            affected = np.zeros(len(self.sources), dtype=bool)
+            for block in _blocks(where, BLOCK_SIZE):
+                affected |= (to_endpoints[:, block[:, 0]] != to_endpoints[:, block[:, 1]]).any(axis=1)
+            sources = self.sources[affected]
+            self.dependency = self.dependency - dependencies(old, sources) + dependencies(new, sources)
+        else:
+            self.dependency = dependencies(new, self.sources)
+        self.adjacency = new
+        self.eigenvector, _ = power_iteration(new, self.eigenvector)
+        self._save()
+
+    def degree(self):
+        """Degree centrality, counting a self-loop twice as networkx does."""
+        n = len(self.node_ids)
+        degree = np.diff(self.adjacency.indptr) + self.adjacency.diagonal()
+        return degree / (n - 1) if n > 1 else np.ones(n)
+
+    def betweenness(self):
+        """Normalized betweenness, exact when every node is a sampled source.
+
+        Scaled like ``nx.betweenness_centrality(G, k=...)``, which estimates the
+        sampled nodes from k - 1 sources and the others from k.
+        """
+        n, k = len(self.node_ids), len(self.sources)
+        if n <= 2:
+            return np.zeros(n)
+        scale = np.full(n, 1 / (k * (n - 2)))
+        if k < n:
+            scale[self.sources] = 1 / ((k - 1) * (n - 2)) if k > 1 else np.nan
+        else:
+            scale[:] = 1 / ((n - 1) * (n - 2))
+        return self.dependency * scale
+
+    def frame(self):
+        """Every metric as a DataFrame indexed by node id."""
+        return pd.DataFrame({'degree': self.degree(), 'betweenness': self.betweenness(), 'eigenvector': self.eigenvector},
+                            index=pd.Index(self.node_ids, name='node_id'))
+
+    def top(self, metric, k=10):
+        """The k highest-scoring (node id, value) pairs for one of METRICS."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        values = self.frame()[metric]
+        return list(values.nlargest(k).items())
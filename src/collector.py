@@ -0,0 +1,185 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.propagation import INFECTED, STATE_NAMES
+
+# Aggregates reduced from the state arrays on every collect
+AGGREGATES = ['states', 'opinion', 'turnout']
+DEFAULT_CAPACITY = 64
+
+def state_array(model):
+    """Misinformation state code per agent, in topology order."""
+    return model.store.state
+
+def opinion_array(model):
+    """(agents x candidates) opinion matrix in topology order and ``model.candidates`` order.
+
+    All NaN before the manifestos are released.
+    """
+    if model.engine is not None and model.engine.opinions is not None:
+        return model.engine.opinions
+    return model.store.opinions
+
+def turnout_array(model):
+    """Turnout propensity per agent, in topology order."""
+    if model.engine is not None and model.engine.turnout is not None:
+        return model.engine.turnout
+    return model.store.turnout
+
+def opinion_frame(model):
+    """Final opinions as a tidy (agent_id, post, candidate, opinion_score) DataFrame."""
+    candidates = [cand for post in model.candidates_by_post for cand in model.candidates_by_post[post]]
+    columns = [model.candidates.index(cand) for cand in candidates]
+    opinions = opinion_array(model)[:, columns]
+    num_agents, num_candidates = opinions.shape
+    return pd.DataFrame({
+        'agent_id': np.repeat(np.asarray(model.topology.node_ids, dtype=object), num_candidates),
+        'post': np.tile(np.asarray([cand.post for cand in candidates], dtype=object), num_agents),
+        'candidate': np.tile(np.asarray([cand.id for cand in candidates], dtype=object), num_agents),
+        'opinion_score': opinions.ravel(),
+    })
+
+class ArrayCollector:
+    """Columnar replacement for mesa's DataCollector on ElectionModel.
+
+    Every ``collect`` reduces the model's state arrays to one row of aggregates:
+    the ``Infected`` count, counts per misinformation state, the mean opinion per
+    candidate, the mean turnout propensity, and for each ``group_by`` node
+    attribute (e.g. ``hostel``, ``micro_community``) the infected count and mean
+    opinion per group. Rows go into a preallocated array. With ``parquet_dir`` a
+    full buffer is written out as ``chunk_NNNNN.parquet`` and reused, so memory
+    stays flat however long the run; otherwise the buffer doubles when full.
+    """
+    def __init__(self, model, aggregates=AGGREGATES, group_by=(), capacity=DEFAULT_CAPACITY, parquet_dir=None):
+        unknown = set(aggregates) - set(AGGREGATES)
+        if unknown:
+            raise ValueError(f"Unknown aggregates: {sorted(unknown)}")
+        self.options = dict(aggregates=list(aggregates), group_by=list(group_by), capacity=capacity, parquet_dir=parquet_dir)
+        self.aggregates = list(aggregates)
+        self.parquet_dir = parquet_dir
+        self.candidate_ids = [cand.id for cand in model.candidates]
+
+        columns = ['Infected']
+        if 'states' in self.aggregates:
+            columns += [f"state.{name}" for name in STATE_NAMES]
+        if 'opinion' in self.aggregates:
+            columns += [f"opinion.{cand_id}" for cand_id in self.candidate_ids]
+        if 'turnout' in self.aggregates:
+            columns += ['turnout']
+
+        # Group codes per node attribute, factorized once
+        self.groups = []
+        for attribute in group_by:
+            codes, names = pd.factorize(pd.Series(model.topology.node_attribute(attribute), dtype=object))
+            sizes = np.bincount(codes[codes >= 0], minlength=len(names))
+            self.groups.append((attribute, codes, names, sizes))
+            columns += [f"{attribute}={name}.infected" for name in names]
+            if 'opinion' in self.aggregates:
+                columns += [f"{attribute}={name}.opinion.{cand_id}" for name in names for cand_id in self.candidate_ids]
+        self.columns = columns
+        self.count_columns = [c for c in columns if c == 'Infected' or c.startswith('state.') or c.endswith('.infected')]
+
+        self.data = np.empty((capacity, len(columns)))
+        self.steps = np.empty(capacity, dtype=np.int64)
+        self.rows = 0
+        self.collected = 0
+        self.chunks = []
+        # Most recently collected row, which repeat appends again
+        self.last = None
+        if parquet_dir:
+            os.makedirs(parquet_dir, exist_ok=True)
+
+    def _append(self, row):
+        if self.rows == len(self.data):
+            if self.parquet_dir:
+                self.flush()
+            else:
+                self.data = np.concatenate([self.data, np.empty_like(self.data)])
+                self.steps = np.concatenate([self.steps, np.empty_like(self.steps)])
+        self.data[self.rows] = row
+        self.steps[self.rows] = self.collected
+        self.last = row
+        self.rows += 1
+        self.collected += 1
+
+    def collect(self, model):
+        """Appends one row of aggregates for the model's current state."""
+        states = state_array(model)
+        infected = states == INFECTED
+        values = [np.array([np.count_nonzero(infected)], dtype=np.float64)]
+        if 'states' in self.aggregates:
+            values.append(np.bincount(states, minlength=len(STATE_NAMES)).astype(np.float64))
+        opinions = opinion_array(model) if 'opinion' in self.aggregates else None
+        if opinions is not None:
+            values.append(opinions.mean(axis=0) if len(opinions) else np.full(len(self.candidate_ids), np.nan))
+        if 'turnout' in self.aggregates:
+            turnout = turnout_array(model)
+            values.append(np.array([turnout.mean() if len(turnout) else np.nan]))
+
+        for attribute, codes, names, sizes in self.groups:
+            grouped = codes >= 0
+            values.append(np.bincount(codes[grouped & infected], minlength=len(names)).astype(np.float64))
+            if opinions is not None:
+                sums = np.stack([np.bincount(codes[grouped], weights=opinions[grouped, k], minlength=len(names))
+                                 for k in range(len(self.candidate_ids))], axis=1)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    values.append((sums / sizes[:, None]).ravel())
+
+        self._append(np.concatenate(values))
+
+    def repeat(self, count):
+        """Appends ``count`` copies of the last collected row, for ticks on which the model did not change."""
+        if self.last is None:
+            raise ValueError("repeat needs a row collected first")
+        for _ in range(count):
+            self._append(self.last)
+
+    def skip(self, count):
+        """Advances the step counter past ``count`` ticks that were not collected."""
+        self.collected += count
+
+    def _frame(self, rows, steps):
+        df = pd.DataFrame(rows, columns=self.columns, index=pd.Index(steps, name='step'))
+        return df.astype({column: np.int64 for column in self.count_columns})
+
+    def flush(self):
+        """Writes the buffered rows to the next Parquet chunk; a no-op without ``parquet_dir``."""
+        if not self.parquet_dir or self.rows == 0:
+            return
+        path = os.path.join(self.parquet_dir, f"chunk_{len(self.chunks):05d}.parquet")
+        self._frame(self.data[:self.rows], self.steps[:self.rows]).to_parquet(path)
+        self.chunks.append(path)
+        self.rows = 0
+
+    def state(self):
+        """Copy of the collected rows and options, for ModelSnapshot."""
+        return {'class': type(self), 'options': dict(self.options), 'data': self.data[:self.rows].copy(),
+                'steps': self.steps[:self.rows].copy(), 'collected': self.collected, 'chunks': list(self.chunks)}
+
+    @classmethod
+    def from_state(cls, model, state):
+        """Rebuilds a collector for ``model`` holding the rows of ``state``.
+
+        Chunks already streamed are shared with the original; give a fork its own
+        ``parquet_dir`` before it streams more.
+        """
+        collector = state['class'](model, **state['options'])
+        rows = len(state['data'])
+        if rows > len(collector.data):
+            collector.data = np.empty((rows, len(collector.columns)))
+            collector.steps = np.empty(rows, dtype=np.int64)
+        collector.data[:rows] = state['data']
+        collector.steps[:rows] = state['steps']
+        collector.rows = rows
+        collector.collected = state['collected']
+        collector.last = collector.data[rows - 1].copy() if rows else None
+        collector.chunks = list(state['chunks'])
+        return collector
+
+    def get_model_vars_dataframe(self):
+        """Every collected row, one per step, including rows already streamed to Parquet."""
+        frames = [pd.read_parquet(path) for path in self.chunks]
+        frames.append(self._frame(self.data[:self.rows], self.steps[:self.rows]))
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.sparse.linalg import spsolve
+
+from src.collector import opinion_array, state_array
+from src.engine import VectorizedOpinionEngine
+from src.propagation import EXPOSED, INFECTED
+
+# Largest opinion change per tick at which the opinions count as settled
+TOLERANCE = 1e-6
+RESIDUAL_COLUMNS = ['step', 'max_change', 'mean_change', 'transitions', 'mode']
+
+def transition_matrix(engine):
+    """Row-stochastic M with next opinions = M @ opinions while no one is slandered."""
+    active = engine.total_weight > 0
+    scale = np.where(active, engine.influence_factor / np.where(active, engine.total_weight, 1), 0)
+    keep = np.where(active, 1 - engine.influence_factor, 1.0)
+    return (sparse.diags(scale) @ engine.influence + sparse.diags(keep)).tocsr()
+
+def matrix_power_apply(matrix, power, vectors):
+    """``matrix ** power @ vectors`` by repeated squaring of a dense copy of ``matrix``."""
+    base = matrix.toarray() if sparse.issparse(matrix) else np.asarray(matrix)
+    result = vectors
+    while power:
+        if power & 1:
+            result = base @ result
+        power >>= 1
+        if power:
+            base = base @ base
+    return result
+
+def equilibrium(matrix, vectors):
+    """Limit of ``matrix ** t @ vectors`` as t grows, from one sparse linear solve.
+
+    Every connected component of the lazy averaging converges to the average of its
+    opinions weighted by the stationary distribution pi of ``matrix``. pi is found by
+    fixing it to 1 at one reference agent per component and solving
+    pi (I - M) = 0 for the rest.
+    """
+    n = matrix.shape[0]
+    num_components, labels = csgraph.connected_components(matrix, directed=False)
+    reference = np.zeros(n, dtype=bool)
+    reference[np.unique(labels, return_index=True)[1]] = True
+    rest = ~reference
+    pi = np.ones(n)
+    if rest.any():
+        laplacian = (sparse.identity(n, format='csr') - matrix).tocsc()
+        system = laplacian[rest][:, rest].T.tocsc()
+        rhs = -np.asarray(laplacian[reference][:, rest].sum(axis=0)).ravel()
+        pi[rest] = spsolve(system, rhs)
+    pi /= np.bincount(labels, weights=pi, minlength=num_components)[labels]
+    weighted = np.stack([np.bincount(labels, weights=pi * column, minlength=num_components) for column in vectors.T], axis=1)
+    return weighted[labels]
+
+def linear_regime(model):
+    """True when the next ticks are pure opinion averaging.
+
+    That holds once no agent is exposed or infected (no slander penalty, no random
+    draws) and the deal market is settled (no more offers). It says nothing
+    about whether the opinions have settled.
+    """
+    states = state_array(model)
+    if np.any((states == EXPOSED) | (states == INFECTED)):
+        return False
+    return model.market.settled()
+
+def fast_forward(model, ticks, collect=True, limit=False, tolerance=TOLERANCE):
+    """Advances a model in the linear regime by ``ticks`` ticks without stepping its agents.
+
+    With ``collect=True`` every skipped tick is still collected and the result is
+    exactly what ``model.step`` would give; only the engine's array update runs.
+    Otherwise the jump is closed-form for the linear engine: repeated squaring of
+    the transition matrix when that is cheaper than ``ticks`` sparse products.
+    With ``limit=True`` the opinions go straight to their equilibrium instead,
+    but only if every opinion is already within ``tolerance`` of it; the
+    averaging never moves an opinion away from its limit, so no tick of the
+    horizon can then be further off. Returns True when the limit was taken.
+    """
+    engine = model.engine
+    if engine is None:
+        raise ValueError("fast_forward needs a model built with engine='vectorized'")
+    if engine.opinions is None:
+        raise ValueError("fast_forward needs the manifestos to be released first")
+    if ticks <= 0:
+        return False
+    closed_form = not collect and type(engine) is VectorizedOpinionEngine
+    limited = False
+    if closed_form:
+        matrix = transition_matrix(engine)
+        if limit:
+            target = equilibrium(matrix, engine.opinions)
+            limited = np.abs(engine.opinions - target).max() <= tolerance
+        if limited:
+            previous = opinions = target
+        else:
+            n = matrix.shape[0]
+            squaring = np.log2(ticks) * n ** 3 < ticks * matrix.nnz * engine.opinions.shape[1]
+            previous = engine.opinions
+            if squaring:
+                previous = matrix_power_apply(matrix, ticks - 1, previous)
+            else:
+                for _ in range(ticks - 1):
+                    previous = matrix @ previous
+            opinions = matrix @ previous
+        model.datacollector.skip(ticks)
+        engine.turnout = engine.next_turnout(previous)
+        engine.opinions = opinions
+    else:
+        no_slander = np.zeros(len(engine.agents))
+        for _ in range(ticks):
+            if collect:
+                model.datacollector.collect(model)
+            else:
+                model.datacollector.skip(1)
+            previous = engine.opinions
+            engine.opinions = engine.next_opinions(previous, no_slander)
+            engine.turnout = engine.next_turnout(previous)
+    engine.ticks += ticks
+    model.steps += ticks
+    engine.sync_agents()
+    return limited
+
+def run_adaptive(model, num_steps, events=None, tolerance=TOLERANCE, stop_early=False, collect=True):
+    """Steps ``model`` up to ``num_steps`` ticks, skipping ahead once it is quiescent.
+
+    ``events`` maps a tick to callables applied to the model just before that
+    tick, as run_scenario drops the slander; a jump never passes an event. Each
+    tick's largest and mean opinion change and number of misinformation state
+    transitions are recorded. Once the model is in the linear regime (see
+    linear_regime) and has a vectorized engine, it fast-forwards to the next event
+    or ``num_steps``; with ``collect=False`` and no event left, the jump goes
+    straight to the equilibrium once every opinion is within ``tolerance`` of
+    it (mode 'limit'), and otherwise covers the exact number of ticks. ``stop_early=True``
+    instead stops there, with either engine, when no event remains, leaving
+    ``model.steps`` short of ``num_steps``.
+
+    Returns the residuals as a DataFrame, one row per stepped tick plus one per jump.
+    """
+    events = events or {}
+    rows = []
+    # The agent engine updates opinions in place and deals boost them in place on
+    # either engine, so those ticks copy them into a reused buffer; otherwise the
+    # vectorized engine leaves the previous tick's array intact. States are only
+    # copied while misinformation is live, as nothing else moves them.
+    opinion_buffer = None
+    state_buffer = np.empty_like(state_array(model))
+    while model.steps < num_steps:
+        tick = model.steps
+        for event in events.get(tick, ()):
+            event(model)
+        opinions, states = opinion_array(model), state_array(model)
+        if model.engine is None or not model.market.settled():
+            if opinion_buffer is None or opinion_buffer.shape != opinions.shape:
+                opinion_buffer = np.empty_like(opinions)
+            np.copyto(opinion_buffer, opinions)
+            opinions = opinion_buffer
+        live = bool(np.any((states == EXPOSED) | (states == INFECTED)))
+        if live:
+            np.copyto(state_buffer, states)
+        model.step()
+        change = np.abs(opinion_array(model) - opinions)
+        change = change[~np.isnan(change)]
+        max_change = float(change.max()) if change.size else 0.0
+        transitions = int(np.count_nonzero(state_array(model) != state_buffer)) if live else 0
+        rows.append((tick, max_change, float(change.mean()) if change.size else 0.0, transitions, 'step'))
+
+        # Nothing to skip before the manifestos are released
+        if not change.size or transitions or not linear_regime(model):
+            continue
+        upcoming = [t for t in events if t > tick]
+        if stop_early and not upcoming and max_change <= tolerance:
+            break
+        if model.engine is None:
+            continue
+        target = min(upcoming + [num_steps])
+        if target - model.steps > 0:
+            start = model.steps
+            # Every jump hands the engine new arrays, so the current one stays as it is
+            before = opinion_array(model)
+            limited = fast_forward(model, target - model.steps, collect=collect, limit=not upcoming, tolerance=tolerance)
+            moved = np.abs(opinion_array(model) - before)
+            rows.append((start, float(moved.max()), float(moved.mean()), 0, 'limit' if limited else 'fast-forward'))
+    return pd.DataFrame(rows, columns=RESIDUAL_COLUMNS)
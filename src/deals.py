@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+
+from src.agent_store import ALIASED, NO_NEXT, OWN_NEXT
+from src.data_schema import Deal
+
+# Agents whose power_broker_score is above this are power brokers
+BROKER_THRESHOLD = 0.9
+# Offered payoffs are uniform on this range; a broker takes an offer paying more than
+# ACCEPTANCE_THRESHOLD
+PAYOFF_RANGE = (0.4, 0.8)
+ACCEPTANCE_THRESHOLD = 0.5
+# Deal ids are drawn uniformly from this range; they need not be unique
+DEAL_ID_RANGE = (1000, 10000)
+# Opinion boost of an accepted deal for the proposer; with alliances its allies get the
+# boost scaled by the proposer's alliance_compatibility with them
+DEAL_BOOST = 0.2
+# Media units an accepted deal costs the proposer, out of Candidate.media_assets, when budgeted
+DEAL_COST = 1
+LEDGER_COLUMNS = ['offer', 'deal_id', 'tick', 'broker', 'candidate', 'payoff', 'status']
+DEFAULT_CAPACITY = 256
+
+def deal_boosts(candidates, alliances=False):
+    """(candidates x candidates) opinion boost of a deal with row candidate for every column candidate."""
+    boosts = np.diag(np.full(len(candidates), DEAL_BOOST))
+    if not alliances:
+        return boosts
+    columns = {cand.id: k for k, cand in enumerate(candidates)}
+    for k, cand in enumerate(candidates):
+        for ally, compatibility in cand.alliance_compatibility.items():
+            if ally in columns and ally != cand.id:
+                boosts[k, columns[ally]] = DEAL_BOOST * compatibility
+    return boosts
+
+def offer_round(rng, brokers, num_candidates, remaining=None):
+    """Draws one offer for each open broker and decides which are accepted.
+
+    ``brokers`` are the open brokers' rows in row order. Each broker is offered a
+    deal by a uniformly picked candidate, with a deal id from DEAL_ID_RANGE and a
+    uniform payoff; the three are drawn in bulk in that order, as the per-agent
+    loop drew them. Given ``remaining``, the media budget left per candidate, only
+    candidates that can afford a deal propose, and a candidate's acceptable offers
+    are accepted in broker order while its budget lasts. Returns the proposers'
+    columns, the deal ids, the payoffs and the accepted mask.
+    """
+    eligible = np.arange(num_candidates) if remaining is None else np.flatnonzero(remaining >= DEAL_COST)
+    if not len(eligible):
+        # No candidate can afford a deal: no offers and no draws
+        return brokers[:0], brokers[:0], np.empty(0), np.zeros(0, dtype=bool)
+    choices = eligible[rng.integers(len(eligible), size=len(brokers))]
+    deal_ids = rng.integers(*DEAL_ID_RANGE, size=len(brokers))
+    payoffs = rng.uniform(*PAYOFF_RANGE, size=len(brokers))
+    accepted = payoffs > ACCEPTANCE_THRESHOLD
+    if remaining is not None and DEAL_COST > 0:
+        # Rank of each acceptable offer among its proposer's, in broker order
+        offers = np.flatnonzero(accepted)
+        proposers = choices[offers]
+        order = np.argsort(proposers, kind='stable')
+        ranked = proposers[order]
+        ranks = np.empty(len(offers), dtype=np.int64)
+        ranks[order] = np.arange(len(offers)) - np.searchsorted(ranked, ranked)
+        accepted[offers[ranks >= remaining[proposers] // DEAL_COST]] = False
+    return choices, deal_ids, payoffs, accepted
+
+class DealLedger:
+    """Columnar log of every offer made in a DealMarket.
+
+    An offer is keyed by its position in the log, which is unique within a run;
+    ``deal_id`` is the drawn id the resulting Deal carries. Brokers and candidates
+    are stored as row and column indexes; the buffers double when full.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.deal_id = np.empty(capacity, dtype=np.int16)
+        self.tick = np.empty(capacity, dtype=np.int32)
+        self.broker = np.empty(capacity, dtype=np.int32)
+        self.candidate = np.empty(capacity, dtype=np.int16)
+        self.payoff = np.empty(capacity)
+        self.accepted = np.empty(capacity, dtype=bool)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def columns(self):
+        return {'deal_id': self.deal_id, 'tick': self.tick, 'broker': self.broker, 'candidate': self.candidate,
+                'payoff': self.payoff, 'accepted': self.accepted}
+
+    def append(self, tick, brokers, candidates, deal_ids, payoffs, accepted):
+        """Logs a batch of offers; returns their positions."""
+        start, end = self.size, self.size + len(brokers)
+        if end > len(self.tick):
+            capacity = max(end, 2 * len(self.tick))
+            for name, column in self.columns().items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:start] = column[:start]
+                setattr(self, name, grown)
+        self.deal_id[start:end] = deal_ids
+        self.tick[start:end] = tick
+        self.broker[start:end] = brokers
+        self.candidate[start:end] = candidates
+        self.payoff[start:end] = payoffs
+        self.accepted[start:end] = accepted
+        self.size = end
+        return np.arange(start, end)
+
+    def deal(self, offer, node_ids, candidate_ids):
+        """The logged offer at position ``offer`` as a Deal."""
+        return Deal(id=f"d_{self.deal_id[offer]}", proposer_id=candidate_ids[self.candidate[offer]],
+                    target_id=node_ids[self.broker[offer]], status="accepted" if self.accepted[offer] else "rejected",
+                    payoff={'proposer': 0, 'target': float(self.payoff[offer])})
+
+    def frame(self, node_ids, candidate_ids):
+        """Every logged offer as a DataFrame with node and candidate ids."""
+        n = self.size
+        return pd.DataFrame({
+            'offer': np.arange(n),
+            'deal_id': self.deal_id[:n],
+            'tick': self.tick[:n],
+            'broker': np.asarray(node_ids, dtype=object)[self.broker[:n]],
+            'candidate': np.asarray(candidate_ids, dtype=object)[self.candidate[:n]],
+            'payoff': self.payoff[:n],
+            'status': np.where(self.accepted[:n], 'accepted', 'rejected'),
+        }, columns=LEDGER_COLUMNS)
+
+    def state(self):
+        """Copy of the logged offers, for ModelSnapshot."""
+        return {name: column[:self.size].copy() for name, column in self.columns().items()}
+
+    @classmethod
+    def from_state(cls, state):
+        ledger = cls(max(DEFAULT_CAPACITY, len(state['tick'])))
+        ledger.append(state['tick'], state['broker'], state['candidate'], state['deal_id'], state['payoff'], state['accepted'])
+        return ledger
+
+class DealMarket:
+    """Power-broker deal market of an ElectionModel, run as batch array operations.
+
+    Brokers are kept in an index sorted by descending power_broker_score, so the
+    brokers above any threshold are a prefix of it. Each round every open broker
+    (one without a deal) gets one offer, see offer_round; offers are logged in a
+    DealLedger and the deal each agent holds is its ledger position in
+    ``store.deal``. An accepted deal boosts the broker's opinion of the proposer
+    by DEAL_BOOST.
+
+    Both extensions are opt-in. With ``budget=True`` an accepted deal costs the
+    proposer DEAL_COST units of its ``media_assets``, and only candidates that can
+    still afford one make offers. With ``alliances=True`` a deal also boosts the
+    proposer's allies, see deal_boosts. ``media_spent`` is the candidates' media
+    budget spent so far, by budgeted deals and by the CampaignScheduler's posts.
+    """
+    def __init__(self, model, budget=False, alliances=False):
+        self.model = model
+        self.budget = budget
+        self.alliances = alliances
+        self.ledger = DealLedger()
+        self.media_spent = np.zeros(len(model.candidates), dtype=np.int64)
+        self.boosts = deal_boosts(model.candidates, alliances)
+        self.index()
+
+    def options(self):
+        """Constructor options, reused when forking the model from a ModelSnapshot."""
+        return dict(budget=self.budget, alliances=self.alliances)
+
+    def index(self):
+        """(Re)builds the broker index from the store's power_broker_score."""
+        scores = self.model.store.power_broker_score
+        self.order = np.argsort(-scores, kind='stable')
+        self.sorted_scores = scores[self.order]
+        self.brokers = np.sort(self.top(BROKER_THRESHOLD))
+
+    def top(self, threshold):
+        """Rows of the agents scoring above ``threshold``, highest score first."""
+        return self.order[:np.searchsorted(-self.sorted_scores, -threshold, side='left')]
+
+    def remaining(self):
+        """Media budget left per candidate, in model.candidates order."""
+        return np.array([cand.media_assets for cand in self.model.candidates], dtype=np.int64) - self.media_spent
+
+    def open_brokers(self):
+        """Rows of the brokers without a deal, in row order."""
+        return self.brokers[self.model.store.deal[self.brokers] < 0]
+
+    def settled(self):
+        """True when no further offer can be made: every broker has a deal or, budgeted, no candidate can afford one."""
+        if self.budget and not np.any(self.remaining() >= DEAL_COST):
+            return True
+        return not len(self.open_brokers())
+
+    def propose(self, tick):
+        """Runs one round of offers, logged at ``tick``; returns the rows of the brokers that took a deal."""
+        model, store = self.model, self.model.store
+        brokers = self.open_brokers()
+        remaining = self.remaining() if self.budget else None
+        choices, deal_ids, payoffs, accepted = offer_round(model.streams['deals'], brokers, len(model.candidates), remaining)
+        if not len(choices):
+            return brokers[:0]
+        offers = self.ledger.append(tick, brokers, choices, deal_ids, payoffs, accepted)
+        rows, columns = brokers[accepted], choices[accepted]
+        store.deal[rows] = offers[accepted]
+        if self.budget:
+            self.media_spent += DEAL_COST * np.bincount(columns, minlength=len(self.media_spent))
+        self.apply(rows, columns)
+        return rows
+
+    def apply(self, rows, columns):
+        """Applies the opinion boosts of deals taken by brokers ``rows`` from candidate ``columns``.
+
+        The vectorized engine boosts live opinions from its first tick on. The agent
+        engine boosts ``next_opinion``, which aliases the live opinion after the
+        first tick, so first-tick boosts are overwritten by the agents' step.
+        """
+        boosts = self.boosts[columns]
+        pairs, targets = np.nonzero(boosts)
+        rows, amounts = rows[pairs], boosts[pairs, targets]
+        engine = self.model.engine
+        if engine is not None:
+            engine.apply_deals(rows, targets, amounts)
+            return
+        store = self.model.store
+        fresh = np.unique(rows[store.next_state[rows] == NO_NEXT])
+        store.next_opinions[fresh] = store.opinions[fresh]
+        store.next_state[fresh] = OWN_NEXT
+        live = store.next_state[rows] == ALIASED
+        store.opinions[rows[live], targets[live]] = np.minimum(1.0, store.opinions[rows[live], targets[live]] + amounts[live])
+        rows, targets, amounts = rows[~live], targets[~live], amounts[~live]
+        store.next_opinions[rows, targets] = np.minimum(1.0, store.opinions[rows, targets] + amounts)
+
+    def deals_of(self, row):
+        """The deals agent ``row`` holds, as Deal objects."""
+        offer = self.model.store.deal[row]
+        if offer < 0:
+            return []
+        return [self.ledger.deal(offer, self.model.topology.node_ids, [cand.id for cand in self.model.candidates])]
+
+    def ledger_frame(self):
+        """Every offer made so far, with node and candidate ids."""
+        return self.ledger.frame(self.model.topology.node_ids, [cand.id for cand in self.model.candidates])
@@ -0,0 +1,123 @@
+import numpy as np
+
+from src.propagation import SLANDER_PENALTY, SUSCEPTIBLE
+
+# Defaults of the ModelParameters applied by StudentAgent.calculate_next_opinion
+JUNIOR_SENIOR_MULTIPLIER = 1.5
+ROLE_MULTIPLIER = 1.5
+DEFAULT_EDGE_WEIGHT = 0.1
+INFLUENCE_FACTOR = 0.1
+# Weight of enthusiasm in the turnout propensity; the baseline gets the rest
+TURNOUT_ELASTICITY = 0.2
+SLANDER_TARGET = 'cand_A'
+
+class VectorizedOpinionEngine:
+    """Runs the opinion and turnout updates of ElectionModel as array operations.
+
+    Opinions live in an (agents x candidates) matrix whose columns follow
+    ``model.candidates``. Misinformation is still handled per agent, in the same
+    order as ``agents.do("step")``, so random draws match the agent engine.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.agents = list(model.agents)
+        self.store = model.store
+        self.node_ids = model.topology.node_ids
+        self.index = model.topology.index
+        self.candidate_ids = [cand.id for cand in model.candidates]
+        self.columns = {cand_id: k for k, cand_id in enumerate(self.candidate_ids)}
+
+        store, parameters = self.store, model.parameters
+        self.influence_factor = parameters.influence_factor
+        self.turnout_elasticity = parameters.turnout_elasticity
+        self.load_network()
+        self.turnout_boost = np.where(store.is_ssms_winner | store.is_mess_rep | store.is_amc_member, 1.2, 1.0)
+        self.baseline_turnout = store.baseline_turnout
+        self.opinions = None
+        self.turnout = None
+        self.ticks = 0
+
+    def load_network(self):
+        """Takes the model's influence matrix for its current layer configuration."""
+        self.influence = self.model.influence
+        self.total_weight = np.asarray(self.influence.sum(axis=1)).ravel()
+        self.has_neighbors = np.diff(self.influence.indptr) > 0
+
+    def load_agents(self):
+        """Takes the agents' current opinions and turnout from the model's AgentStore."""
+        self.opinions = self.store.opinions
+        self.turnout = self.store.turnout
+
+    def sync_agents(self):
+        """Hands the engine's arrays back to the AgentStore the agents read from."""
+        self.store.opinions = self.opinions
+        self.store.turnout = self.turnout
+
+    def apply_deals(self, rows, columns, amounts):
+        """Boosts the opinions at (``rows``, ``columns``) by ``amounts``, capped at 1.
+
+        In the agent engine deal boosts are written to ``next_opinion``, which only
+        aliases the live opinion after the first tick, so first-tick boosts are lost.
+        """
+        if self.ticks == 0:
+            return
+        self.opinions[rows, columns] = np.minimum(1.0, self.opinions[rows, columns] + amounts)
+
+    def next_opinions(self, opinions, slander, influence_factor=None, rows=None):
+        """Weighted neighbor averaging followed by the slander penalty.
+
+        ``influence_factor`` can differ from the model's, e.g. for one BatchSimulation
+        replica. With ``rows`` only those agents' next opinions are computed, from their
+        CSR rows alone; the values are the same as the matching rows of the full update.
+        """
+        influence, total_weight, has_neighbors, own = self.influence, self.total_weight, self.has_neighbors, opinions
+        if rows is not None:
+            influence, total_weight, has_neighbors = influence[rows], total_weight[rows], has_neighbors[rows]
+            own, slander = opinions[rows], slander[rows]
+        next_opinions = own.copy()
+        active = total_weight > 0
+        neighbor_avg = influence @ opinions
+        factor = self.influence_factor if influence_factor is None else influence_factor
+        next_opinions[active] = ((1 - factor) * own[active]
+                                 + factor * neighbor_avg[active] / total_weight[active, None])
+
+        target = self.columns.get(SLANDER_TARGET)
+        if target is not None:
+            # Agents without neighbors return before the slander penalty in the agent engine
+            slandered = (slander > 0) & has_neighbors
+            next_opinions[slandered, target] = np.maximum(0, next_opinions[slandered, target] - slander[slandered])
+        return next_opinions
+
+    def next_turnout(self, opinions, rows=None):
+        """Turnout propensity from the enthusiasm of the opinions held at the start of a tick, for ``rows`` or everyone."""
+        baseline, boost = self.baseline_turnout, self.turnout_boost
+        if rows is not None:
+            opinions, baseline, boost = opinions[rows], baseline[rows], boost[rows]
+        enthusiasm = np.abs(opinions - 0.5).sum(axis=1) / len(self.candidate_ids)
+        elasticity = self.turnout_elasticity
+        return np.clip(((1 - elasticity) * baseline + elasticity * enthusiasm * 2) * boost, 0, 1)
+
+    def step(self):
+        """Advances every agent by one tick."""
+        if self.opinions is None:
+            self.load_agents()
+
+        if self.model.propagation is not None:
+            slander = self.model.propagation.slander_penalty()
+        else:
+            slander = np.zeros(len(self.agents))
+            state = self.store.state
+            for i, agent in enumerate(self.agents):
+                # Read the live state: agents earlier in the loop can expose later ones
+                if state[i] == SUSCEPTIBLE:
+                    continue
+                agent.step_misinformation()
+                if agent.misinformation_state == "infected" and agent.infected_by:
+                    slander[i] = agent.infected_by.severity * SLANDER_PENALTY
+
+        opinions = self.opinions
+        next_opinions = self.next_opinions(opinions, slander)
+        self.turnout = self.next_turnout(opinions)
+        self.opinions = next_opinions
+        self.ticks += 1
+        self.sync_agents()
@@ -0,0 +1,200 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import List
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+STUDENTS_FILE = os.path.join(DATA_DIR, "students.csv")
+EDGES_FILE = os.path.join(DATA_DIR, "edges.csv")
+EDGES_PARQUET_FILE = os.path.join(DATA_DIR, "edges.parquet")
+CACHE_DIR = os.path.join(DATA_DIR, ".cache")
+LIST_COLUMNS = ['clubs', 'interests']
+# Bump when the cached layout changes so stale caches are ignored
+CACHE_VERSION = 1
+
+def file_digest(*paths):
+    """SHA-256 over the contents of the given files."""
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def parse_list_column(series):
+    """Parses a column of stringified lists such as "['Dance', 'Music']" without eval."""
+    return series.fillna('[]').astype(str).str.findall(r"'([^']*)'")
+
+@dataclass
+class CampusData:
+    """Columnar students table plus the edge list and CSR adjacency built from edges.csv.
+
+    ``edge_source``/``edge_target`` index into ``node_ids`` and keep every row of
+    edges.csv. The CSR arrays hold the collapsed undirected graph, where a later
+    row for the same pair overwrites an earlier one, as ``nx.Graph`` does.
+    """
+    students: pd.DataFrame
+    node_ids: np.ndarray
+    layers: List[str]
+    edge_source: np.ndarray
+    edge_target: np.ndarray
+    edge_layer: np.ndarray
+    edge_weight: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    weights: np.ndarray
+    layer_codes: np.ndarray
+
+    @property
+    def edges(self):
+        """edges.csv as a DataFrame."""
+        return pd.DataFrame({
+            'source': self.node_ids[self.edge_source],
+            'target': self.node_ids[self.edge_target],
+            'layer': np.asarray(self.layers, dtype=object)[self.edge_layer],
+            'weight': self.edge_weight,
+        })
+
+    def adjacency(self):
+        """Symmetric weighted adjacency as a scipy CSR matrix."""
+        n = len(self.node_ids)
+        return sparse.csr_matrix((self.weights, self.indices, self.indptr), shape=(n, n))
+
+    def to_graph(self):
+        """Builds the networkx graph in bulk, with the same nodes and edges as the row-by-row build."""
+        G = nx.Graph()
+        G.add_nodes_from(zip(self.students['id'], self.students.to_dict('records')))
+        G.add_nodes_from(self.node_ids[len(self.students):])
+
+        rows = np.repeat(np.arange(len(self.node_ids)), np.diff(self.indptr))
+        upper = rows <= self.indices
+        layers = np.asarray(self.layers, dtype=object)
+        G.add_edges_from(
+            (u, v, {'layer': layer, 'weight': weight})
+            for u, v, layer, weight in zip(
+                self.node_ids[rows[upper]].tolist(),
+                self.node_ids[self.indices[upper]].tolist(),
+                layers[self.layer_codes[upper]].tolist(),
+                self.weights[upper].tolist(),
+            )
+        )
+        return G
+
+def build_campus(students, edges):
+    """Builds CampusData from the raw students and edges frames."""
+    students = students.copy()
+    if students['id'].duplicated().any():
+        # Like repeated G.add_node calls: first position, last row's attributes
+        last = students.drop_duplicates('id', keep='last').set_index('id')
+        students = last.loc[pd.unique(students['id'])].reset_index()
+    for column in LIST_COLUMNS:
+        if column in students:
+            students[column] = parse_list_column(students[column])
+
+    # Factorize every id in one pass; students come first so their codes are their row positions
+    num_students, num_edges = len(students), len(edges)
+    codes, uniques = pd.factorize(pd.concat([students['id'], edges['source'], edges['target']], ignore_index=True))
+    source = codes[num_students:num_students + num_edges]
+    target = codes[num_students + num_edges:]
+    node_ids = np.asarray(uniques, dtype=object)
+    if len(node_ids) > num_students:
+        # Endpoints missing from students.csv become attribute-less nodes, ordered by
+        # first appearance row by row as G.add_edge would add them
+        first_seen = np.full(len(node_ids), np.iinfo(np.int64).max)
+        np.minimum.at(first_seen, source, 2 * np.arange(num_edges))
+        np.minimum.at(first_seen, target, 2 * np.arange(num_edges) + 1)
+        order = np.concatenate([np.arange(num_students), num_students + np.argsort(first_seen[num_students:], kind='stable')])
+        remap = np.empty_like(order)
+        remap[order] = np.arange(len(order))
+        node_ids, source, target = node_ids[order], remap[source], remap[target]
+    source, target = source.astype(np.int32), target.astype(np.int32)
+    layer_cat = pd.Categorical(edges['layer'])
+    layer = layer_cat.codes.astype(np.int8)
+    weight = edges['weight'].to_numpy(dtype=np.float64)
+
+    # Collapse duplicate pairs keeping the last row, then mirror into a symmetric CSR
+    n = len(node_ids)
+    lo, hi = np.minimum(source, target).astype(np.int64), np.maximum(source, target).astype(np.int64)
+    key = lo * n + hi
+    _, last = np.unique(key[::-1], return_index=True)
+    keep = len(key) - 1 - last
+    lo, hi, pair_layer, pair_weight = lo[keep], hi[keep], layer[keep], weight[keep]
+    mirror = lo != hi
+    rows = np.concatenate([lo, hi[mirror]])
+    cols = np.concatenate([hi, lo[mirror]])
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+    return CampusData(
+        students=students,
+        node_ids=node_ids,
+        layers=[str(name) for name in layer_cat.categories],
+        edge_source=source,
+        edge_target=target,
+        edge_layer=layer,
+        edge_weight=weight,
+        indptr=indptr,
+        indices=cols[order].astype(np.int32),
+        weights=np.concatenate([pair_weight, pair_weight[mirror]])[order],
+        layer_codes=np.concatenate([pair_layer, pair_layer[mirror]])[order],
+    )
+
+def _save_cache(campus, prefix):
+    os.makedirs(os.path.dirname(prefix), exist_ok=True)
+    campus.students.to_parquet(prefix + ".parquet", index=False)
+    np.savez(
+        prefix + ".npz",
+        node_ids=campus.node_ids.astype(str),
+        layers=np.asarray(campus.layers, dtype=str),
+        edge_source=campus.edge_source,
+        edge_target=campus.edge_target,
+        edge_layer=campus.edge_layer,
+        edge_weight=campus.edge_weight,
+        indptr=campus.indptr,
+        indices=campus.indices,
+        weights=campus.weights,
+        layer_codes=campus.layer_codes,
+    )
+
+def _load_cache(prefix):
+    students = pd.read_parquet(prefix + ".parquet")
+    for column in LIST_COLUMNS:
+        if column in students:
+            students[column] = students[column].map(list)
+    with np.load(prefix + ".npz") as arrays:
+        fields = {name: arrays[name] for name in arrays.files}
+    fields['node_ids'] = fields['node_ids'].astype(object)
+    fields['layers'] = fields['layers'].tolist()
+    return CampusData(students=students, **fields)
+
+def read_edges(path):
+    """Reads an edge table written as Parquet by regenerate_edges.py, or as CSV."""
+    if path.endswith('.parquet'):
+        edges = pd.read_parquet(path)
+        edges['layer'] = edges['layer'].astype(str)
+        return edges
+    return pd.read_csv(path, engine='pyarrow')
+
+def load_campus(students_path=STUDENTS_FILE, edges_path=None, cache_dir=CACHE_DIR, use_cache=True):
+    """Loads students.csv and the edge table, reusing a cache keyed on the files' hashes.
+
+    ``edges_path`` defaults to data/edges.parquet when present, else data/edges.csv.
+    """
+    if edges_path is None:
+        edges_path = EDGES_PARQUET_FILE if os.path.exists(EDGES_PARQUET_FILE) else EDGES_FILE
+    prefix = os.path.join(cache_dir, file_digest(students_path, edges_path)) if use_cache else None
+    if prefix and os.path.exists(prefix + ".npz") and os.path.exists(prefix + ".parquet"):
+        return _load_cache(prefix)
+
+    students = pd.read_csv(students_path)
+    edges = read_edges(edges_path)
+    campus = build_campus(students, edges)
+    if prefix:
+        _save_cache(campus, prefix)
+    return campus
@@ -1,156 +1,251 @@
 
+import numpy as np
 from mesa import Agent, Model
-from mesa.datacollection import DataCollector
-import networkx as nx
-import random
-from src.data_schema import Misinformation, Candidate, Deal
+from src.agent_store import ALIASED, NO_NEXT, OWN_NEXT, AgentStore, OpinionView, StoreField, memory_footprint
+from src.collector import ArrayCollector
+from src.data_schema import Misinformation, Candidate
+from src.deals import DealMarket
+from src.engine import VectorizedOpinionEngine
+from src.parameters import ModelParameters
+from src.propagation import EXPOSED, INFECTED, SLANDER_PENALTY, STATE_CODES, STATE_NAMES, SUSCEPTIBLE, MisinformationKernel
+from src.rng import RandomStreams
+from src.snapshot import ModelSnapshot
+from src.topology import CampusTopology
 
 class StudentAgent(Agent):
-    """An agent representing a student in the election simulation."""
-    def __init__(self, model, node_id, interests, turnout_propensity, slander_susceptibility, skepticism):
+    """An agent representing a student in the election simulation.
+
+    The agent is a view over row ``row`` of ``model.store``: every attribute below
+    reads and writes that row, and ``opinion``/``next_opinion`` are dict-like views
+    of it. The agent object itself is an ordinary mesa.Agent.
+    """
+
+    baseline_turnout_propensity = StoreField('baseline_turnout')
+    turnout_propensity = StoreField('turnout')
+    slander_susceptibility = StoreField('slander_susceptibility')
+    skepticism = StoreField('skepticism')
+    power_broker_score = StoreField('power_broker_score')
+    is_ssms_winner = StoreField('is_ssms_winner', bool)
+    is_mess_rep = StoreField('is_mess_rep', bool)
+    is_amc_member = StoreField('is_amc_member', bool)
+
+    def __init__(self, model, row):
         super().__init__(model)
-        self.node_id = node_id
-        self.interests = interests
-        self.baseline_turnout_propensity = turnout_propensity
-        self.turnout_propensity = turnout_propensity
-        self.slander_susceptibility = slander_susceptibility
-        self.skepticism = skepticism
-        self.is_ssms_winner = False
-        self.is_mess_rep = False
-        self.is_amc_member = False
-        self.misinformation_state = "susceptible"
-        self.infected_by = None
-        self.power_broker_score = random.random()
-        self.deals = []
-        self.opinion = {}
-        self.next_opinion = None
-        self.next_turnout_propensity = None
+        self.row = row
+        self.store = model.store
+
+    @property
+    def node_id(self):
+        return self.model.topology.node_ids[self.row]
+
+    @property
+    def interests(self):
+        return self.model.topology.interests[self.row]
+
+    @property
+    def opinion(self):
+        return OpinionView(self.store, 'opinions', self.row)
+
+    @opinion.setter
+    def opinion(self, opinions):
+        self.store.write_opinions('opinions', self.row, opinions)
+        self.store.released[self.row] = bool(opinions)
+
+    @property
+    def next_opinion(self):
+        state = self.store.next_state[self.row]
+        if state == NO_NEXT:
+            return None
+        return OpinionView(self.store, 'opinions' if state == ALIASED else 'next_opinions', self.row)
+
+    @next_opinion.setter
+    def next_opinion(self, opinions):
+        store, row = self.store, self.row
+        if opinions is None:
+            store.next_state[row] = NO_NEXT
+        elif isinstance(opinions, OpinionView) and opinions.store is store and opinions.row == row and opinions.name == 'opinions':
+            store.next_state[row] = ALIASED
+        else:
+            store.write_opinions('next_opinions', row, opinions)
+            store.next_state[row] = OWN_NEXT
+
+    @property
+    def next_turnout_propensity(self):
+        value = self.store.next_turnout[self.row]
+        return None if np.isnan(value) else float(value)
+
+    @next_turnout_propensity.setter
+    def next_turnout_propensity(self, value):
+        self.store.next_turnout[self.row] = np.nan if value is None else value
+
+    @property
+    def misinformation_state(self):
+        return STATE_NAMES[self.store.state[self.row]]
+
+    @misinformation_state.setter
+    def misinformation_state(self, name):
+        self.store.state[self.row] = STATE_CODES[name]
+
+    @property
+    def infected_by(self):
+        k = self.store.infected_by[self.row]
+        return self.model.misinformation[k] if k >= 0 else None
+
+    @infected_by.setter
+    def infected_by(self, misinformation):
+        self.store.infected_by[self.row] = -1 if misinformation is None else self.model.misinformation.index(misinformation)
+
+    @property
+    def deals(self):
+        return self.model.market.deals_of(self.row)
 
     def evaluate_manifestos(self):
         """Initial evaluation of candidate manifestos based on interests."""
+        topology = self.model.topology
+        interests = topology.interest_mask(self.interests)
         for post, candidates in self.model.candidates_by_post.items():
             self.opinion[post] = {}
             for candidate in candidates:
-                # Calculate alignment score
-                alignment = len(set(self.interests) & set(candidate.manifesto))
+                # Alignment score: interests shared with the manifesto, as a popcount
+                alignment = (interests & topology.interest_mask(candidate.manifesto)).bit_count()
                 self.opinion[post][candidate.id] = 0.5 + alignment * 0.1 # Simple linear model
 
     def step(self):
         """Calculates the agent's next state."""
+        if self.model.propagation is None:
+            self.step_misinformation()
+        self.model.calculate_next_opinion(self)
+        self.update_turnout_propensity()
+
+    def step_misinformation(self):
+        """Runs the misinformation part of the agent's step."""
         if self.misinformation_state == "exposed":
             self.process_exposure()
         if self.misinformation_state == "infected":
             self.spread_misinformation()
         if self.misinformation_state == "fact-checker" and self.model.rebuttal_enabled:
             self.rebut_misinformation()
-        self.calculate_next_opinion()
-        self.update_turnout_propensity()
 
     def advance(self):
-        """Updates the agent's state to the one calculated in the step phase."""
-        if self.next_opinion is not None:
-            self.opinion = self.next_opinion
-        if self.next_turnout_propensity is not None:
-            self.turnout_propensity = self.next_turnout_propensity
+        """Updates the agent's state to the one calculated in the step phase; ``next_opinion`` then aliases ``opinion``."""
+        store, row = self.store, self.row
+        if store.next_state[row] == OWN_NEXT:
+            store.opinions[row] = store.next_opinions[row]
+            store.next_state[row] = ALIASED
+        if not np.isnan(store.next_turnout[row]):
+            store.turnout[row] = store.next_turnout[row]
 
     def process_exposure(self):
-        if self.infected_by and random.random() < self.skepticism:
+        draw = self.model.streams.uniform('misinformation')
+        if self.infected_by and draw() < self.skepticism:
             self.misinformation_state = "fact-checker"
-        elif self.infected_by and random.random() < self.slander_susceptibility * self.infected_by.plausibility:
+        elif self.infected_by and draw() < self.slander_susceptibility * self.infected_by.plausibility:
             self.misinformation_state = "infected"
 
     def spread_misinformation(self):
-        for neighbor in self.model.grid.neighbors(self.node_id):
-            neighbor_agent = self.model.grid.nodes[neighbor]['agent']
-            if neighbor_agent.misinformation_state == "susceptible" and random.random() < 0.2:
-                neighbor_agent.misinformation_state = "exposed"
-                neighbor_agent.infected_by = self.infected_by
+        draw = self.model.streams.uniform('misinformation')
+        store, influence = self.store, self.model.influence
+        for row in influence.indices[influence.indptr[self.row]:influence.indptr[self.row + 1]].tolist():
+            if store.state[row] == SUSCEPTIBLE and draw() < self.model.parameters.transmission_probability:
+                store.state[row] = EXPOSED
+                store.infected_by[row] = store.infected_by[self.row]
 
     def rebut_misinformation(self):
-        for neighbor in self.model.grid.neighbors(self.node_id):
-            neighbor_agent = self.model.grid.nodes[neighbor]['agent']
-            if neighbor_agent.misinformation_state in ["infected", "exposed"] and random.random() < self.skepticism * 0.5:
-                neighbor_agent.misinformation_state = "susceptible"
-                neighbor_agent.infected_by = None
+        draw = self.model.streams.uniform('misinformation')
+        store, influence = self.store, self.model.influence
+        for row in influence.indices[influence.indptr[self.row]:influence.indptr[self.row + 1]].tolist():
+            if store.state[row] in (EXPOSED, INFECTED) and draw() < self.skepticism * 0.5:
+                store.state[row] = SUSCEPTIBLE
+                store.infected_by[row] = -1
 
     def calculate_next_opinion(self):
-        self.next_opinion = {post: op.copy() for post, op in self.opinion.items()}
-        neighbor_nodes = list(self.model.grid.neighbors(self.node_id))
-        if not neighbor_nodes:
-            return
-
-        for post, candidates in self.model.candidates_by_post.items():
-            avg_neighbor_opinion = {cand.id: 0.0 for cand in candidates}
-            total_weight = 0
-
-            for neighbor_node_id in neighbor_nodes:
-                edge_data = self.model.grid.get_edge_data(self.node_id, neighbor_node_id)
-                weight = edge_data.get('weight', 0.1)
-                neighbor_agent = self.model.grid.nodes[neighbor_node_id]['agent']
-
-                # Give more weight to seniors
-                if edge_data.get('layer') == 'junior-senior':
-                    weight *= 1.5
-
-                # Give more weight to mess reps and AMC members
-                if neighbor_agent.is_mess_rep or neighbor_agent.is_amc_member:
-                    weight *= 1.5
-
-                for cand_id in avg_neighbor_opinion:
-                    avg_neighbor_opinion[cand_id] += neighbor_agent.opinion[post][cand_id] * weight
-                total_weight += weight
-
-            if total_weight > 0:
-                for cand_id in avg_neighbor_opinion:
-                    avg_neighbor_opinion[cand_id] /= total_weight
-
-                influence_factor = 0.1
-                for cand_id in self.next_opinion[post]:
-                    self.next_opinion[post][cand_id] = (1 - influence_factor) * self.opinion[post][cand_id] + influence_factor * avg_neighbor_opinion[cand_id]
-
+        # Each agent's opinions are read once as a list of scores in model.candidates order
+        store, parameters = self.store, self.model.parameters
+        opinions = store.opinions
+        own = opinions[self.row].tolist()
+        next_opinion = list(own)
+        # Neighbor weights come from the model's influence matrix, which already gives
+        # more weight to seniors, mess reps and AMC members
+        influence = self.model.influence
+        start, end = influence.indptr[self.row], influence.indptr[self.row + 1]
+        if end > start:
+            neighbors = list(zip(opinions[influence.indices[start:end]].tolist(), influence.data[start:end].tolist()))
+
+            for columns in store.posts.values():
+                avg_neighbor_opinion = {k: 0.0 for k in columns.values()}
+                total_weight = 0
+
+                for neighbor_opinion, weight in neighbors:
+                    for k in avg_neighbor_opinion:
+                        avg_neighbor_opinion[k] += neighbor_opinion[k] * weight
+                    total_weight += weight
+
+                if total_weight > 0:
+                    for k in avg_neighbor_opinion:
+                        avg_neighbor_opinion[k] /= total_weight
+
+                    influence_factor = parameters.influence_factor
+                    for k in avg_neighbor_opinion:
+                        next_opinion[k] = (1 - influence_factor) * own[k] + influence_factor * avg_neighbor_opinion[k]
+
+            slander = self.slander_penalty()
+            if slander:
+                # Assuming slander targets a specific candidate, not a post for now
+                for columns in store.posts.values():
+                    if 'cand_A' in columns: # Example: slander always targets cand_A
+                        k = columns['cand_A']
+                        next_opinion[k] -= slander
+                        next_opinion[k] = max(0, next_opinion[k])
+
+        store.next_opinions[self.row] = next_opinion
+        store.next_state[self.row] = OWN_NEXT
+
+    def slander_penalty(self):
+        """Opinion penalty of the slander the agent believes after its own misinformation step this tick."""
+        kernel = self.model.propagation
+        if kernel is not None:
+            return float(kernel.slander_penalty()[self.row])
         if self.misinformation_state == "infected" and self.infected_by:
-            # Assuming slander targets a specific candidate, not a post for now
-            for post in self.next_opinion:
-                if 'cand_A' in self.next_opinion[post]: # Example: slander always targets cand_A
-                    self.next_opinion[post]['cand_A'] -= self.infected_by.severity * 0.1
-                    self.next_opinion[post]['cand_A'] = max(0, self.next_opinion[post]['cand_A'])
+            return self.infected_by.severity * SLANDER_PENALTY
+        return 0.0
 
     def update_turnout_propensity(self):
+        own = self.store.opinions[self.row].tolist()
         enthusiasm = 0
-        for post_opinions in self.opinion.values():
-            for opinion_score in post_opinions.values():
-                enthusiasm += abs(opinion_score - 0.5)
+        for post in self.opinion:
+            for k in self.store.posts[post].values():
+                enthusiasm += abs(own[k] - 0.5)
         enthusiasm /= len(self.model.candidates)
-        self.next_turnout_propensity = (0.8 * self.baseline_turnout_propensity) + (0.2 * enthusiasm * 2)
+        elasticity = self.model.parameters.turnout_elasticity
+        next_turnout_propensity = ((1 - elasticity) * self.baseline_turnout_propensity) + (elasticity * enthusiasm * 2)
 
         # Increase turnout propensity of SSMS winners, mess reps, and AMC members
         if self.is_ssms_winner or self.is_mess_rep or self.is_amc_member:
-            self.next_turnout_propensity *= 1.2
-
-        self.next_turnout_propensity = max(0, min(1, self.next_turnout_propensity))
-
-    def evaluate_deal(self, deal):
-        if deal.payoff['target'] > 0.5 and not self.deals:
-            self.deals.append(deal)
-            self.execute_deal_effects(deal)
-            return True
-        return False
+            next_turnout_propensity *= 1.2
 
-    def execute_deal_effects(self, deal):
-        if self.next_opinion is None:
-            self.next_opinion = {post: op.copy() for post, op in self.opinion.items()}
-        
-        for post, opinions in self.next_opinion.items():
-            if deal.proposer_id in opinions:
-                opinions[deal.proposer_id] = min(1.0, self.opinion[post][deal.proposer_id] + 0.2)
-
-import pandas as pd
+        self.next_turnout_propensity = max(0, min(1, next_turnout_propensity))
 
 class ElectionModel(Model):
     """The main model for the BITS SU election simulation."""
-    def __init__(self, graph: nx.Graph, rebuttal_enabled=False):
-        super().__init__()
-        self.grid = graph
+    # Array engine used when engine="vectorized"; subclasses swap in their own update rule
+    engine_class = VectorizedOpinionEngine
+
+    def __init__(self, graph, rebuttal_enabled=False, engine="agent", propagation="agent", seed=None, parameters=None,
+                 layers=None, combiner="last"):
+        super().__init__(seed=seed)
+        if engine not in ("agent", "vectorized"):
+            raise ValueError(f"Unknown engine: {engine}")
+        if propagation not in ("agent", "staged", "synchronous"):
+            raise ValueError(f"Unknown propagation: {propagation}")
+        # The topology is shared across runs and never mutated by the model
+        self.topology = graph if isinstance(graph, CampusTopology) else CampusTopology(graph)
+        # Constructor options, reused when forking the model from a ModelSnapshot
+        self.options = dict(rebuttal_enabled=rebuttal_enabled, engine=engine, propagation=propagation, parameters=parameters,
+                            layers=layers, combiner=combiner)
+        # Tunable constants of the update rules; see src.calibration for fitting them
+        self.parameters = parameters if parameters is not None else ModelParameters()
+        # Every stochastic draw of the run comes from these seeded streams
+        self.streams = RandomStreams(seed)
         self.rebuttal_enabled = rebuttal_enabled
         self.posts = ["President", "General Secretary"]
         self.candidates = [
@@ -164,72 +259,128 @@ class ElectionModel(Model):
             Misinformation("m1", "Candidate A cheated in an exam", 0.8, 0.6, "rival_camp"),
         ]
 
-        # Load junior-senior and SSMS election results data
-        try:
-            junior_senior_df = pd.read_csv("/Users/ashishmishra/bits-election-simulator/data/junior_senior.csv")
-            ssms_election_results_df = pd.read_csv("/Users/ashishmishra/bits-election-simulator/data/ssms_election_results.csv")
-            mess_reps_df = pd.read_csv("/Users/ashishmishra/bits-election-simulator/data/mess_reps.csv")
-            amc_members_df = pd.read_csv("/Users/ashishmishra/bits-election-simulator/data/amc_members.csv")
-        except FileNotFoundError:
-            junior_senior_df = pd.DataFrame(columns=['junior_id', 'senior_id'])
-            ssms_election_results_df = pd.DataFrame(columns=['student_id', 'post'])
-            mess_reps_df = pd.DataFrame(columns=['student_id'])
-            amc_members_df = pd.DataFrame(columns=['student_id', 'post'])
-
-        # Add junior-senior layer to the graph
-        for index, row in junior_senior_df.iterrows():
-            self.grid.add_edge(row['junior_id'], row['senior_id'], layer='junior-senior', weight=0.5)
-
-        for i, node in enumerate(self.grid.nodes(data=True)):
-            agent_id = node[0]
-            attributes = node[1]
-            interests = attributes.get('interests', [])
-            if isinstance(interests, str):
-                interests = eval(interests) # Convert string representation of list to actual list
-
-            agent = StudentAgent(self, agent_id, {}, attributes.get('baseline_turnout_propensity', 0.5), attributes.get('slander_susceptibility', 0.5), attributes.get('skepticism', 0.5))
-            agent.interests = interests
-
-            # Set is_ssms_winner attribute
-            if agent_id in ssms_election_results_df['student_id'].values:
-                agent.is_ssms_winner = True
-
-            # Set is_mess_rep attribute
-            if agent_id in mess_reps_df['student_id'].values:
-                agent.is_mess_rep = True
-
-            # Set is_amc_member attribute
-            if agent_id in amc_members_df['student_id'].values:
-                agent.is_amc_member = True
-
-            self.grid.nodes[agent_id]['agent'] = agent
-
-        self.datacollector = DataCollector(model_reporters={"Infected": lambda m: sum([1 for a in m.agents if a.misinformation_state == 'infected'])})
+        # Agent state lives in these arrays; each StudentAgent is a view over its row
+        self.store = AgentStore(self)
+        self.store.power_broker_score[:] = self.streams['agents'].random(len(self.topology))
+        # Replace with DealMarket(model, budget=True, alliances=True) for budgeted deals that boost allies
+        self.market = DealMarket(self)
+        # Weighted edges the opinion and misinformation dynamics run on; see set_layers
+        self.layers, self.combiner = dict(layers or {}), combiner
+        self.influence = self._influence_matrix(self.layers, combiner)
+        self.agent_by_node = {node_id: StudentAgent(self, row) for row, node_id in enumerate(self.topology.node_ids)}
+
+        self.propagation = None
+        if propagation != "agent":
+            # Staged propagation draws from the agents' own stream, so it replays propagation="agent" exactly
+            self.propagation = MisinformationKernel(self, synchronous=propagation == "synchronous", rng=self.streams['propagation'],
+                                                    draw=self.streams.uniform('misinformation'))
+        self.engine = self.engine_class(self) if engine == "vectorized" else None
+        # Columnar per-step aggregates; replace with ArrayCollector(model, group_by=..., parquet_dir=...) to customise
+        self.datacollector = ArrayCollector(self)
+
+    @property
+    def grid(self):
+        """The campus nx.Graph, which the topology only builds when asked for it."""
+        return self.topology.graph
+
+    def _influence_matrix(self, layers, combiner):
+        store, parameters = self.store, self.parameters
+        return self.topology.influence_matrix(store.is_mess_rep | store.is_amc_member, parameters.junior_senior_multiplier,
+                                              parameters.role_multiplier, layers, combiner)
+
+    def set_layers(self, layers=None, combiner="last"):
+        """Runs the dynamics on another edge layer configuration from the next tick on.
+
+        ``layers`` maps layer names to weights, 1 for layers left out and 0 to mask
+        a layer, e.g. ``{'club': 0}`` while clubs pause for exams; ``combiner`` is
+        as in MultiplexGraph.combine.
+        """
+        self.influence = self._influence_matrix(layers, combiner)
+        self.layers, self.combiner = dict(layers or {}), combiner
+        # A fork rebuilds the model on the configuration in use
+        self.options.update(layers=self.layers, combiner=combiner)
+        for component in (self.engine, self.propagation):
+            if component is not None:
+                component.load_network()
+
+    def snapshot(self):
+        """Captures the model's state between ticks; ``snapshot.fork(**overrides)`` branches from it."""
+        return ModelSnapshot.capture(self)
+
+    def memory_footprint(self):
+        """Bytes this model owns per component and field; see agent_store.memory_footprint."""
+        return memory_footprint(self)
+
+    def calculate_next_opinion(self, agent):
+        """Opinion update rule used by the agent engine; subclasses may override it."""
+        agent.calculate_next_opinion()
+
+    def manifesto_scores(self, candidates):
+        """Initial (agents x candidates) opinion scores in topology order: 0.5 plus 0.1 per shared interest."""
+        return 0.5 + self.topology.manifesto_alignment([cand.manifesto for cand in candidates]) * 0.1
 
     def release_manifestos(self):
+        """Scores every agent against every manifesto at once; same result as evaluate_manifestos per agent."""
         print("\n--- Releasing Manifestos ---")
-        self.agents.do("evaluate_manifestos")
+        self.store.opinions[:] = self.manifesto_scores(self.candidates)
+        self.store.released[:] = True
+        if self.engine is not None:
+            self.engine.load_agents()
+
+    def update_manifesto(self, candidate_id, manifesto):
+        """Replaces one candidate's manifesto and re-scores only that candidate.
+
+        Every agent's opinion of the candidate is reset to its manifesto score, as
+        release_manifestos would set it; other candidates are left untouched.
+        """
+        candidate = next((c for c in self.candidates if c.id == candidate_id), None)
+        if not candidate:
+            raise ValueError(f"Unknown candidate: {candidate_id}")
+        candidate.manifesto = list(manifesto)
+        scores = self.manifesto_scores([candidate])[:, 0]
+        released = self.store.released
+        column = self.candidates.index(candidate)
+        # The engine's opinion matrix is the store's once loaded, so this updates both
+        self.store.opinions[released, column] = scores[released]
 
     def slander_drop(self, misinformation_id, target_agents_ids):
         misinfo = next((m for m in self.misinformation if m.id == misinformation_id), None)
         if not misinfo:
             return
+        if self.propagation is not None:
+            self.propagation.expose([self.topology.index[agent_id] for agent_id in target_agents_ids], misinfo)
+            return
         for agent_id in target_agents_ids:
-            agent = self.grid.nodes[agent_id]['agent']
+            agent = self.agent_by_node[agent_id]
             if agent.misinformation_state == "susceptible":
                 agent.misinformation_state = "exposed"
                 agent.infected_by = misinfo
 
-    def propose_deals(self):
-        power_brokers = [agent for agent in self.agents if agent.power_broker_score > 0.9]
-        for broker in power_brokers:
-            if not broker.deals:
-                candidate = random.choice(self.candidates)
-                deal = Deal(id=f"d_{random.randint(1000,9999)}", proposer_id=candidate.id, target_id=broker.node_id, status="proposed", payoff={'proposer': 0, 'target': random.uniform(0.4, 0.8)})
-                broker.evaluate_deal(deal)
+    def inoculate(self, target_agents_ids):
+        """Makes the given susceptible agents fact-checkers, e.g. defenders from select_defenders."""
+        if self.propagation is not None:
+            self.propagation.inoculate([self.topology.index[agent_id] for agent_id in target_agents_ids])
+            return
+        for agent_id in target_agents_ids:
+            agent = self.agent_by_node[agent_id]
+            if agent.misinformation_state == "susceptible":
+                agent.misinformation_state = "fact-checker"
+
+    def propose_deals(self, tick=None):
+        """Runs one round of the deal market; returns the rows of the brokers that took a deal.
+
+        The round's offers are logged at ``tick``, by default the tick being
+        stepped (mesa counts it in ``steps`` before calling step).
+        """
+        return self.market.propose(self.steps - 1 if tick is None else tick)
 
     def step(self):
         self.datacollector.collect(self)
         self.propose_deals()
-        self.agents.do("step")
-        self.agents.do("advance")
+        if self.propagation is not None:
+            self.propagation.step()
+        if self.engine is not None:
+            self.engine.step()
+        else:
+            self.agents.do("step")
+            self.agents.do("advance")
@@ -0,0 +1,196 @@
+import multiprocessing as mp
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.convergence import run_adaptive
+from src.model import ElectionModel
+from src.profiling import StepProfiler
+from src.topology import CampusTopology
+
+# Scenario name -> keyword arguments for run_scenario
+DEFAULT_SCENARIOS = {
+    'control': {'rebuttal_enabled': False},
+    'intervention': {'rebuttal_enabled': True},
+}
+
+# Scenario options that can be applied to a fork of the pre-slander prefix: rebuttal has
+# no effect until someone has been exposed
+BRANCH_OPTIONS = {'rebuttal_enabled'}
+
+# Topology shared with worker processes; set once per worker by _init_worker
+_TOPOLOGY = None
+
+def slander_target_ids(model, slander_targets):
+    """Node ids to slander: the first ``slander_targets`` agents, or the given node ids (e.g. from select_slander_targets)."""
+    if isinstance(slander_targets, (int, np.integer)):
+        return [agent.node_id for agent in model.agents[:slander_targets]]
+    return list(slander_targets)
+
+def slander_events(slander_step, slander_targets, defenders=()):
+    """run_adaptive events inoculating ``defenders`` and dropping the slander just before ``slander_step``."""
+    def drop(model):
+        model.inoculate(defenders)
+        model.slander_drop("m1", slander_target_ids(model, slander_targets))
+    return {slander_step: [drop]}
+
+def run_scenario(graph, num_steps, rebuttal_enabled, slander_step, slander_targets, engine="agent", profiler=None, seed=None, defenders=(),
+                 layers=None):
+    """Runs a single simulation scenario, optionally instrumented by a StepProfiler.
+
+    ``defenders`` are node ids inoculated as fact-checkers just before the slander drop.
+    ``layers`` weights or masks edge layers for the whole run, e.g. ``{'club': 0}``;
+    see ElectionModel.set_layers.
+    """
+    model = ElectionModel(graph, rebuttal_enabled=rebuttal_enabled, engine=engine, seed=seed, layers=layers)
+    if profiler is not None:
+        profiler.attach(model)
+    model.release_manifestos()
+    events = slander_events(slander_step, slander_targets, defenders)
+    if profiler is None:
+        run_adaptive(model, num_steps, events)
+    else:
+        # Fast-forwarded ticks never call model.step, so a profiled run steps every tick
+        # and each tick gets its own record; the results are the same either way
+        for tick in range(num_steps):
+            for event in events.get(tick, ()):
+                event(model)
+            model.step()
+        profiler.detach()
+    return model.datacollector.get_model_vars_dataframe(), model
+
+def run_branches(graph, num_steps, slander_step, slander_targets, branches, engine="agent", seed=None, defenders=()):
+    """Runs the ticks before ``slander_step`` once, then forks one model per branch.
+
+    ``branches`` maps a name to ModelSnapshot.fork overrides. Each branch ends in
+    the same state as run_scenario with those options under the same seed.
+    """
+    model = ElectionModel(graph, engine=engine, seed=seed)
+    model.release_manifestos()
+    prefix = min(max(slander_step, 0), num_steps)
+    run_adaptive(model, prefix)
+    snapshot = model.snapshot()
+
+    results = {}
+    for name, overrides in branches.items():
+        branch = snapshot.fork(**overrides)
+        run_adaptive(branch, num_steps, slander_events(slander_step, slander_targets, defenders))
+        results[name] = (branch.datacollector.get_model_vars_dataframe(), branch)
+    return results
+
+def replica_seeds(seed, num_runs):
+    """Spawns one independent, reproducible seed per replica."""
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(num_runs)]
+
+def mean_opinions(model):
+    """Average opinion score per (post, candidate) over all agents."""
+    return {
+        (post, cand.id): float(np.mean([agent.opinion[post][cand.id] for agent in model.agents]))
+        for post, candidates in model.candidates_by_post.items()
+        for cand in candidates
+    }
+
+def _init_worker(topology):
+    global _TOPOLOGY
+    _TOPOLOGY = topology
+
+def _run_replica(task):
+    scenario, replica, seed, profile, scenario_kwargs = task
+    profiler = StepProfiler() if profile else None
+    results, model = run_scenario(_TOPOLOGY, profiler=profiler, seed=seed, **scenario_kwargs)
+    profile_df = profiler.to_dataframe().assign(scenario=scenario, replica=replica) if profile else None
+    return [(scenario, replica, results['Infected'].to_numpy(), mean_opinions(model), profile_df)]
+
+def _run_replica_branches(task):
+    replica, seed, scenarios, kwargs = task
+    branches = run_branches(_TOPOLOGY, branches=scenarios, seed=seed, **kwargs)
+    return [(name, replica, results['Infected'].to_numpy(), mean_opinions(model), None)
+            for name, (results, model) in branches.items()]
+
+@dataclass
+class MonteCarloResult:
+    """Per-step Infected series and final opinions collected from every replica."""
+    infected: Dict[str, np.ndarray]
+    opinions: Dict[str, list] = field(default_factory=dict)
+    seeds: list = field(default_factory=list)
+    profile: Optional[pd.DataFrame] = None
+
+    def summary(self, scenario, confidence_z=1.96):
+        """Mean Infected per step with a normal-approximation confidence band."""
+        runs = self.infected[scenario]
+        mean = runs.mean(axis=0)
+        std = runs.std(axis=0, ddof=1) if len(runs) > 1 else np.zeros_like(mean)
+        half_width = confidence_z * std / np.sqrt(len(runs))
+        return pd.DataFrame({
+            'mean': mean,
+            'std': std,
+            'lower': mean - half_width,
+            'upper': mean + half_width,
+            'p05': np.percentile(runs, 5, axis=0),
+            'p95': np.percentile(runs, 95, axis=0),
+        })
+
+    def opinion_summary(self, scenario):
+        """Average final opinion per (post, candidate) across replicas."""
+        df = pd.DataFrame(self.opinions[scenario])
+        df.columns = pd.MultiIndex.from_tuples(df.columns, names=['post', 'candidate'])
+        return df.mean().rename('opinion_score')
+
+def run_monte_carlo(graph, num_runs, num_steps, slander_step, slander_targets, scenarios=None,
+                    seed=0, processes=None, engine="agent", progress=True, profile=False, branch=True, defenders=()):
+    """Runs ``num_runs`` replicas of every scenario across a process pool.
+
+    The topology is built once and handed to each worker through the pool initializer
+    (inherited without pickling under fork). Replica ``r`` of every scenario uses the same seed,
+    so scenarios are compared under common random numbers. With ``profile=True``
+    every replica runs under a StepProfiler and the per-tick phase timings are
+    returned in ``MonteCarloResult.profile``.
+
+    With ``branch=True`` and scenarios that only set BRANCH_OPTIONS, each replica
+    runs the ticks before the slander drop once and forks every scenario from a
+    snapshot; the results are identical to running each scenario from scratch.
+    """
+    scenarios = scenarios or DEFAULT_SCENARIOS
+    topology = graph if isinstance(graph, CampusTopology) else CampusTopology(graph)
+    seeds = replica_seeds(seed, num_runs)
+    common = dict(num_steps=num_steps, slander_step=slander_step, slander_targets=slander_targets, engine=engine, defenders=defenders)
+    if branch and not profile and all(set(kwargs) <= BRANCH_OPTIONS for kwargs in scenarios.values()):
+        worker = _run_replica_branches
+        tasks = [(r, seeds[r], scenarios, common) for r in range(num_runs)]
+    else:
+        worker = _run_replica
+        tasks = [(name, r, seeds[r], profile, dict(common, **kwargs)) for r in range(num_runs) for name, kwargs in scenarios.items()]
+    infected = {name: np.zeros((num_runs, num_steps)) for name in scenarios}
+    opinions = {name: [None] * num_runs for name in scenarios}
+    profiles = []
+
+    processes = processes or os.cpu_count()
+    if processes == 1:
+        _init_worker(topology)
+        results = map(worker, tasks)
+    else:
+        ctx = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else mp.get_context()
+        pool = ctx.Pool(processes, initializer=_init_worker, initargs=(topology,))
+        results = pool.imap_unordered(worker, tasks)
+
+    try:
+        done = 0
+        for batch in results:
+            for name, r, series, final_opinions, profile_df in batch:
+                infected[name][r] = series
+                opinions[name][r] = final_opinions
+                if profile_df is not None:
+                    profiles.append(profile_df)
+                done += 1
+                if progress:
+                    print(f"  Completed {done}/{num_runs * len(scenarios)} ({name}, run {r + 1})")
+    finally:
+        if processes != 1:
+            pool.close()
+            pool.join()
+
+    profile_df = pd.concat(profiles, ignore_index=True) if profiles else None
+    return MonteCarloResult(infected=infected, opinions=opinions, seeds=seeds, profile=profile_df)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.engine import DEFAULT_EDGE_WEIGHT
+
+# Layer of edges without a 'layer' attribute
+DEFAULT_LAYER = 'default'
+# How the weighted layers fold into one adjacency: the pair's last tie in edge table order,
+# as nx.Graph keeps it; summed per pair; or the pair's strongest tie
+COMBINERS = ('last', 'sum', 'max')
+EDGE_COLUMNS = ['source', 'target', 'layer', 'weight']
+
+def graph_edges(graph):
+    """Edge table (source, target, layer, weight) of a networkx graph; a MultiGraph keeps its parallel edges."""
+    rows = [(u, v, data.get('layer', DEFAULT_LAYER), data.get('weight', DEFAULT_EDGE_WEIGHT))
+            for u, v, data in graph.edges(data=True)]
+    return pd.DataFrame(rows, columns=EDGE_COLUMNS)
+
+def layer_matrix(num_nodes, rows, cols, weights):
+    """Symmetric CSR adjacency of one layer; a pair listed twice keeps its last weight, as nx.Graph does."""
+    rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    lo, hi = np.minimum(rows, cols), np.maximum(rows, cols)
+    key = lo * num_nodes + hi
+    order = np.argsort(key, kind='stable')
+    last = order[np.append(key[order][1:] != key[order][:-1], True)]
+    lo, hi, weights = lo[last], hi[last], weights[last]
+    mirror = lo != hi
+    return sparse.csr_matrix((np.concatenate([weights, weights[mirror]]),
+                              (np.concatenate([lo, hi[mirror]]), np.concatenate([hi, lo[mirror]]))),
+                             shape=(num_nodes, num_nodes))
+
+class MultiplexGraph:
+    """Edge layers of a network as one symmetric CSR adjacency per layer.
+
+    ``orders`` holds each layer entry's row in the edge table it was built from,
+    which the 'last' combiner uses to keep a pair's last tie, as nx.Graph does.
+    """
+    def __init__(self, num_nodes, layers=None, orders=None):
+        self.num_nodes = num_nodes
+        self.layers = dict(layers or {})
+        self.orders = dict(orders) if orders is not None else {
+            name: np.full(matrix.nnz, k, dtype=np.int64) for k, (name, matrix) in enumerate(self.layers.items())}
+        self._cache = {}
+
+    @classmethod
+    def from_edges(cls, num_nodes, rows, cols, layers, weights):
+        """Builds the layers from parallel edge arrays in node index order; layers keep their first-seen order."""
+        rows, cols, weights = np.asarray(rows), np.asarray(cols), np.asarray(weights, dtype=np.float64)
+        codes, names = pd.factorize(pd.Series(layers, dtype=object))
+        positions = np.arange(len(rows), dtype=np.float64)
+        matrices, orders = {}, {}
+        for k, name in enumerate(names):
+            edges = codes == k
+            matrices[name] = layer_matrix(num_nodes, rows[edges], cols[edges], weights[edges])
+            # Same pairs in the same order, so the entries line up with the weights'
+            orders[name] = layer_matrix(num_nodes, rows[edges], cols[edges], positions[edges]).data.astype(np.int64)
+        return cls(num_nodes, matrices, orders)
+
+    def __len__(self):
+        return len(self.layers)
+
+    def configuration(self, weights=None):
+        """Weight of every layer as a ``((layer, weight), ...)`` tuple; layers missing from ``weights`` get 1."""
+        weights = dict(weights or {})
+        unknown = set(weights) - set(self.layers)
+        if unknown:
+            raise ValueError(f"Unknown layers: {sorted(unknown)}")
+        negative = sorted(name for name, weight in weights.items() if weight < 0)
+        if negative:
+            raise ValueError(f"Layer weights must be non-negative, got {negative}")
+        return tuple((name, float(weights.get(name, 1.0))) for name in self.layers)
+
+    def combine(self, weights=None, combiner='last'):
+        """The layers folded into one weighted CSR adjacency, cached per configuration.
+
+        ``weights`` maps layer names to weights (see ``configuration``); layers of
+        weight 0 are left out, so their edges vanish from the structure as well.
+        ``combiner='last'`` keeps each pair's weighted tie from the last edge row
+        among those layers, ``'sum'`` adds the weighted layers and ``'max'`` keeps
+        each pair's strongest weighted tie.
+        """
+        if combiner not in COMBINERS:
+            raise ValueError(f"Unknown combiner: {combiner}")
+        key = (self.configuration(weights), combiner)
+        if key not in self._cache:
+            n = self.num_nodes
+            active = [(name, self.layers[name], weight) for name, weight in key[0] if weight > 0]
+            rows = np.concatenate([np.repeat(np.arange(n), np.diff(m.indptr)) for _, m, _ in active] + [np.empty(0, dtype=np.int64)])
+            cols = np.concatenate([m.indices for _, m, _ in active] + [np.empty(0, dtype=np.int32)]).astype(np.int64)
+            data = np.concatenate([m.data * weight for _, m, weight in active] + [np.empty(0)])
+            pair = rows * n + cols
+            if combiner == 'last':
+                # Entries sorted by (row, column), then edge row; a pair's last entry is its last tie
+                ranks = np.concatenate([self.orders[name] for name, _, _ in active] + [np.empty(0, dtype=np.int64)])
+                order = np.lexsort((ranks, pair))
+            else:
+                # Entries sorted by (row, column), layers in order within a pair
+                order = np.argsort(pair, kind='stable')
+            pair, data = pair[order], data[order]
+            starts = np.flatnonzero(np.diff(pair, prepend=-1))
+            if not len(data):
+                values = data
+            elif combiner == 'last':
+                values = data[np.append(starts[1:], len(data)) - 1]
+            else:
+                values = (np.add if combiner == 'sum' else np.maximum).reduceat(data, starts)
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(pair[starts] // n, minlength=n), out=indptr[1:])
+            self._cache[key] = sparse.csr_matrix((values, (pair[starts] % n).astype(np.int32), indptr), shape=(n, n))
+        return self._cache[key]
+
+    def layer_frame(self):
+        """Number of edges and total edge weight per layer, each undirected edge counted once."""
+        upper = [sparse.triu(matrix) for matrix in self.layers.values()]
+        return pd.DataFrame({'edges': [int(m.nnz) for m in upper], 'weight': [float(m.sum()) for m in upper]},
+                            index=pd.Index(list(self.layers), name='layer'))
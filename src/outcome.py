@@ -0,0 +1,188 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.batch import BatchSimulation
+from src.collector import opinion_array, turnout_array
+from src.monte_carlo import replica_seeds
+from src.topology import CampusTopology
+
+VOTE_RULES = ('argmax', 'softmax')
+SOFTMAX_TEMPERATURE = 0.05
+MARGIN_BINS = np.linspace(0, 1, 41)
+
+def post_columns(candidates, candidates_by_post):
+    """Column indices into ``candidates`` of each post's candidates."""
+    return {post: np.array([candidates.index(cand) for cand in cands]) for post, cands in candidates_by_post.items()}
+
+def cast_votes(opinions, turnout, columns, turnout_draws, choice_draws, rule='argmax', temperature=SOFTMAX_TEMPERATURE):
+    """Vote counts per candidate, (replicas x candidates), from (replicas x agents) draws.
+
+    An agent votes when its turnout draw is below its turnout propensity, and then
+    picks one candidate per post: the highest opinion (first on ties) with
+    ``argmax``, or a draw from the softmax of opinions / ``temperature``.
+    ``choice_draws`` holds one uniform per (replica, agent, post).
+    """
+    if rule not in VOTE_RULES:
+        raise ValueError(f"Unknown vote rule: {rule}")
+    R, N, C = opinions.shape
+    voted = turnout_draws < turnout
+    votes = np.zeros((R, C), dtype=np.int64)
+    replica = np.repeat(np.arange(R), N).reshape(R, N)
+    for p, cols in enumerate(columns.values()):
+        scores = opinions[:, :, cols]
+        if rule == 'argmax':
+            choice = scores.argmax(axis=2)
+        else:
+            weights = np.exp((scores - scores.max(axis=2, keepdims=True)) / temperature)
+            cumulative = np.cumsum(weights, axis=2)
+            threshold = choice_draws[:, :, p, None] * cumulative[:, :, -1:]
+            choice = np.minimum((cumulative <= threshold).sum(axis=2), len(cols) - 1)
+        np.add.at(votes, (replica[voted], cols[choice[voted]]), 1)
+    return votes
+
+def election_outcome(votes, columns):
+    """Winner (index into the candidates) and vote-share margin per (replica, post).
+
+    Ties go to the first candidate listed for the post; the margin is the gap
+    between the top two vote shares, or 1 when the post has one candidate.
+    """
+    R = len(votes)
+    winners = np.empty((R, len(columns)), dtype=np.int64)
+    margins = np.empty((R, len(columns)))
+    for p, cols in enumerate(columns.values()):
+        counts = votes[:, cols]
+        winners[:, p] = cols[counts.argmax(axis=1)]
+        total = np.maximum(counts.sum(axis=1), 1)
+        ordered = np.sort(counts, axis=1)
+        runner_up = ordered[:, -2] if len(cols) > 1 else 0
+        margins[:, p] = (ordered[:, -1] - runner_up) / total
+    return winners, margins
+
+class RunningMoments:
+    """Welford mean and variance over a stream of batches, per column."""
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, batch):
+        """Merges a (samples x ...) batch with Chan's parallel update."""
+        n = len(batch)
+        if n == 0:
+            return
+        mean = batch.mean(axis=0)
+        m2 = ((batch - mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.zeros_like(self.m2)
+
+class OutcomeEstimator:
+    """Streaming estimate of win probabilities and margins per post.
+
+    Win indicators and margins go through RunningMoments, and margins also into a
+    fixed histogram, so memory does not grow with the number of replicas. Win
+    probability intervals are Wilson score intervals, which stay meaningful when
+    a candidate has won every replica so far.
+    """
+    def __init__(self, candidates, candidates_by_post, margin_bins=MARGIN_BINS):
+        self.candidate_ids = [cand.id for cand in candidates]
+        self.columns = post_columns(candidates, candidates_by_post)
+        self.posts = list(self.columns)
+        self.wins = RunningMoments(len(candidates))
+        self.margins = RunningMoments(len(self.posts))
+        self.margin_bins = margin_bins
+        self.margin_counts = np.zeros((len(self.posts), len(margin_bins) - 1), dtype=np.int64)
+
+    @property
+    def count(self):
+        return self.wins.count
+
+    def update(self, votes):
+        """Adds a (replicas x candidates) batch of vote counts."""
+        winners, margins = election_outcome(votes, self.columns)
+        won = np.zeros(votes.shape)
+        np.put_along_axis(won, winners, 1.0, axis=1)
+        self.wins.update(won)
+        self.margins.update(margins)
+        for p in range(len(self.posts)):
+            self.margin_counts[p] += np.histogram(margins[:, p], bins=self.margin_bins)[0]
+
+    def half_widths(self, z=1.96):
+        """Wilson interval half-width of every candidate's win probability."""
+        n, p = max(self.count, 1), self.wins.mean
+        return z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+
+    def converged(self, tolerance, z=1.96):
+        """True once every win probability is known to within ``tolerance``."""
+        return self.count > 0 and bool(np.all(self.half_widths(z) <= tolerance))
+
+    def win_probabilities(self, z=1.96):
+        """Win probability per (post, candidate) with its Wilson interval."""
+        n, p = max(self.count, 1), self.wins.mean
+        center = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+        half = self.half_widths(z)
+        rows = [(post, self.candidate_ids[k], p[k], center[k] - half[k], center[k] + half[k])
+                for post, cols in self.columns.items() for k in cols]
+        return pd.DataFrame(rows, columns=['post', 'candidate', 'win_probability', 'lower', 'upper'])
+
+    def margin_summary(self):
+        """Mean and standard deviation of the winning margin per post."""
+        return pd.DataFrame({'mean': self.margins.mean, 'std': np.sqrt(self.margins.variance)}, index=pd.Index(self.posts, name='post'))
+
+    def margin_histogram(self):
+        """Margin counts per post over ``margin_bins``."""
+        return pd.DataFrame(self.margin_counts.T, columns=self.posts, index=pd.IntervalIndex.from_breaks(self.margin_bins))
+
+def tally_model(model, rule='argmax', temperature=SOFTMAX_TEMPERATURE):
+    """Votes of one ElectionModel as a (1 x candidates) array, drawn from its ``votes`` stream."""
+    columns = post_columns(model.candidates, model.candidates_by_post)
+    opinions, turnout = opinion_array(model)[None], turnout_array(model)[None]
+    rng = model.streams['votes']
+    return cast_votes(opinions, turnout, columns, rng.random(turnout.shape), rng.random(turnout.shape + (len(columns),)), rule, temperature)
+
+def tally_batch(batch, rule='argmax', temperature=SOFTMAX_TEMPERATURE):
+    """Votes of every BatchSimulation replica, each drawn from the replica's ``votes`` stream."""
+    template = batch.template
+    columns = post_columns(template.candidates, template.candidates_by_post)
+    N = batch.num_agents
+    turnout_draws = np.stack([streams['votes'].random(N) for streams in batch.streams])
+    choice_draws = np.stack([streams['votes'].random((N, len(columns))) for streams in batch.streams])
+    return cast_votes(batch.opinions, batch.turnout, columns, turnout_draws, choice_draws, rule, temperature)
+
+@dataclass
+class OutcomeEstimate:
+    """Result of estimate_outcome."""
+    estimator: OutcomeEstimator
+    runs: int
+    converged: bool
+
+def estimate_outcome(graph, num_steps, tolerance=0.01, batch_size=64, max_runs=4096, seed=0, z=1.96,
+                     rule='argmax', temperature=SOFTMAX_TEMPERATURE, **batch_kwargs):
+    """Runs BatchSimulation batches until every win probability is within ``tolerance``.
+
+    Replica seeds are the first ``runs`` of ``replica_seeds(seed, max_runs)``,
+    so stopping early gives the same estimate as a fixed run of that length.
+    ``batch_kwargs`` (rebuttal_enabled, slander_targets, ...) go to BatchSimulation.
+    """
+    topology = graph if isinstance(graph, CampusTopology) else CampusTopology(graph)
+    seeds = replica_seeds(seed, max_runs)
+    estimator = None
+    runs = 0
+    while runs < max_runs:
+        batch = BatchSimulation(topology, seeds[runs:runs + batch_size], **batch_kwargs)
+        batch.run(num_steps)
+        if estimator is None:
+            estimator = OutcomeEstimator(batch.template.candidates, batch.template.candidates_by_post)
+        estimator.update(tally_batch(batch, rule, temperature))
+        runs += batch.num_replicas
+        if estimator.converged(tolerance, z):
+            break
+    return OutcomeEstimate(estimator=estimator, runs=runs, converged=estimator.converged(tolerance, z))
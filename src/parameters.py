@@ -0,0 +1,24 @@
+from dataclasses import asdict, dataclass
+
+from src.engine import INFLUENCE_FACTOR, JUNIOR_SENIOR_MULTIPLIER, ROLE_MULTIPLIER, TURNOUT_ELASTICITY
+from src.propagation import TRANSMISSION_PROBABILITY
+
+CONFIDENCE_THRESHOLD = 0.2
+
+@dataclass(frozen=True)
+class ModelParameters:
+    """Tunable constants of the opinion, turnout and misinformation rules.
+
+    The defaults are the values the rules were written with, so a model built
+    without parameters behaves exactly as before. ``confidence_threshold`` is
+    only read by BoundedConfidenceElectionModel.
+    """
+    influence_factor: float = INFLUENCE_FACTOR
+    junior_senior_multiplier: float = JUNIOR_SENIOR_MULTIPLIER
+    role_multiplier: float = ROLE_MULTIPLIER
+    transmission_probability: float = TRANSMISSION_PROBABILITY
+    turnout_elasticity: float = TURNOUT_ELASTICITY
+    confidence_threshold: float = CONFIDENCE_THRESHOLD
+
+    def to_dict(self):
+        return asdict(self)
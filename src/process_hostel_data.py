@@ -1,10 +1,14 @@
 
+import os
+import sys
+import numpy as np
 import pandas as pd
-import random
+from src.loader import DATA_DIR
 
 # Configuration
-INPUT_FILE = "/Users/ashishmishra/Downloads/hostel_data_2025.csv"
-OUTPUT_STUDENTS_FILE = "/Users/ashishmishra/bits-election-simulator/data/students.csv"
+INPUT_FILE = os.path.join(DATA_DIR, "hostel_data_2025.csv")
+OUTPUT_STUDENTS_FILE = os.path.join(DATA_DIR, "students.csv")
+SEED = 42
 
 CLUBS = ['Dance', 'Music', 'Debate', 'Drama', 'Photography', 'Coding', 'Finance', 'Sports', 'Literature']
 INTERESTS = ['Academics', 'Campus Facilities', 'Cultural Events', 'Sports', 'Career Development']
@@ -15,43 +19,49 @@ def get_dept_from_id(bits_id):
     dept_code = bits_id[4:6]
     return dept_code
 
-def process_students_data():
+def sample_lists(options, counts, rng):
+    """Draws ``counts[i]`` distinct options for every row, in bulk."""
+    order = np.argsort(rng.random((len(counts), len(options))), axis=1)
+    options = np.asarray(options, dtype=object)
+    return [options[row[:count]].tolist() for row, count in zip(order, counts.tolist())]
+
+def build_students(df, seed=SEED):
+    """Builds the students table from raw hostel data with 'BITS ID' and 'HOSTEL CODE' columns."""
+    rng = np.random.default_rng(seed)
+    ids = df['BITS ID'].astype(str)
+    hostels = df['HOSTEL CODE'].to_numpy()
+    depts = ids.map(get_dept_from_id).to_numpy()
+    n = len(df)
+    traits = rng.uniform(0.1, 0.9, size=(3, n))
+    return pd.DataFrame({
+        'id': ids.to_numpy(),
+        'hostel': hostels,
+        'batch': ids.str[:4].astype(int).to_numpy(),
+        'dept': depts,
+        'clubs': sample_lists(CLUBS, rng.integers(0, 3, size=n, endpoint=True), rng),
+        'interests': sample_lists(INTERESTS, rng.integers(1, 3, size=n, endpoint=True), rng),
+        'baseline_turnout_propensity': traits[0],
+        'slander_susceptibility': traits[1],
+        'skepticism': traits[2],
+        'micro_community': [f"{hostel}_{dept}" for hostel, dept in zip(hostels, depts)],
+    })
+
+def process_students_data(input_file=INPUT_FILE):
     """Processes the raw hostel data to create the students.csv file."""
-    print(f"Reading raw data from {INPUT_FILE}...")
+    print(f"Reading raw data from {input_file}...")
     try:
-        df = pd.read_csv(INPUT_FILE)
+        df = pd.read_csv(input_file)
     except FileNotFoundError:
-        print(f"Error: Input file not found at {INPUT_FILE}")
+        print(f"Error: Input file not found at {input_file}")
         return
 
     print("Processing student data...")
-    students_data = []
-    for _, row in df.iterrows():
-        bits_id = row['BITS ID']
-        hostel = row['HOSTEL CODE']
-        batch = int(bits_id[:4])
-        dept = get_dept_from_id(bits_id)
-
-        student = {
-            'id': bits_id,
-            'hostel': hostel,
-            'batch': batch,
-            'dept': dept,
-            'clubs': random.sample(CLUBS, k=random.randint(0, 3)),
-            'interests': random.sample(INTERESTS, k=random.randint(1, 3)),
-            'baseline_turnout_propensity': random.uniform(0.1, 0.9),
-            'slander_susceptibility': random.uniform(0.1, 0.9),
-            'skepticism': random.uniform(0.1, 0.9),
-            'micro_community': f"{hostel}_{dept}"
-        }
-        students_data.append(student)
-
-    students_df = pd.DataFrame(students_data)
+    students_df = build_students(df)
     students_df.to_csv(OUTPUT_STUDENTS_FILE, index=False)
     print(f"Successfully created {OUTPUT_STUDENTS_FILE} with {len(students_df)} students.")
 
 def main():
-    process_students_data()
+    process_students_data(*sys.argv[1:2])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,133 @@
+import json
+import tracemalloc
+from collections import defaultdict
+from time import perf_counter
+
+import pandas as pd
+
+# (owner attribute path, method name, phase name) instrumented on the model
+MODEL_PHASES = [
+    ("", "step", "step"),
+    ("", "release_manifestos", "release_manifestos"),
+    ("", "slander_drop", "slander_drop"),
+    ("", "propose_deals", "propose_deals"),
+    ("", "calculate_next_opinion", "calculate_next_opinion"),
+    ("datacollector", "collect", "datacollector.collect"),
+    ("propagation", "step", "propagation.step"),
+    ("engine", "step", "engine.step"),
+]
+# Instrumented on the agents' classes, for this model's agents only; agent.step includes the sub-phases below it
+AGENT_PHASES = [
+    ("step", "agent.step"),
+    ("advance", "agent.advance"),
+    ("process_exposure", "process_exposure"),
+    ("spread_misinformation", "spread_misinformation"),
+    ("rebut_misinformation", "rebut_misinformation"),
+    ("update_turnout_propensity", "update_turnout_propensity"),
+]
+
+class StepProfiler:
+    """Opt-in per-tick wall time, call count and allocation profile of an ElectionModel.
+
+    ``attach`` wraps the model's phase methods as instance attributes and the
+    agent phases once on the agent classes, counting only this model's agents;
+    ``detach`` removes every wrapper, so an unprofiled model runs exactly the
+    original code. Calls made between ticks (slander drops, manifesto releases)
+    are attributed to the next tick. Records count the model's step calls, so
+    a profiled run should step every tick rather than fast-forward (run_scenario
+    does). Allocation deltas use tracemalloc and are only recorded with
+    ``trace_memory=True``.
+    """
+    def __init__(self, trace_memory=False, logger=None):
+        self.trace_memory = trace_memory
+        self.logger = logger
+        self.records = []
+        self.ticks = 0
+        self._current = defaultdict(lambda: [0, 0.0, 0])
+        self._patched = []
+        self._started_tracemalloc = False
+
+    def attach(self, model):
+        """Instruments the model, its components and all of its agents."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        for path, name, phase in MODEL_PHASES:
+            owner = getattr(model, path) if path else model
+            if owner is not None:
+                self._wrap(owner, name, phase)
+        for agent_class in {type(agent) for agent in model.agents}:
+            for name, phase in AGENT_PHASES:
+                self._wrap_class(agent_class, name, phase, model)
+        return self
+
+    def detach(self):
+        """Restores every instrumented method."""
+        for owner, name, original, had_instance_attr in reversed(self._patched):
+            if had_instance_attr:
+                setattr(owner, name, original)
+            else:
+                delattr(owner, name)
+        self._patched = []
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _timed(self, original, phase):
+        stats = self._current
+        trace_memory = self.trace_memory
+
+        def timed(*args, **kwargs):
+            memory = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+            start = perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                record = stats[phase]
+                record[0] += 1
+                record[1] += perf_counter() - start
+                if trace_memory:
+                    record[2] += tracemalloc.get_traced_memory()[0] - memory
+                if phase == "step":
+                    self.flush()
+        return timed
+
+    def _wrap(self, owner, name, phase):
+        original = getattr(owner, name)
+        self._patched.append((owner, name, original, name in vars(owner)))
+        setattr(owner, name, self._timed(original, phase))
+
+    def _wrap_class(self, owner, name, phase, model):
+        # One wrapper per class instead of one per agent; other models' agents skip the timing
+        had_attr = name in vars(owner)
+        original = vars(owner)[name] if had_attr else None
+        method = getattr(owner, name)
+        timed = self._timed(method, phase)
+
+        def wrapped(agent, *args, **kwargs):
+            if agent.model is model:
+                return timed(agent, *args, **kwargs)
+            return method(agent, *args, **kwargs)
+
+        self._patched.append((owner, name, original, had_attr))
+        setattr(owner, name, wrapped)
+
+    def flush(self):
+        """Closes the current tick and moves its counters into ``records``."""
+        for phase, (calls, wall_time, alloc_bytes) in self._current.items():
+            record = {'step': self.ticks, 'phase': phase, 'calls': calls,
+                      'wall_time': wall_time, 'alloc_bytes': alloc_bytes}
+            self.records.append(record)
+            if self.logger is not None:
+                self.logger.info(json.dumps(record))
+        self._current.clear()
+        self.ticks += 1
+
+    def to_dataframe(self):
+        """One row per (step, phase)."""
+        return pd.DataFrame(self.records, columns=['step', 'phase', 'calls', 'wall_time', 'alloc_bytes'])
+
+    def summary(self):
+        """Totals per phase, slowest first."""
+        df = self.to_dataframe()
+        return df.groupby('phase')[['calls', 'wall_time', 'alloc_bytes']].sum().sort_values('wall_time', ascending=False)
@@ -0,0 +1,204 @@
+import heapq
+
+import numpy as np
+
+from src.rng import UniformBuffer
+
+# Misinformation state codes
+SUSCEPTIBLE = 0
+EXPOSED = 1
+INFECTED = 2
+FACT_CHECKER = 3
+STATE_NAMES = ["susceptible", "exposed", "infected", "fact-checker"]
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+TRANSMISSION_PROBABILITY = 0.2
+REBUTTAL_FACTOR = 0.5
+# Opinion penalty per unit of severity of the slander an infected agent believes
+SLANDER_PENALTY = 0.1
+
+def gather_rows(indptr, indices, rows):
+    """Returns (row, neighbor) pairs for every CSR entry in the given rows."""
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = counts.sum()
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return np.repeat(rows, counts), indices[np.arange(total) + offsets]
+
+def ordered_sweep(indptr, indices, state, infected_by, rows, draw, skepticism, susceptibility, plausibility, severity,
+                  transmission_probability, rebuttal_enabled, penalty):
+    """One tick of misinformation in row order, as agents.do("step") runs it per agent.
+
+    ``rows`` are the agents not susceptible at the start of the tick. Each is
+    visited in turn: an exposed agent resolves its exposure, an infected one then
+    tries each susceptible neighbor and a fact-checker rebuts its exposed or
+    infected neighbors. A neighbor exposed further down the row order is visited
+    later in the same tick, so it can believe and spread at once. Coins come from
+    ``draw`` one at a time, in the order and under the conditions the agent
+    methods draw them. ``penalty`` receives the slander penalty of the agents
+    infected at their own turn. Returns the rows exposed during the tick.
+    """
+    heap = rows.tolist()
+    heapq.heapify(heap)
+    exposed = []
+    last = -1
+    while heap:
+        i = heapq.heappop(heap)
+        if i == last:
+            continue
+        last = i
+        code = state[i]
+        k = infected_by[i]
+        if code == EXPOSED and k >= 0:
+            if draw() < skepticism[i]:
+                code = state[i] = FACT_CHECKER
+            elif draw() < susceptibility[i] * plausibility[k]:
+                code = state[i] = INFECTED
+        if code == INFECTED:
+            for j in indices[indptr[i]:indptr[i + 1]].tolist():
+                if state[j] == SUSCEPTIBLE and draw() < transmission_probability:
+                    state[j] = EXPOSED
+                    infected_by[j] = k
+                    exposed.append(j)
+                    if j > i:
+                        heapq.heappush(heap, j)
+            if k >= 0:
+                penalty[i] = severity[k] * SLANDER_PENALTY
+        elif code == FACT_CHECKER and rebuttal_enabled:
+            chance = skepticism[i] * REBUTTAL_FACTOR
+            for j in indices[indptr[i]:indptr[i + 1]].tolist():
+                if (state[j] == EXPOSED or state[j] == INFECTED) and draw() < chance:
+                    state[j] = SUSCEPTIBLE
+                    infected_by[j] = -1
+    return np.array(exposed, dtype=np.int64)
+
+class MisinformationKernel:
+    """Frontier-based misinformation propagation over the model's combined CSR adjacency.
+
+    States are kept in the int8 ``state`` array of the model's AgentStore and the
+    misinformation carried by each agent as an index into ``model.misinformation``.
+    A tick only visits the CSR rows of the non-susceptible frontier.
+
+    ``synchronous=False`` (staged) runs the agent engine's dynamics: the frontier
+    is swept in row order by ordered_sweep, drawing its coins one by one from
+    ``draw``. Given the model's ``uniform('misinformation')`` stream, as
+    ElectionModel passes it, a run matches ``propagation="agent"`` draw for
+    draw. ``synchronous=True`` decides every
+    transition from the state at the start of the tick, with all coins drawn in
+    bulk from ``rng``; results are then independent of processing order, but an
+    agent exposed during a tick waits for the next one, so the slander spreads
+    more slowly than in the agent engine.
+    """
+    def __init__(self, model, synchronous=False, rng=None, draw=None):
+        self.model = model
+        self.synchronous = synchronous
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.draw = draw if draw is not None else UniformBuffer(self.rng)
+        self.load_network()
+        # The model's AgentStore arrays, shared so the agents see every transition
+        store = model.store
+        self.skepticism = store.skepticism
+        self.susceptibility = store.slander_susceptibility
+        self.plausibility = np.array([m.plausibility for m in model.misinformation], dtype=np.float64)
+        self.severity = np.array([m.severity for m in model.misinformation], dtype=np.float64)
+        self.misinformation_index = {m.id: k for k, m in enumerate(model.misinformation)}
+        self.state = store.state
+        self.infected_by = store.infected_by
+        # Every non-susceptible agent; the only rows a tick ever visits
+        self.active = np.flatnonzero(self.state != SUSCEPTIBLE)
+        # Slander penalty of the last tick, see slander_penalty, and the rows it may be nonzero on
+        self.penalty = np.zeros(len(self.state))
+        self.penalized = np.empty(0, dtype=np.int64)
+
+    def load_network(self):
+        """Takes the CSR structure of the model's influence matrix for its current layer configuration."""
+        self.indptr, self.indices = self.model.influence.indptr, self.model.influence.indices
+
+    def expose(self, rows, misinformation):
+        """Exposes the susceptible agents among ``rows`` to a piece of misinformation."""
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[self.state[rows] == SUSCEPTIBLE]
+        self.state[rows] = EXPOSED
+        self.infected_by[rows] = self.misinformation_index[misinformation.id]
+        self.active = np.union1d(self.active, rows)
+
+    def inoculate(self, rows):
+        """Turns the susceptible agents among ``rows`` into fact-checkers."""
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[self.state[rows] == SUSCEPTIBLE]
+        self.state[rows] = FACT_CHECKER
+        self.active = np.union1d(self.active, rows)
+
+    def slander_penalty(self):
+        """Per-agent opinion penalty (severity * SLANDER_PENALTY) of the tick last stepped.
+
+        Staged, an agent's penalty is fixed at its own turn, where the agent engine
+        reads its state; synchronous, it follows the state at the end of the tick.
+        """
+        return self.penalty
+
+    def _resolve_exposure(self, exposed):
+        carrying = self.infected_by[exposed] >= 0
+        check = self.rng.random(len(exposed))
+        believe = self.rng.random(len(exposed))
+        to_fact_checker = carrying & (check < self.skepticism[exposed])
+        plausibility = self.plausibility[np.maximum(self.infected_by[exposed], 0)]
+        to_infected = carrying & ~to_fact_checker & (believe < self.susceptibility[exposed] * plausibility)
+        return exposed[to_fact_checker], exposed[to_infected]
+
+    def _spread(self, spreaders, targets_state):
+        source, neighbor = gather_rows(self.indptr, self.indices, spreaders)
+        candidate = targets_state(neighbor)
+        source, neighbor = source[candidate], neighbor[candidate]
+        hit = self.rng.random(len(neighbor)) < self.model.parameters.transmission_probability
+        neighbor, first = np.unique(neighbor[hit], return_index=True)
+        return neighbor, self.infected_by[source[hit][first]]
+
+    def _rebut(self, fact_checkers, targets_state):
+        source, neighbor = gather_rows(self.indptr, self.indices, fact_checkers)
+        candidate = targets_state(neighbor)
+        source, neighbor = source[candidate], neighbor[candidate]
+        hit = self.rng.random(len(neighbor)) < self.skepticism[source] * REBUTTAL_FACTOR
+        return np.unique(neighbor[hit])
+
+    def step(self):
+        """Advances misinformation by one tick."""
+        state = self.state
+        active = self.active
+        active_state = state[active]
+        # Clear the last tick's penalty on the rows that carried it, not across every agent
+        self.penalty[self.penalized] = 0.0
+        self.penalized = np.empty(0, dtype=np.int64)
+        if not np.any((active_state == EXPOSED) | (active_state == INFECTED)):
+            # Nothing can move: fact-checkers only rebut exposed or infected agents
+            return
+        rebuttal_enabled = self.model.rebuttal_enabled
+
+        if self.synchronous:
+            before = {code: active[active_state == code] for code in (INFECTED, FACT_CHECKER)}
+            to_fact_checker, to_infected = self._resolve_exposure(active[active_state == EXPOSED])
+            newly_exposed, carried = self._spread(before[INFECTED], lambda n: state[n] == SUSCEPTIBLE)
+            reset = np.empty(0, dtype=np.int64)
+            if rebuttal_enabled:
+                reset = self._rebut(before[FACT_CHECKER], lambda n: (state[n] == EXPOSED) | (state[n] == INFECTED))
+            state[to_fact_checker] = FACT_CHECKER
+            state[to_infected] = INFECTED
+            state[newly_exposed] = EXPOSED
+            self.infected_by[newly_exposed] = carried
+            state[reset] = SUSCEPTIBLE
+            self.infected_by[reset] = -1
+        else:
+            newly_exposed = ordered_sweep(self.indptr, self.indices, state, self.infected_by, active, self.draw,
+                                          self.skepticism, self.susceptibility, self.plausibility, self.severity,
+                                          self.model.parameters.transmission_probability, rebuttal_enabled, self.penalty)
+
+        active = np.union1d(active, newly_exposed)
+        self.active = active[state[active] != SUSCEPTIBLE]
+        if self.synchronous:
+            infected = self.active[(state[self.active] == INFECTED) & (self.infected_by[self.active] >= 0)]
+            self.penalty[infected] = self.severity[self.infected_by[infected]] * SLANDER_PENALTY
+            self.penalized = infected
+        else:
+            # The sweep only sets the penalty of rows it visited
+            self.penalized = active
+
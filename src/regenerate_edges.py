@@ -1,100 +1,145 @@
-
+import numpy as np
 import pandas as pd
-import random
-from itertools import combinations
-from typing import List
-from data_schema import Student, Edge
+from src.loader import EDGES_PARQUET_FILE, STUDENTS_FILE, parse_list_column
 
 # Configuration
-INPUT_STUDENTS_FILE = "/Users/ashishmishra/bits-election-simulator/data/students.csv"
-OUTPUT_EDGES_FILE = "/Users/ashishmishra/bits-election-simulator/data/edges.csv"
+INPUT_STUDENTS_FILE = STUDENTS_FILE
+OUTPUT_EDGES_FILE = EDGES_PARQUET_FILE
 AVG_FRIENDS_PER_STUDENT = 20
+WING_SIZE = 10
+ACADEMIC_EDGE_PROBABILITY = 0.1
+CLUB_EDGE_PROBABILITY = 0.4
+SEED = 42
+
+def geometric_gaps(p, size, rng):
+    """``size`` gaps between successes of independent Bernoulli(``p``) trials, by inverting the geometric CDF."""
+    if p >= 1:
+        return np.ones(size, dtype=np.int64)
+    return np.floor(np.log1p(-rng.random(size)) / np.log1p(-p)).astype(np.int64) + 1
+
+def sample_pairs(size, p, rng):
+    """Samples each unordered pair of ``size`` members independently with probability ``p``.
+
+    Walks the row-major upper triangle with geometric gaps between kept pairs, so
+    the cost scales with the pairs kept, not size**2, and nothing the size of the
+    triangle is allocated.
+    """
+    total = size * (size - 1) // 2
+    if total == 0 or p <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    expected = total * min(p, 1.0)
+    flat = np.cumsum(geometric_gaps(p, int(expected + 4 * np.sqrt(expected)) + 16, rng)) - 1
+    while flat[-1] < total:
+        flat = np.concatenate([flat, flat[-1] + np.cumsum(geometric_gaps(p, len(flat), rng))])
+    flat = flat[flat < total]
+    i = size - 2 - np.floor(np.sqrt(-8 * flat + 4 * size * (size - 1) - 7) / 2.0 - 0.5).astype(np.int64)
+    j = flat + i + 1 - total + (size - i) * (size - i - 1) // 2
+    return i, j
+
+def _edge_frame(ids, u, v, layer, low, high, rng):
+    return pd.DataFrame({
+        'source': ids[u],
+        'target': ids[v],
+        'layer': layer,
+        'weight': rng.uniform(low, high, size=len(u)),
+    })
+
+def _groups(df, keys):
+    """Row positions of each group, split by campus as well when the column exists."""
+    if 'campus' in df:
+        keys = ['campus'] + keys
+    return df.groupby(keys, sort=True).indices.values()
 
-def create_friendship_edges(students: List[Student], avg_friends: int) -> List[Edge]:
+def create_friendship_edges(students: pd.DataFrame, avg_friends: int, rng) -> pd.DataFrame:
     """Generates random friendship edges between students."""
-    edges = []
-    student_ids = [s['id'] for s in students]
-    for student in students:
-        num_friends = random.randint(1, avg_friends * 2)
-        friends = random.sample(student_ids, k=min(num_friends, len(student_ids)))
-        for friend_id in friends:
-            if student['id'] != friend_id:
-                edge = Edge(
-                    source=student['id'],
-                    target=friend_id,
-                    layer='friendship',
-                    weight=random.uniform(0.2, 1.0)
-                )
-                edges.append(edge)
-    return edges
+    ids = students['id'].to_numpy()
+    n = len(ids)
+    num_friends = np.minimum(rng.integers(1, avg_friends * 2, size=n, endpoint=True), n)
+    source = np.repeat(np.arange(n), num_friends)
+    pairs = np.unique(source * n + rng.integers(0, n, size=len(source)))
+    # Each student picks num_friends distinct students without replacement, as
+    # random.sample did, redrawing the repeats; picking themselves adds no edge
+    missing = num_friends - np.bincount(pairs // n, minlength=n)
+    while missing.any():
+        source = np.repeat(np.arange(n), missing)
+        pairs = np.unique(np.concatenate([pairs, source * n + rng.integers(0, n, size=len(source))]))
+        missing = num_friends - np.bincount(pairs // n, minlength=n)
+    source, target = pairs // n, pairs % n
+    keep = source != target
+    return _edge_frame(ids, source[keep], target[keep], 'friendship', 0.2, 1.0, rng)
 
-def create_residence_edges(students: List[dict]) -> List[Edge]:
-    """Generates edges between students in the same hostel."""
-    edges = []
-    students_by_hostel = pd.DataFrame(students).groupby('hostel')
-    for hostel, group in students_by_hostel:
-        for _ in range(int(len(group) / 10)):
-            wing_members = group.sample(n=min(len(group), 10))
-            for u, v in combinations(wing_members['id'], 2):
-                edge = Edge(source=u, target=v, layer='residence', weight=random.uniform(0.4, 0.8))
-                edges.append(edge)
-    return edges
+def create_residence_edges(students: pd.DataFrame, rng) -> pd.DataFrame:
+    """Generates edges between students in the same hostel wing."""
+    ids = students['id'].to_numpy()
+    sources, targets = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for members in _groups(students, ['hostel']):
+        num_wings = len(members) // WING_SIZE
+        if num_wings == 0:
+            continue
+        wings = rng.permuted(np.tile(members, (num_wings, 1)), axis=1)[:, :WING_SIZE]
+        u, v = np.triu_indices(WING_SIZE, k=1)
+        sources.append(wings[:, u].ravel())
+        targets.append(wings[:, v].ravel())
+    return _edge_frame(ids, np.concatenate(sources), np.concatenate(targets), 'residence', 0.4, 0.8, rng)
+
+def _group_pair_edges(students, groups, p, layer, low, high, rng):
+    ids = students['id'].to_numpy()
+    sources, targets = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for members in groups:
+        i, j = sample_pairs(len(members), p, rng)
+        sources.append(members[i])
+        targets.append(members[j])
+    return _edge_frame(ids, np.concatenate(sources), np.concatenate(targets), layer, low, high, rng)
 
-def create_academic_edges(students: List[dict]) -> List[Edge]:
+def create_academic_edges(students: pd.DataFrame, rng) -> pd.DataFrame:
     """Generates edges between students in the same batch and department."""
-    edges = []
-    df = pd.DataFrame(students)
-    students_by_academic = df.groupby(['batch', 'dept'])
-    for _, group in students_by_academic:
-        for u, v in combinations(group['id'], 2):
-            if random.random() < 0.1:
-                edge = Edge(source=u, target=v, layer='academic', weight=random.uniform(0.2, 0.6))
-                edges.append(edge)
-    return edges
+    return _group_pair_edges(students, _groups(students, ['batch', 'dept']), ACADEMIC_EDGE_PROBABILITY, 'academic', 0.2, 0.6, rng)
 
-def create_club_edges(students: List[dict]) -> List[Edge]:
+def create_club_edges(students: pd.DataFrame, rng) -> pd.DataFrame:
     """Generates edges between students in the same clubs."""
-    edges = []
-    df = pd.DataFrame(students)
-    # The 'clubs' column is a string representation of a list, so we need to evaluate it
-    df['clubs'] = df['clubs'].apply(eval)
-    df_clubs = df.explode('clubs')
-    students_by_club = df_clubs.groupby('clubs')
-    for _, group in students_by_club:
-        for u, v in combinations(group['id'], 2):
-             if random.random() < 0.4:
-                edge = Edge(source=u, target=v, layer='club', weight=random.uniform(0.5, 0.9))
-                edges.append(edge)
+    clubs = students['clubs']
+    if not len(clubs) or isinstance(clubs.iloc[0], str):
+        clubs = parse_list_column(clubs)
+    memberships = pd.DataFrame({'row': np.arange(len(students)), 'club': clubs}).explode('club').dropna()
+    if 'campus' in students:
+        memberships['campus'] = students['campus'].to_numpy()[memberships['row'].to_numpy(dtype=np.int64)]
+    positions = memberships['row'].to_numpy(dtype=np.int64)
+    groups = [positions[rows] for rows in _groups(memberships, ['club'])]
+    return _group_pair_edges(students, groups, CLUB_EDGE_PROBABILITY, 'club', 0.5, 0.9, rng)
+
+def generate_edges(students: pd.DataFrame, seed=SEED, avg_friends=AVG_FRIENDS_PER_STUDENT) -> pd.DataFrame:
+    """Generates all edge layers; the same seed always yields the same edges."""
+    rng = np.random.default_rng(seed)
+    edges = pd.concat([
+        create_friendship_edges(students, avg_friends, rng),
+        create_residence_edges(students, rng),
+        create_academic_edges(students, rng),
+        create_club_edges(students, rng),
+    ], ignore_index=True)
+    edges['layer'] = edges['layer'].astype('category')
     return edges
 
-def save_to_csv(data: List, file_path: str):
-    """Saves a list of dataclass objects to a CSV file."""
-    if not data:
+def save_to_parquet(edges: pd.DataFrame, file_path: str):
+    """Saves the columnar edge table to a Parquet file."""
+    if edges.empty:
         return
-    df = pd.DataFrame([vars(d) for d in data])
-    df.to_csv(file_path, index=False)
-    print(f"Successfully saved {len(data)} records to {file_path}")
+    edges.to_parquet(file_path, index=False)
+    print(f"Successfully saved {len(edges)} records to {file_path}")
 
 def main():
     """Main function to regenerate edges based on the new students.csv."""
     print(f"Reading students from {INPUT_STUDENTS_FILE}...")
     try:
         students_df = pd.read_csv(INPUT_STUDENTS_FILE)
-        students = students_df.to_dict('records')
     except FileNotFoundError:
         print(f"Error: Input file not found at {INPUT_STUDENTS_FILE}")
         return
 
     print("Generating new edges...")
-    friend_edges = create_friendship_edges(students, AVG_FRIENDS_PER_STUDENT)
-    residence_edges = create_residence_edges(students)
-    academic_edges = create_academic_edges(students)
-    club_edges = create_club_edges(students)
-
-    all_edges = friend_edges + residence_edges + academic_edges + club_edges
+    all_edges = generate_edges(students_df)
     print(f"Total edges from all layers: {len(all_edges)}")
 
-    save_to_csv(all_edges, OUTPUT_EDGES_FILE)
+    save_to_parquet(all_edges, OUTPUT_EDGES_FILE)
     print("Edge regeneration complete.")
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+import numpy as np
+
+# One independent stream per stochastic phase, so changing how often one phase
+# draws never shifts the numbers another phase sees. Append new streams at the end:
+# child i of SeedSequence.spawn does not depend on how many children are spawned
+STREAMS = ['agents', 'misinformation', 'deals', 'propagation', 'votes']
+BUFFER_SIZE = 4096
+
+class UniformBuffer:
+    """Scalar uniform [0, 1) draws served from bulk ``Generator.random`` calls.
+
+    Successive bulk calls yield the same doubles as one draw at a time, so the
+    sequence does not depend on ``size``.
+    """
+    def __init__(self, rng, size=BUFFER_SIZE):
+        self.rng = rng
+        self.size = size
+        self.values = []
+        self.position = 0
+
+    def __call__(self):
+        if self.position == len(self.values):
+            self.values = self.rng.random(self.size).tolist()
+            self.position = 0
+        value = self.values[self.position]
+        self.position += 1
+        return value
+
+class RandomStreams:
+    """Seeded numpy Generators for one run, one per name in STREAMS.
+
+    All are spawned from ``SeedSequence(seed)``, so a run is reproduced exactly by
+    its seed alone, whichever process or engine executes it. ``seed=None`` draws
+    fresh entropy.
+    """
+    def __init__(self, seed=None):
+        children = np.random.SeedSequence(seed).spawn(len(STREAMS))
+        self.generators = {name: np.random.default_rng(child) for name, child in zip(STREAMS, children)}
+        self.buffers = {name: UniformBuffer(rng) for name, rng in self.generators.items()}
+
+    def __getitem__(self, name):
+        return self.generators[name]
+
+    def uniform(self, name):
+        """Callable returning the next scalar uniform draw of stream ``name``."""
+        return self.buffers[name]
+
+    def state(self):
+        """Generator states plus any buffered draws not yet used."""
+        return {name: (rng.bit_generator.state, self.buffers[name].values[self.buffers[name].position:])
+                for name, rng in self.generators.items()}
+
+    def set_state(self, state):
+        for name, (bit_generator_state, pending) in state.items():
+            self.generators[name].bit_generator.state = bit_generator_state
+            self.buffers[name].values = list(pending)
+            self.buffers[name].position = 0
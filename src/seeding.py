@@ -0,0 +1,163 @@
+import heapq
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from src.data_schema import Misinformation
+from src.propagation import REBUTTAL_FACTOR, TRANSMISSION_PROBABILITY
+from src.topology import CampusTopology
+
+# Ticks the misinformation has to spread; run_simulation drops it at step 4 of 10
+HORIZON = 6
+NUM_WORLDS = 200
+DEFAULT_MISINFORMATION = Misinformation("m1", "Candidate A cheated in an exam", 0.8, 0.6, "rival_camp")
+
+class LiveEdgeCascade:
+    """Live-edge approximation of the misinformation cascade of MisinformationKernel.
+
+    An exposed agent ends up infected with probability
+    (1 - s) q / (s + (1 - s) q), where s is its skepticism and q its slander
+    susceptibility times the plausibility: each tick it turns fact-checker with
+    probability s, else believes with probability q. An infected agent retries
+    every neighbor each tick, so an edge carries the slander within ``horizon``
+    ticks with probability 1 - (1 - TRANSMISSION_PROBABILITY)^horizon. Timing
+    within the horizon is ignored.
+
+    A sampled world keeps each agent and edge with those probabilities; the
+    slander then infects every believing agent in a component holding a believing
+    seed. The component of an agent is its reverse-reachable set in that world, so
+    one connected-components pass yields a reverse-reachable set for every root.
+    """
+    def __init__(self, graph, misinformation=DEFAULT_MISINFORMATION, horizon=HORIZON):
+        self.topology = graph if isinstance(graph, CampusTopology) else CampusTopology(graph)
+        indptr, indices = self.topology.neighbors()
+        self.indptr, self.indices = indptr, indices
+        self.num_agents = n = len(self.topology)
+        self.horizon = horizon
+        skepticism = np.asarray(self.topology.skepticism, dtype=np.float64)
+        believe = np.asarray(self.topology.slander_susceptibility, dtype=np.float64) * misinformation.plausibility
+        settled = skepticism + (1 - skepticism) * believe
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.activation = np.where(settled > 0, (1 - skepticism) * believe / settled, 0.0)
+        self.edge_probability = 1 - (1 - TRANSMISSION_PROBABILITY) ** horizon
+        self.rebuttal = 1 - (1 - skepticism * REBUTTAL_FACTOR) ** horizon
+        # Each undirected edge once
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        upper = rows < indices
+        self.edge_source, self.edge_target = rows[upper], indices[upper]
+
+    def sample_worlds(self, num_worlds, rng):
+        """Component labels of ``num_worlds`` sampled worlds, and every component's size.
+
+        Labels are a (worlds x agents) array of ids unique across worlds, -1 for
+        agents that would not believe the slander in that world.
+        """
+        n = self.num_agents
+        labels = np.full((num_worlds, n), -1, dtype=np.int64)
+        sizes = []
+        offset = 0
+        for w in range(num_worlds):
+            believes = rng.random(n) < self.activation
+            live = rng.random(len(self.edge_source)) < self.edge_probability
+            live &= believes[self.edge_source] & believes[self.edge_target]
+            world = sparse.csr_matrix((np.ones(np.count_nonzero(live)), (self.edge_source[live], self.edge_target[live])), shape=(n, n))
+            _, components = csgraph.connected_components(world, directed=False)
+            # Relabel believing agents' components densely, so sizes stay compact
+            codes, dense = np.unique(components[believes], return_inverse=True)
+            labels[w, believes] = offset + dense
+            sizes.append(np.bincount(dense, minlength=len(codes)))
+            offset += len(codes)
+        return labels, np.concatenate(sizes) if sizes else np.empty(0, dtype=np.int64)
+
+    def infection_probability(self, seeds, num_worlds=NUM_WORLDS, rng=None, worlds=None):
+        """Probability that each agent is infected when the slander is dropped on ``seeds`` (topology rows)."""
+        labels, sizes = worlds if worlds is not None else self.sample_worlds(num_worlds, rng if rng is not None else np.random.default_rng())
+        hit = np.zeros(len(sizes) + 1, dtype=bool)
+        seeded = labels[:, np.asarray(seeds, dtype=np.int64)]
+        hit[seeded[seeded >= 0]] = True
+        # Index -1 lands on the trailing False
+        return hit[labels].mean(axis=0)
+
+def greedy_cover(labels, sizes, k):
+    """Greedy maximum coverage of sampled components, weighted by their size.
+
+    Picking an agent covers its component in every world where it believes; the
+    gain is the covered size averaged over worlds. Returns the chosen topology rows
+    and the expected infections after each pick.
+    """
+    num_worlds = len(labels)
+    weight = np.append(sizes, 0).astype(np.float64)
+    counts = weight[labels].sum(axis=0)
+    covered = np.zeros(len(weight), dtype=bool)
+    covered[-1] = True
+    chosen, totals = [], []
+    total = 0.0
+    for _ in range(min(k, labels.shape[1])):
+        agent = int(np.argmax(counts))
+        new = labels[:, agent]
+        new = np.unique(new[~covered[new]])
+        chosen.append(agent)
+        total += weight[new].sum() / num_worlds
+        totals.append(total)
+        fresh = np.zeros(len(weight), dtype=bool)
+        fresh[new] = True
+        covered[new] = True
+        counts -= np.where(fresh[labels], weight[labels], 0).sum(axis=0)
+        counts[agent] = -np.inf
+    return chosen, np.array(totals)
+
+def select_slander_targets(graph, k, misinformation=DEFAULT_MISINFORMATION, horizon=HORIZON, num_worlds=NUM_WORLDS, seed=0):
+    """The k agents (node ids) whose exposure maximizes expected infections.
+
+    Greedy maximum coverage over the reverse-reachable sets of ``num_worlds``
+    sampled worlds, which is within 1 - 1/e of the best seed set up to sampling
+    error. Returns the node ids and the expected infections after each pick.
+    """
+    cascade = graph if isinstance(graph, LiveEdgeCascade) else LiveEdgeCascade(graph, misinformation, horizon)
+    labels, sizes = cascade.sample_worlds(num_worlds, np.random.default_rng(seed))
+    chosen, expected = greedy_cover(labels, sizes, k)
+    return [cascade.topology.node_ids[i] for i in chosen], expected
+
+def select_defenders(graph, k, threat, misinformation=DEFAULT_MISINFORMATION, horizon=HORIZON, num_worlds=NUM_WORLDS, seed=0):
+    """The k agents (node ids) to inoculate as fact-checkers against the slander on ``threat``.
+
+    The objective is expected rebuttal coverage: each agent weighs its infection
+    probability under the threat, and is covered by itself (when inoculated) or by
+    each inoculated neighbor, who rebuts it within the horizon with probability
+    1 - (1 - skepticism * REBUTTAL_FACTOR)^horizon. The objective is submodular, so
+    CELF lazy greedy re-evaluates only the candidates whose stale gain tops the heap.
+    Returns the node ids and the covered expected infections after each pick.
+    """
+    cascade = graph if isinstance(graph, LiveEdgeCascade) else LiveEdgeCascade(graph, misinformation, horizon)
+    topology = cascade.topology
+    rows = [topology.index[node_id] for node_id in threat]
+    weight = cascade.infection_probability(rows, num_worlds, np.random.default_rng(seed))
+    indptr, indices, rebuttal = cascade.indptr, cascade.indices, cascade.rebuttal
+    remaining = weight.copy()
+
+    def gain(i):
+        neighbors = indices[indptr[i]:indptr[i + 1]]
+        neighbors = neighbors[neighbors != i]
+        return remaining[i] + rebuttal[i] * remaining[neighbors].sum()
+
+    adjacency = sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(cascade.num_agents,) * 2)
+    adjacency.setdiag(0)
+    initial = weight + rebuttal * (adjacency @ weight)
+    heap = [(-value, i, 0) for i, value in enumerate(initial.tolist())]
+    heapq.heapify(heap)
+    chosen, covered = [], []
+    total = 0.0
+    while heap and len(chosen) < k:
+        value, i, round_ = heapq.heappop(heap)
+        if round_ < len(chosen):
+            heapq.heappush(heap, (-gain(i), i, len(chosen)))
+            continue
+        chosen.append(i)
+        total += -value
+        covered.append(total)
+        neighbors = indices[indptr[i]:indptr[i + 1]]
+        neighbors = neighbors[neighbors != i]
+        remaining[neighbors] *= 1 - rebuttal[i]
+        remaining[i] = 0
+    return [topology.node_ids[i] for i in chosen], np.array(covered)
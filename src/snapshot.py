@@ -0,0 +1,117 @@
+from dataclasses import dataclass, replace
+from typing import Any, List, Optional
+
+import numpy as np
+
+from src.collector import ArrayCollector
+from src.data_schema import Candidate
+from src.agent_store import ALIASED, NO_NEXT
+from src.deals import DealLedger, DealMarket
+from src.propagation import STATE_CODES
+
+def _frozen(array):
+    array = np.array(array)
+    array.setflags(write=False)
+    return array
+
+@dataclass
+class ModelSnapshot:
+    """Compact copy of an ElectionModel's state between two ticks.
+
+    Per-agent state is held as read-only arrays in topology order, so a snapshot
+    is cheap to keep and safe to share: forked processes see it copy-on-write and
+    ``fork`` copies the arrays into each new model. The topology itself is shared,
+    not copied. Restoring also restores the model's random streams, so a fork
+    continues with exactly the draws the original model would have made.
+    """
+    model_class: type
+    topology: Any
+    options: dict
+    steps: int
+    candidates: List[Candidate]
+    released: bool
+    opinions: np.ndarray
+    turnout: np.ndarray
+    next_turnout: np.ndarray
+    advanced: np.ndarray
+    power_broker_score: np.ndarray
+    states: np.ndarray
+    infected_by: np.ndarray
+    deal: np.ndarray
+    ledger: dict
+    media_spent: np.ndarray
+    market_options: dict
+    engine_ticks: Optional[int]
+    collector_state: dict
+    streams_state: dict
+    model_random_state: tuple
+    model_rng_state: dict
+
+    @classmethod
+    def capture(cls, model):
+        """Snapshots ``model``; call between ticks."""
+        store = model.store
+        return cls(
+            model_class=type(model),
+            topology=model.topology,
+            options=dict(model.options),
+            steps=model.steps,
+            candidates=[replace(cand, manifesto=list(cand.manifesto), alliance_compatibility=dict(cand.alliance_compatibility))
+                        for cand in model.candidates],
+            released=bool(store.released.any()),
+            opinions=_frozen(store.opinions),
+            turnout=_frozen(store.turnout),
+            next_turnout=_frozen(store.next_turnout),
+            advanced=_frozen(store.next_state == ALIASED),
+            power_broker_score=_frozen(store.power_broker_score),
+            states=_frozen(store.state),
+            infected_by=_frozen(store.infected_by),
+            deal=_frozen(store.deal),
+            ledger={name: _frozen(column) for name, column in model.market.ledger.state().items()},
+            media_spent=_frozen(model.market.media_spent),
+            market_options=model.market.options(),
+            engine_ticks=model.engine.ticks if model.engine is not None else None,
+            collector_state=model.datacollector.state(),
+            streams_state=model.streams.state(),
+            model_random_state=model.random.getstate(),
+            model_rng_state=model.rng.bit_generator.state,
+        )
+
+    def fork(self, **overrides):
+        """Builds a new model on the shared topology in exactly the snapshotted state.
+
+        ``overrides`` replace constructor options of the snapshotted model, e.g.
+        ``rebuttal_enabled=True``, so counterfactual branches share one prefix.
+        """
+        model = self.model_class(self.topology, **{**self.options, **overrides})
+        model.steps = self.steps
+        model.candidates = [replace(cand, manifesto=list(cand.manifesto), alliance_compatibility=dict(cand.alliance_compatibility))
+                            for cand in self.candidates]
+        model.candidates_by_post = {post: [c for c in model.candidates if c.post == post] for post in model.posts}
+
+        store = model.store
+        store.released[:] = self.released
+        store.opinions[:] = self.opinions
+        store.next_state[:] = np.where(self.advanced, ALIASED, NO_NEXT)
+        store.turnout[:] = self.turnout
+        store.next_turnout[:] = self.next_turnout
+        store.power_broker_score[:] = self.power_broker_score
+        store.state[:] = self.states
+        store.infected_by[:] = self.infected_by
+        store.deal[:] = self.deal
+        # Rebuilt on the snapshotted candidates and broker scores
+        model.market = DealMarket(model, **self.market_options)
+        model.market.ledger = DealLedger.from_state(self.ledger)
+        model.market.media_spent[:] = self.media_spent
+
+        if model.engine is not None:
+            if self.released:
+                model.engine.load_agents()
+            model.engine.ticks = self.steps if self.engine_ticks is None else self.engine_ticks
+        if model.propagation is not None:
+            model.propagation.active = np.flatnonzero(self.states != STATE_CODES["susceptible"])
+        model.datacollector = ArrayCollector.from_state(model, self.collector_state)
+        model.random.setstate(self.model_random_state)
+        model.rng.bit_generator.state = self.model_rng_state
+        model.streams.set_state(self.streams_state)
+        return model
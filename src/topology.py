@@ -0,0 +1,191 @@
+import itertools
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.engine import DEFAULT_EDGE_WEIGHT, JUNIOR_SENIOR_MULTIPLIER, ROLE_MULTIPLIER
+from src.loader import DATA_DIR, CampusData
+from src.multiplex import DEFAULT_LAYER, MultiplexGraph, graph_edges
+from src.process_hostel_data import INTERESTS
+
+JUNIOR_SENIOR_FILE = os.path.join(DATA_DIR, "junior_senior.csv")
+SSMS_ELECTION_RESULTS_FILE = os.path.join(DATA_DIR, "ssms_election_results.csv")
+MESS_REPS_FILE = os.path.join(DATA_DIR, "mess_reps.csv")
+AMC_MEMBERS_FILE = os.path.join(DATA_DIR, "amc_members.csv")
+JUNIOR_SENIOR_LAYER = 'junior-senior'
+JUNIOR_SENIOR_WEIGHT = 0.5
+
+def load_rosters():
+    """Loads the junior-senior, SSMS, mess rep and AMC rosters, or empty frames if missing."""
+    try:
+        junior_senior_df = pd.read_csv(JUNIOR_SENIOR_FILE)
+        ssms_election_results_df = pd.read_csv(SSMS_ELECTION_RESULTS_FILE)
+        mess_reps_df = pd.read_csv(MESS_REPS_FILE)
+        amc_members_df = pd.read_csv(AMC_MEMBERS_FILE)
+    except FileNotFoundError:
+        junior_senior_df = pd.DataFrame(columns=['junior_id', 'senior_id'])
+        ssms_election_results_df = pd.DataFrame(columns=['student_id', 'post'])
+        mess_reps_df = pd.DataFrame(columns=['student_id'])
+        amc_members_df = pd.DataFrame(columns=['student_id', 'post'])
+    return junior_senior_df, ssms_election_results_df, mess_reps_df, amc_members_df
+
+def roster_mask(node_ids, roster_ids):
+    """Boolean mask over ``node_ids`` of the ids present in a roster column."""
+    roster = set(roster_ids)
+    return np.fromiter((node_id in roster for node_id in node_ids), dtype=bool, count=len(node_ids))
+
+def parse_list(value):
+    """Parses a stringified list such as "['Sports', 'Academics']"."""
+    if isinstance(value, str):
+        return re.findall(r"'([^']*)'", value)
+    return value if isinstance(value, list) else []
+
+def junior_senior_nodes(node_ids, junior_senior_df):
+    """Junior-senior endpoints missing from ``node_ids``, in the order adding the ties to a graph adds them."""
+    known = set(node_ids)
+    missing = []
+    for node_id in itertools.chain.from_iterable(zip(junior_senior_df['junior_id'], junior_senior_df['senior_id'])):
+        if node_id not in known:
+            known.add(node_id)
+            missing.append(node_id)
+    return missing
+
+class CampusTopology:
+    """Immutable campus network shared by every ElectionModel built on it.
+
+    Built from a CampusData or a networkx graph; ``edges`` (e.g. CampusData.edges)
+    overrides a graph's own edges. The edges live in ``multiplex``, one layer per
+    edge layer plus the junior-senior ties.
+    """
+    def __init__(self, graph, rosters=None, edges=None):
+        junior_senior_df, ssms_election_results_df, mess_reps_df, amc_members_df = rosters or load_rosters()
+        self.junior_senior_df = junior_senior_df
+        self.ssms_election_results_df = ssms_election_results_df
+        self.mess_reps_df = mess_reps_df
+        self.amc_members_df = amc_members_df
+
+        # The campus as given; never mutated, and only turned into a graph if ``graph`` is read
+        self.source = graph
+        self._graph = None
+        campus_ids = list(graph.node_ids) if isinstance(graph, CampusData) else list(graph.nodes)
+        self.node_ids = campus_ids + junior_senior_nodes(campus_ids, junior_senior_df)
+        self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+
+        if isinstance(graph, CampusData) and edges is None:
+            # Edge rows already index the campus nodes, which lead the topology's node index
+            layer_names = np.append(np.asarray(graph.layers, dtype=object), DEFAULT_LAYER)
+            rows, cols = graph.edge_source, graph.edge_target
+            layers, weights = layer_names[graph.edge_layer], np.nan_to_num(graph.edge_weight, nan=DEFAULT_EDGE_WEIGHT)
+        else:
+            rows, cols, layers, weights = self.edge_arrays(graph_edges(graph) if edges is None else edges)
+        # Junior-senior ties come after every campus edge, so 'last' lets them override
+        js_rows, js_cols, js_layers, js_weights = self.edge_arrays(pd.DataFrame({
+            'source': junior_senior_df['junior_id'], 'target': junior_senior_df['senior_id'],
+            'layer': JUNIOR_SENIOR_LAYER, 'weight': JUNIOR_SENIOR_WEIGHT}))
+        self.multiplex = MultiplexGraph.from_edges(len(self), np.concatenate([rows, js_rows]), np.concatenate([cols, js_cols]),
+                                                   np.concatenate([layers, js_layers]), np.concatenate([weights, js_weights]))
+        self.interests = [parse_list(value) for value in self.node_attribute('interests', [])]
+        self.baseline_turnout_propensity = self.node_attribute('baseline_turnout_propensity', 0.5)
+        self.slander_susceptibility = self.node_attribute('slander_susceptibility', 0.5)
+        self.skepticism = self.node_attribute('skepticism', 0.5)
+
+        # Role masks in node index order, each built with one pass over its roster
+        self.is_ssms_winner = roster_mask(self.node_ids, ssms_election_results_df['student_id'])
+        self.is_mess_rep = roster_mask(self.node_ids, mess_reps_df['student_id'])
+        self.is_amc_member = roster_mask(self.node_ids, amc_members_df['student_id'])
+
+        # Interest sets as bitsets over the INTERESTS vocabulary (plus any extra interests
+        # found in the data): bit k stands for interest_names[k]
+        extra = {interest for interests in self.interests for interest in interests} - set(INTERESTS)
+        self.interest_names = list(INTERESTS) + sorted(extra)
+        if len(self.interest_names) > 64:
+            raise ValueError(f"Interest bitsets hold at most 64 interests, got {len(self.interest_names)}")
+        self.interest_codes = {name: k for k, name in enumerate(self.interest_names)}
+        self.interest_bits = np.array([self.interest_mask(interests) for interests in self.interests], dtype=np.uint64)
+        # The same sets one-hot encoded, (agents x interests), for matrix-product alignment
+        self.interest_matrix = ((self.interest_bits[:, None] >> np.arange(len(self.interest_names), dtype=np.uint64)) & 1).astype(np.float64)
+        self._influence_cache = {}
+
+    @property
+    def graph(self):
+        """The campus nx.Graph with the junior-senior layer added, built on first use for analysis code."""
+        if self._graph is None:
+            source = self.source
+            graph = source.to_graph() if isinstance(source, CampusData) else source.copy()
+            graph.add_edges_from(zip(self.junior_senior_df['junior_id'], self.junior_senior_df['senior_id']),
+                                 layer=JUNIOR_SENIOR_LAYER, weight=JUNIOR_SENIOR_WEIGHT)
+            self._graph = graph
+        return self._graph
+
+    def node_attribute(self, name, default=None):
+        """Values of node attribute ``name`` in node index order, ``default`` where a node lacks it."""
+        source = self.source
+        if isinstance(source, CampusData):
+            students = source.students
+            values = students[name].tolist() if name in students else [default] * len(students)
+        else:
+            values = [attrs.get(name, default) for _, attrs in source.nodes(data=True)]
+        return values + [default] * (len(self) - len(values))
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def edge_arrays(self, edges):
+        """Node index rows and columns, layers and weights of an edge table (source, target, layer, weight)."""
+        nodes = pd.Index(self.node_ids)
+        rows, cols = nodes.get_indexer(edges['source']), nodes.get_indexer(edges['target'])
+        missing = (rows < 0) | (cols < 0)
+        if missing.any():
+            raise ValueError(f"{int(missing.sum())} edges have an endpoint outside the graph")
+        layers = edges['layer'].astype(object).where(edges['layer'].notna(), DEFAULT_LAYER)
+        return rows, cols, layers.to_numpy(), edges['weight'].fillna(DEFAULT_EDGE_WEIGHT).to_numpy(dtype=np.float64)
+
+    def interest_mask(self, interests):
+        """Bitset of the given interests; names outside the vocabulary are ignored."""
+        mask = 0
+        for interest in interests:
+            if interest in self.interest_codes:
+                mask |= 1 << self.interest_codes[interest]
+        return mask
+
+    def manifesto_matrix(self, manifestos):
+        """One-hot (manifestos x interests) encoding of a list of manifestos."""
+        matrix = np.zeros((len(manifestos), len(self.interest_names)))
+        for k, manifesto in enumerate(manifestos):
+            for interest in set(manifesto):
+                if interest in self.interest_codes:
+                    matrix[k, self.interest_codes[interest]] = 1.0
+        return matrix
+
+    def manifesto_alignment(self, manifestos):
+        """(agents x manifestos) count of shared interests, from one matrix product."""
+        return self.interest_matrix @ self.manifesto_matrix(manifestos).T
+
+    def neighbors(self, layers=None, combiner='last'):
+        """CSR ``(indptr, indices)`` of the combined layers in node index order; see MultiplexGraph.combine."""
+        structure = self.multiplex.combine(layers, combiner)
+        return structure.indptr, structure.indices
+
+    def layer_weights(self, layers=None, junior_senior_multiplier=JUNIOR_SENIOR_MULTIPLIER):
+        """Per-layer weights of a configuration, with the junior-senior layer scaled by its multiplier."""
+        weights = dict(layers or {})
+        if JUNIOR_SENIOR_LAYER in self.multiplex.layers:
+            weights[JUNIOR_SENIOR_LAYER] = weights.get(JUNIOR_SENIOR_LAYER, 1.0) * junior_senior_multiplier
+        return weights
+
+    def influence_matrix(self, influential, junior_senior_multiplier=JUNIOR_SENIOR_MULTIPLIER, role_multiplier=ROLE_MULTIPLIER,
+                         layers=None, combiner='last'):
+        """Sparse influence matrix of a layer configuration, mask and multipliers, built once per combination.
+
+        Entry (i, j) is the combined weight of the (i, j) tie, times ``role_multiplier``
+        when j is a mess rep or AMC member (``influential``).
+        """
+        configuration = self.multiplex.configuration(self.layer_weights(layers, junior_senior_multiplier))
+        key = (np.packbits(influential).tobytes(), configuration, combiner, role_multiplier)
+        if key not in self._influence_cache:
+            matrix = self.multiplex.combine(dict(configuration), combiner).copy()
+            matrix.data[influential[matrix.indices]] *= role_multiplier
+            self._influence_cache[key] = matrix
+        return self._influence_cache[key]
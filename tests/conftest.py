@@ -0,0 +1,120 @@
+import ast
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.loader import build_campus
+from src.model import ElectionModel
+from src.topology import CampusTopology
+
+STUDENTS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "students.csv")
+# Small enough for the agent engine, large enough for the slander to cascade
+NUM_STUDENTS = 300
+SEED = 1
+# Chance that a pair sharing a hostel, a batch and department, or a club is tied
+LAYER_PROBABILITIES = {'residence': 0.1, 'academic': 0.3, 'club': 0.03}
+LAYER_WEIGHTS = {'friendship': (0.2, 1.0), 'residence': (0.4, 0.8), 'academic': (0.2, 0.6), 'club': (0.5, 0.9)}
+
+def group_pairs(groups, p, rng):
+    """Each pair of row positions within a group, kept with probability ``p``."""
+    pairs = []
+    for members in groups:
+        i, j = np.triu_indices(len(members), k=1)
+        keep = rng.random(len(i)) < p
+        pairs += zip(members[i[keep]], members[j[keep]])
+    return pairs
+
+def sample_campus(num_students=NUM_STUDENTS, seed=SEED):
+    """A sample of data/students.csv and an edge table of the four layers drawn among it."""
+    rng = np.random.default_rng(seed)
+    students = pd.read_csv(STUDENTS_FILE).sample(num_students, random_state=seed).reset_index(drop=True)
+    ids = students['id'].to_numpy()
+    pairs = {'friendship': [(i, j) for i in range(num_students)
+                            for j in rng.choice(num_students, rng.integers(1, 7), replace=False) if i != j]}
+    pairs['residence'] = group_pairs(students.groupby('hostel').indices.values(), LAYER_PROBABILITIES['residence'], rng)
+    pairs['academic'] = group_pairs(students.groupby(['batch', 'dept']).indices.values(), LAYER_PROBABILITIES['academic'], rng)
+    clubs = students['clubs'].map(ast.literal_eval).explode().dropna()
+    pairs['club'] = group_pairs([clubs.index[clubs == club].to_numpy() for club in sorted(clubs.unique())],
+                                LAYER_PROBABILITIES['club'], rng)
+    edges = pd.concat([pd.DataFrame({'source': ids[[i for i, _ in layer_pairs]], 'target': ids[[j for _, j in layer_pairs]],
+                                     'layer': layer, 'weight': rng.uniform(*LAYER_WEIGHTS[layer], size=len(layer_pairs))})
+                       for layer, layer_pairs in pairs.items()], ignore_index=True)
+    return students, edges
+
+def build_graph(students, edges):
+    """The campus graph, built row by row as run_simulation does."""
+    G = nx.Graph()
+    for _, row in students.iterrows():
+        G.add_node(row['id'], **row.to_dict())
+    for _, row in edges.iterrows():
+        G.add_edge(row['source'], row['target'], layer=row['layer'], weight=row['weight'])
+    return G
+
+def sample_rosters(students, edges, seed=SEED):
+    """Junior-senior pairs and officer rosters drawn from the sampled students.
+
+    A few junior-senior pairs are already tied on campus, which the junior-senior
+    layer overrides, and one names students outside the sample.
+    """
+    rng = np.random.default_rng(seed)
+    ids = students['id'].to_numpy()
+    is_junior = students['batch'].to_numpy() == students['batch'].max()
+    pairs = list(zip(rng.choice(ids[is_junior], 15, replace=False), rng.choice(ids[~is_junior], 15)))
+    juniors = set(ids[is_junior])
+    tied = edges[edges['source'].isin(juniors) != edges['target'].isin(juniors)].head(5)
+    pairs += [(u, v) if u in juniors else (v, u) for u, v in zip(tied['source'], tied['target'])]
+    pairs.append(('s_00000001', 's_00000002'))
+    officers = rng.permutation(ids)
+    return (pd.DataFrame(pairs, columns=['junior_id', 'senior_id']),
+            pd.DataFrame({'student_id': officers[[0, 6]], 'post': 'Mess Secretary'}),
+            pd.DataFrame({'student_id': officers[:4]}),
+            pd.DataFrame({'student_id': officers[4:6], 'post': 'Member'}))
+
+@pytest.fixture(scope="session")
+def campus_tables():
+    students, edges = sample_campus()
+    return students, edges, sample_rosters(students, edges)
+
+@pytest.fixture(scope="session")
+def campus(campus_tables):
+    return build_campus(*campus_tables[:2])
+
+@pytest.fixture(scope="session")
+def graph(campus_tables):
+    return build_graph(*campus_tables[:2])
+
+@pytest.fixture(scope="session")
+def topology(campus, campus_tables):
+    return CampusTopology(campus, rosters=campus_tables[2])
+
+def slander_targets(topology, count=20):
+    """The first ``count`` node ids, the slander targets the scenario tests drop on."""
+    return list(topology.node_ids[:count])
+
+def run_reference(topology, num_steps, slander_step, model_class=ElectionModel, seed=SEED, defenders=(), **model_kwargs):
+    """Steps a model tick by tick, dropping the slander before ``slander_step``: the path the fast paths are held to."""
+    model = model_class(topology, seed=seed, **model_kwargs)
+    model.release_manifestos()
+    for tick in range(num_steps):
+        if tick == slander_step:
+            model.inoculate(defenders)
+            model.slander_drop("m1", slander_targets(topology))
+        model.step()
+    return model
+
+def agent_state(model):
+    """Per-agent opinions, turnout, misinformation and deals in topology order."""
+    agents = [model.agent_by_node[node_id] for node_id in model.topology.node_ids]
+    return [(agent.opinion, agent.turnout_propensity, agent.misinformation_state, agent.infected_by,
+             [deal.id for deal in agent.deals]) for agent in agents]
+
+def assert_same_run(model, reference):
+    """Asserts two models ended in the same state and collected the same rows."""
+    assert agent_state(model) == agent_state(reference)
+    if reference.engine is not None:
+        assert np.array_equal(model.engine.opinions, reference.engine.opinions)
+        assert np.array_equal(model.engine.turnout, reference.engine.turnout)
+    assert model.datacollector.get_model_vars_dataframe().equals(reference.datacollector.get_model_vars_dataframe())
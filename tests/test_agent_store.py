@@ -0,0 +1,29 @@
+from tests.conftest import run_reference
+
+def test_agents_are_views_of_store_rows(topology):
+    model = run_reference(topology, 3, 1, seed=5)
+    store = model.store
+    for agent in list(model.agents)[:25]:
+        row = agent.row
+        assert agent.node_id == topology.node_ids[row]
+        assert agent.turnout_propensity == store.turnout[row]
+        for post, columns in store.posts.items():
+            for cand_id, k in columns.items():
+                assert agent.opinion[post][cand_id] == store.opinions[row, k]
+
+def test_writes_through_an_agent_land_in_the_store(topology):
+    model = run_reference(topology, 2, 1, seed=5)
+    agent = list(model.agents)[3]
+    post, columns = next(iter(model.store.posts.items()))
+    cand_id, k = next(iter(columns.items()))
+    agent.opinion[post][cand_id] = 0.25
+    agent.turnout_propensity = 0.75
+    assert model.store.opinions[agent.row, k] == 0.25
+    assert model.store.turnout[agent.row] == 0.75
+
+def test_memory_footprint_counts_the_store(topology):
+    model = run_reference(topology, 2, 1, seed=5)
+    footprint = model.memory_footprint()
+    store = footprint[footprint['component'] == 'store'].set_index('field')['bytes']
+    assert store['opinions'] == model.store.opinions.nbytes
+    assert (footprint['bytes_per_agent'] * len(topology) == footprint['bytes']).all()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.advanced_models import BoundedConfidenceElectionModel
+from src.batch import BatchSimulation
+from src.model import ElectionModel
+from src.propagation import STATE_CODES
+
+SEEDS = [11, 12, 13]
+NUM_STEPS = 6
+SLANDER_STEP = 1
+NUM_TARGETS = 20
+
+def run_model(topology, seed, model_class=ElectionModel, rebuttal_enabled=False, slander=True, **kwargs):
+    model = model_class(topology, engine="vectorized", rebuttal_enabled=rebuttal_enabled, seed=seed, **kwargs)
+    model.release_manifestos()
+    for i in range(NUM_STEPS):
+        if slander and i == SLANDER_STEP:
+            model.slander_drop("m1", list(topology.node_ids[:NUM_TARGETS]))
+        model.step()
+    return model
+
+def states(model):
+    return np.array([STATE_CODES[agent.misinformation_state] for agent in model.agents], dtype=np.int8)
+
+def with_influence_factor(model_class, factor):
+    """``model_class`` with its engine's influence factor replaced."""
+    class Engine(model_class.engine_class):
+        def next_opinions(self, opinions, slander, influence_factor=factor):
+            return super().next_opinions(opinions, slander, influence_factor)
+    return type(model_class.__name__, (model_class,), {'engine_class': Engine})
+
+@pytest.mark.parametrize("model_class", [ElectionModel, BoundedConfidenceElectionModel])
+def test_replicas_follow_default_model(topology, model_class):
+    # Staged batches run the dynamics of the model's default agent propagation
+    rebuttal = [False, True, True]
+    batch = BatchSimulation(topology, SEEDS, rebuttal_enabled=rebuttal, slander_targets=NUM_TARGETS,
+                            slander_step=SLANDER_STEP, model_class=model_class)
+    result = batch.run(NUM_STEPS)
+    for r, seed in enumerate(SEEDS):
+        model = run_model(topology, seed, model_class, rebuttal_enabled=rebuttal[r])
+        infected = model.datacollector.get_model_vars_dataframe()['Infected'].to_numpy()
+        assert np.array_equal(result.infected[r], infected)
+        assert np.array_equal(result.states[r], states(model))
+        assert np.array_equal(result.opinions[r], model.engine.opinions)
+        assert np.array_equal(result.turnout[r], model.engine.turnout)
+
+def test_synchronous_replicas_follow_synchronous_model(topology):
+    batch = BatchSimulation(topology, SEEDS, slander_targets=NUM_TARGETS, slander_step=SLANDER_STEP, synchronous=True)
+    result = batch.run(NUM_STEPS)
+    for r, seed in enumerate(SEEDS):
+        model = run_model(topology, seed, propagation="synchronous")
+        assert np.array_equal(result.states[r], states(model))
+        assert np.array_equal(result.opinions[r], model.engine.opinions)
+
+@pytest.mark.parametrize("model_class", [ElectionModel, BoundedConfidenceElectionModel])
+def test_each_replica_uses_its_influence_factor(topology, model_class):
+    factors = [0.05, 0.3]
+    batch = BatchSimulation(topology, [SEEDS[0]] * 2, influence_factor=factors, model_class=model_class)
+    result = batch.run(NUM_STEPS)
+    assert result.parameters['influence_factor'].tolist() == factors
+    for r, factor in enumerate(factors):
+        model = run_model(topology, SEEDS[0], with_influence_factor(model_class, factor), slander=False)
+        assert np.array_equal(result.opinions[r], model.engine.opinions)
+
+def test_grid_reports_its_table(topology):
+    batch = BatchSimulation.grid(topology, 2, seed=3, rebuttal_enabled=[False, True], influence_factor=[0.05, 0.2])
+    result = batch.run(2)
+    assert result.parameters is batch.grid_table
+    assert result.parameters[['rebuttal_enabled', 'influence_factor', 'run']].values.tolist() == [
+        [False, 0.05, 0], [False, 0.05, 1], [False, 0.2, 0], [False, 0.2, 1],
+        [True, 0.05, 0], [True, 0.05, 1], [True, 0.2, 0], [True, 0.2, 1]]
+    assert np.array_equal(batch.influence_factor, result.parameters['influence_factor'])
+    assert BatchSimulation(topology, SEEDS).grid_table is None
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from src.calibration import Calibration
+from src.collector import opinion_array, turnout_array
+from src.parameters import ModelParameters
+from tests.conftest import run_reference
+
+SEEDS = [41, 42]
+NUM_STEPS = 6
+SLANDER_STEP = 2
+NUM_TARGETS = 20
+POINTS = [ModelParameters(), ModelParameters(influence_factor=0.3, transmission_probability=0.5)]
+
+def calibration(topology, **kwargs):
+    return Calibration(topology, {'turnout': 0.5}, num_steps=NUM_STEPS, slander_step=SLANDER_STEP,
+                       slander_targets=NUM_TARGETS, rebuttal_enabled=True, **kwargs)
+
+def test_statistics_match_single_runs(topology):
+    frames = calibration(topology, processes=1, cache_dir=None).evaluate(POINTS, SEEDS)
+    for parameters, frame in zip(POINTS, frames):
+        for seed in SEEDS:
+            model = run_reference(topology, NUM_STEPS, SLANDER_STEP, engine="vectorized", rebuttal_enabled=True,
+                                  seed=seed, parameters=parameters)
+            infected = model.datacollector.get_model_vars_dataframe()['Infected'].to_numpy() / len(topology)
+            turnout, opinions = turnout_array(model), opinion_array(model).mean(axis=0)
+            row = frame.loc[seed]
+            expected = [turnout.mean(), turnout.std(), infected.max(), infected[-1], *opinions]
+            columns = ['turnout', 'turnout.sd', 'infected.peak', 'infected.final'] + [f"opinion.{cand.id}" for cand in model.candidates]
+            # Means over the replica axis sum in another order: equal up to rounding
+            assert np.allclose(row[columns].to_numpy(), expected, rtol=0, atol=1e-12)
+
+def test_pool_and_cache_give_the_same_statistics(topology, tmp_path):
+    expected = calibration(topology, processes=1, cache_dir=None).evaluate(POINTS, SEEDS)
+    pooled = calibration(topology, processes=2, cache_dir=str(tmp_path)).evaluate(POINTS, SEEDS)
+    cached = calibration(topology, processes=2, cache_dir=str(tmp_path)).evaluate(POINTS, SEEDS[::-1])
+    for frame, pooled_frame, cached_frame in zip(expected, pooled, cached):
+        pd.testing.assert_frame_equal(pooled_frame, frame)
+        pd.testing.assert_frame_equal(cached_frame, frame.loc[SEEDS[::-1]])
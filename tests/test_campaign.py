@@ -0,0 +1,21 @@
+import pytest
+
+from src.advanced_models import BoundedConfidenceElectionModel
+from src.campaign import run_campaign, scenario_plan
+from src.model import ElectionModel
+from tests.conftest import assert_same_run, run_reference, slander_targets
+
+NUM_STEPS = 12
+SLANDER_STEP = 3
+
+@pytest.mark.parametrize("model_class", [ElectionModel, BoundedConfidenceElectionModel])
+@pytest.mark.parametrize("engine", ["agent", "vectorized"])
+@pytest.mark.parametrize("propagation", ["agent", "staged", "synchronous"])
+def test_scheduler_replays_full_population_ticks(topology, model_class, engine, propagation):
+    # The scheduler only revisits agents whose inputs changed, yet must end where stepping everyone does
+    defenders = list(topology.node_ids[30:40])
+    kwargs = dict(model_class=model_class, engine=engine, propagation=propagation, rebuttal_enabled=True, seed=3)
+    reference = run_reference(topology, NUM_STEPS, SLANDER_STEP, defenders=defenders, **kwargs)
+    plan = scenario_plan(NUM_STEPS, SLANDER_STEP, slander_targets(topology), defenders)
+    _, model = run_campaign(topology, plan, **kwargs)
+    assert_same_run(model, reference)
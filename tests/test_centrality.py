@@ -0,0 +1,40 @@
+import networkx as nx
+import numpy as np
+
+from src.centrality import CentralityIndex
+
+def exact_index(campus, layers=None):
+    # An epsilon this small samples every node, so betweenness is exact
+    return CentralityIndex.from_campus(campus, layers=layers, epsilon=0.01, cache_dir=None)
+
+def test_metrics_match_networkx(campus):
+    index = exact_index(campus)
+    graph = campus.to_graph()
+    expected = [nx.degree_centrality(graph), nx.betweenness_centrality(graph), nx.eigenvector_centrality(graph, tol=1e-10)]
+    frame = index.frame()
+    for metric, values in zip(('degree', 'betweenness', 'eigenvector'), expected):
+        assert np.allclose(frame[metric].to_numpy(), [values[node_id] for node_id in index.node_ids], atol=1e-5), metric
+
+def test_adding_a_layer_matches_rebuilding(campus):
+    layer = campus.layers[-1]
+    others = [name for name in campus.layers if name != layer]
+    index = exact_index(campus, layers=others)
+    edges = campus.edges
+    index.add_layer(edges.loc[edges['layer'] == layer, ['source', 'target']].itertuples(index=False))
+    rebuilt = exact_index(campus)
+    assert (index.adjacency != rebuilt.adjacency).nnz == 0
+    assert np.allclose(index.dependency, rebuilt.dependency)
+    assert np.allclose(index.eigenvector, rebuilt.eigenvector, atol=1e-5)
+
+def test_topology_index_includes_junior_senior_ties(topology):
+    index = CentralityIndex.from_topology(topology, epsilon=0.01, cache_dir=None)
+    # Degrees from the topology's own adjacency, so the shared fixture's graph stays unbuilt
+    indptr, _ = topology.neighbors()
+    degree = np.diff(indptr) / (len(topology) - 1)
+    assert np.allclose(index.frame()['degree'].to_numpy(), degree)
+
+def test_cached_index_is_reused(campus, tmp_path):
+    first = CentralityIndex.from_campus(campus, epsilon=0.2, cache_dir=str(tmp_path))
+    assert any(tmp_path.iterdir())
+    second = CentralityIndex.from_campus(campus, epsilon=0.2, cache_dir=str(tmp_path))
+    assert second.frame().equals(first.frame())
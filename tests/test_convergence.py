@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from src.convergence import TOLERANCE, run_adaptive
+from src.model import ElectionModel
+from src.monte_carlo import slander_events
+from tests.conftest import assert_same_run, run_reference, slander_targets
+
+NUM_STEPS = 30
+SLANDER_STEP = 4
+
+@pytest.mark.parametrize("engine", ["agent", "vectorized"])
+def test_adaptive_stepping_matches_stepping_every_tick(topology, engine):
+    # Long enough for the slander to burn out, so the vectorized run fast-forwards the tail
+    reference = run_reference(topology, NUM_STEPS, SLANDER_STEP, engine=engine, rebuttal_enabled=True, seed=4)
+    model = ElectionModel(topology, engine=engine, rebuttal_enabled=True, seed=4)
+    model.release_manifestos()
+    residuals = run_adaptive(model, NUM_STEPS, slander_events(SLANDER_STEP, slander_targets(topology)))
+    assert model.steps == NUM_STEPS
+    assert_same_run(model, reference)
+    if engine == "vectorized":
+        assert len(residuals) < NUM_STEPS
+
+@pytest.mark.parametrize("tolerance", [TOLERANCE, 0.2])
+def test_closed_form_jumps_stay_within_tolerance_of_stepping(topology, tolerance):
+    reference = run_reference(topology, NUM_STEPS, SLANDER_STEP, engine="vectorized", rebuttal_enabled=True, seed=4)
+    model = ElectionModel(topology, engine="vectorized", rebuttal_enabled=True, seed=4)
+    model.release_manifestos()
+    residuals = run_adaptive(model, NUM_STEPS, slander_events(SLANDER_STEP, slander_targets(topology)),
+                             tolerance=tolerance, collect=False)
+    assert model.steps == NUM_STEPS
+    # The opinions are still ~0.1 from their limit at the jump: only the loose tolerance takes it
+    assert ('limit' in residuals['mode'].values) == (tolerance > 0.1)
+    assert np.allclose(model.store.opinions, reference.store.opinions, rtol=0, atol=tolerance + 1e-12)
+    assert np.array_equal(model.store.state, reference.store.state)
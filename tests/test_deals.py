@@ -0,0 +1,80 @@
+import numpy as np
+
+from src.deals import BROKER_THRESHOLD, DEAL_BOOST, DealMarket
+from src.model import ElectionModel
+from src.rng import RandomStreams
+from tests.conftest import run_reference
+
+NUM_STEPS = 6
+SEED = 8
+
+def loop_offers(model, num_steps, seed):
+    """The offers of the per-agent deal loop the market replaced, as (deal id, tick, broker, candidate, payoff)."""
+    rng = RandomStreams(seed)['deals']
+    scores = model.store.power_broker_score
+    dealt = np.zeros(len(scores), dtype=bool)
+    offers = []
+    for tick in range(num_steps):
+        brokers = np.flatnonzero((scores > BROKER_THRESHOLD) & ~dealt)
+        choices = rng.integers(len(model.candidates), size=len(brokers)).tolist()
+        deal_ids = rng.integers(1000, 10000, size=len(brokers)).tolist()
+        payoffs = rng.uniform(0.4, 0.8, size=len(brokers)).tolist()
+        for broker, choice, deal_id, payoff in zip(brokers.tolist(), choices, deal_ids, payoffs):
+            offers.append((deal_id, tick, model.topology.node_ids[broker], model.candidates[choice].id, payoff))
+            dealt[broker] |= payoff > 0.5
+    return offers
+
+def test_market_replays_the_per_agent_loop(topology):
+    model = run_reference(topology, NUM_STEPS, 2, seed=SEED)
+    ledger = model.market.ledger_frame()
+    assert len(ledger) > 0
+    assert list(ledger[['deal_id', 'tick', 'broker', 'candidate', 'payoff']].itertuples(index=False, name=None)) == \
+        loop_offers(model, NUM_STEPS, SEED)
+
+def test_agents_read_their_deal_from_the_ledger(topology):
+    model = run_reference(topology, NUM_STEPS, 2, engine="vectorized", seed=SEED)
+    ledger = model.market.ledger_frame()
+    accepted = ledger[ledger['status'] == 'accepted']
+    assert accepted['broker'].is_unique
+    for offer in accepted.itertuples():
+        deal, = model.agent_by_node[offer.broker].deals
+        assert (deal.id, deal.proposer_id, deal.payoff['target']) == (f"d_{offer.deal_id}", offer.candidate, offer.payoff)
+    assert sum(len(agent.deals) for agent in model.agents) == len(accepted)
+
+def opt_in_model(topology, media_assets, **options):
+    model = ElectionModel(topology, engine="vectorized", seed=SEED)
+    for cand in model.candidates:
+        cand.media_assets = media_assets
+    model.candidates[0].alliance_compatibility = {model.candidates[1].id: 0.5}
+    model.market = DealMarket(model, **options)
+    model.release_manifestos()
+    return model
+
+def test_budgeted_deals_stop_at_the_media_assets(topology):
+    model = opt_in_model(topology, 2, budget=True)
+    for _ in range(NUM_STEPS):
+        model.step()
+    ledger = model.market.ledger_frame()
+    counts = ledger[ledger['status'] == 'accepted']['candidate'].value_counts()
+    assert counts.max() <= 2
+    assert model.market.media_spent.tolist() == [counts.get(cand.id, 0) for cand in model.candidates]
+
+def test_alliances_boost_the_proposers_allies(topology):
+    model = opt_in_model(topology, 100, alliances=True)
+    model.step()
+    before = model.store.opinions.copy()
+    rows = model.propose_deals()
+    proposers = model.market.ledger.candidate[model.store.deal[rows]]
+    allied = rows[proposers == 0]
+    assert len(allied)
+    expected = np.minimum(1.0, before[allied, 1] + DEAL_BOOST * 0.5)
+    assert np.array_equal(model.store.opinions[allied, 1], expected)
+
+def test_fork_keeps_the_market_options(topology):
+    model = opt_in_model(topology, 3, budget=True, alliances=True)
+    for _ in range(3):
+        model.step()
+    fork = model.snapshot().fork()
+    assert fork.market.options() == dict(budget=True, alliances=True)
+    assert np.array_equal(fork.market.boosts, model.market.boosts)
+    assert np.array_equal(fork.market.media_spent, model.market.media_spent)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from src.advanced_models import BoundedConfidenceElectionModel
+from src.model import ElectionModel
+from tests.conftest import run_reference
+
+NUM_STEPS = 8
+SLANDER_STEP = 2
+
+def opinion_matrix(model):
+    return np.array([[agent.opinion[cand.post][cand.id] for cand in model.candidates] for agent in model.agents])
+
+@pytest.mark.parametrize("model_class", [ElectionModel, BoundedConfidenceElectionModel])
+@pytest.mark.parametrize("rebuttal_enabled", [False, True])
+def test_vectorized_engine_matches_agent_engine(topology, model_class, rebuttal_enabled):
+    reference, model = (run_reference(topology, NUM_STEPS, SLANDER_STEP, model_class=model_class, engine=engine,
+                                      rebuttal_enabled=rebuttal_enabled)
+                        for engine in ("agent", "vectorized"))
+    # Same sums in a different order: equal up to rounding
+    assert np.allclose(opinion_matrix(model), opinion_matrix(reference), rtol=0, atol=1e-12)
+    assert np.allclose([a.turnout_propensity for a in model.agents], [a.turnout_propensity for a in reference.agents],
+                       rtol=0, atol=1e-12)
+    assert [a.misinformation_state for a in model.agents] == [a.misinformation_state for a in reference.agents]
+    # The deal round runs every tick on both engines
+    assert [[deal.id for deal in a.deals] for a in model.agents] == [[deal.id for deal in a.deals] for a in reference.agents]
+    infected = [m.datacollector.get_model_vars_dataframe()['Infected'].tolist() for m in (model, reference)]
+    assert infected[0] == infected[1] and max(infected[1]) > 0
@@ -0,0 +1,32 @@
+import ast
+
+import networkx as nx
+import numpy as np
+
+from src.loader import LIST_COLUMNS, load_campus
+from tests.conftest import build_graph
+
+def test_bulk_graph_matches_row_by_row_build(campus, campus_tables):
+    students, edges, _ = campus_tables
+    # The loader parses the stringified lists that the row-by-row build left as strings
+    expected = build_graph(students.assign(**{c: students[c].map(ast.literal_eval) for c in LIST_COLUMNS}), edges)
+    graph = campus.to_graph()
+    assert list(graph.nodes) == list(expected.nodes)
+    assert dict(graph.nodes(data=True)) == dict(expected.nodes(data=True))
+    assert nx.utils.edges_equal(graph.edges(data=True), expected.edges(data=True))
+
+def test_cache_round_trip(campus_tables, tmp_path):
+    students, edges, _ = campus_tables
+    students.to_csv(tmp_path / "students.csv", index=False)
+    edges.to_csv(tmp_path / "edges.csv", index=False)
+    paths = dict(students_path=str(tmp_path / "students.csv"), edges_path=str(tmp_path / "edges.csv"),
+                 cache_dir=str(tmp_path / "cache"))
+    fresh = load_campus(**paths)
+    assert any((tmp_path / "cache").iterdir())
+    cached = load_campus(**paths)
+    uncached = load_campus(**paths, use_cache=False)
+    for campus in (cached, uncached):
+        assert campus.students.equals(fresh.students)
+        for name in ('node_ids', 'edge_source', 'edge_target', 'edge_layer', 'indptr', 'indices', 'weights', 'layer_codes'):
+            assert np.array_equal(getattr(campus, name), getattr(fresh, name)), name
+        assert np.array_equal(campus.edge_weight, fresh.edge_weight, equal_nan=True)
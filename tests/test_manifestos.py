@@ -0,0 +1,31 @@
+import numpy as np
+
+from src.model import ElectionModel
+from tests.conftest import run_reference
+
+def set_scores(model):
+    """Opinions as the set intersection used to score them, one row per agent."""
+    return np.array([[0.5 + len(set(agent.interests) & set(cand.manifesto)) * 0.1 for cand in model.candidates]
+                     for agent in model.agents])
+
+def opinion_matrix(model):
+    return np.array([[agent.opinion[cand.post][cand.id] for cand in model.candidates] for agent in model.agents])
+
+def test_release_matches_per_agent_evaluation(topology):
+    model = ElectionModel(topology)
+    model.release_manifestos()
+    assert np.array_equal(opinion_matrix(model), set_scores(model))
+    model.agents.do("evaluate_manifestos")
+    assert np.array_equal(opinion_matrix(model), set_scores(model))
+
+def test_update_manifesto_rescores_one_candidate(topology):
+    for engine in ("agent", "vectorized"):
+        model = run_reference(topology, 3, 1, engine=engine)
+        before = opinion_matrix(model)
+        model.update_manifesto('cand_B', ['Sports', 'Academics'])
+        after = opinion_matrix(model)
+        column = [cand.id for cand in model.candidates].index('cand_B')
+        assert np.array_equal(np.delete(after, column, axis=1), np.delete(before, column, axis=1))
+        assert np.array_equal(after[:, column], set_scores(model)[:, column])
+        if model.engine is not None:
+            assert np.array_equal(model.engine.opinions[:, model.engine.columns['cand_B']], after[:, column])
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from src.monte_carlo import mean_opinions, run_monte_carlo
+from tests.conftest import run_reference
+
+NUM_RUNS = 3
+NUM_STEPS = 8
+SLANDER_STEP = 2
+NUM_TARGETS = 20
+
+def monte_carlo(topology, **kwargs):
+    return run_monte_carlo(topology, NUM_RUNS, NUM_STEPS, SLANDER_STEP, NUM_TARGETS, seed=21, progress=False, **kwargs)
+
+@pytest.mark.parametrize("engine", ["agent", "vectorized"])
+def test_replicas_reproduce_single_runs(topology, engine):
+    result = monte_carlo(topology, engine=engine, processes=1)
+    for name, rebuttal_enabled in (('control', False), ('intervention', True)):
+        for r, seed in enumerate(result.seeds):
+            model = run_reference(topology, NUM_STEPS, SLANDER_STEP, engine=engine,
+                                  rebuttal_enabled=rebuttal_enabled, seed=seed)
+            infected = model.datacollector.get_model_vars_dataframe()['Infected'].to_numpy()
+            assert np.array_equal(result.infected[name][r], infected), (name, r)
+            assert result.opinions[name][r] == mean_opinions(model), (name, r)
+
+def test_results_do_not_depend_on_processes_or_branching(topology):
+    expected = monte_carlo(topology, engine="vectorized", processes=1, branch=False)
+    for kwargs in (dict(processes=1), dict(processes=2), dict(processes=2, branch=False)):
+        result = monte_carlo(topology, engine="vectorized", **kwargs)
+        assert result.seeds == expected.seeds
+        for name in expected.infected:
+            assert np.array_equal(result.infected[name], expected.infected[name]), (name, kwargs)
+            assert result.opinions[name] == expected.opinions[name], (name, kwargs)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from src.engine import DEFAULT_EDGE_WEIGHT, JUNIOR_SENIOR_MULTIPLIER, ROLE_MULTIPLIER
+from src.model import ElectionModel
+from src.multiplex import MultiplexGraph
+from src.topology import JUNIOR_SENIOR_LAYER, JUNIOR_SENIOR_WEIGHT, CampusTopology
+from tests.conftest import slander_targets
+
+def single_graph_influence(campus, rosters, node_ids, influential):
+    """The influence matrix as built from one collapsed nx.Graph, before the multiplex store."""
+    graph = campus.to_graph()
+    junior_senior = rosters[0]
+    graph.add_edges_from(zip(junior_senior['junior_id'], junior_senior['senior_id']),
+                         layer=JUNIOR_SENIOR_LAYER, weight=JUNIOR_SENIOR_WEIGHT)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    rows, cols, weights = [], [], []
+    for u, v, data in graph.edges(data=True):
+        weight = data.get('weight', DEFAULT_EDGE_WEIGHT)
+        if data.get('layer') == JUNIOR_SENIOR_LAYER:
+            weight *= JUNIOR_SENIOR_MULTIPLIER
+        rows += [index[u], index[v]] if u != v else [index[u]]
+        cols += [index[v], index[u]] if u != v else [index[u]]
+        weights += [weight, weight] if u != v else [weight]
+    weights = np.array(weights)
+    weights[influential[cols]] *= ROLE_MULTIPLIER
+    n = len(node_ids)
+    return sparse.csr_matrix((weights, (rows, cols)), shape=(n, n))
+
+def pairs_in_several_layers(edges):
+    pairs = edges[['source', 'target']].apply(sorted, axis=1, result_type='expand')
+    return int((edges.assign(lo=pairs[0], hi=pairs[1]).groupby(['lo', 'hi'])['layer'].nunique() > 1).sum())
+
+@pytest.mark.parametrize("full_table", [False, True])
+def test_default_configuration_reproduces_single_graph_weights(campus, campus_tables, full_table):
+    _, edges, rosters = campus_tables
+    # The full table ties some pairs in several layers, which the collapsed graph drops
+    assert pairs_in_several_layers(edges) > 0
+    graph = campus.to_graph()
+    topology = CampusTopology(graph, rosters=rosters, edges=campus.edges if full_table else None)
+    model = ElectionModel(topology, seed=0)
+    influential = model.store.is_mess_rep | model.store.is_amc_member
+    expected = single_graph_influence(campus, rosters, topology.node_ids, influential)
+    assert (model.influence != expected).nnz == 0
+    assert np.array_equal(model.influence.data, expected.data)
+
+def test_masking_all_but_one_layer_leaves_that_layer(topology):
+    for name, matrix in topology.multiplex.layers.items():
+        weights = {other: 0 for other in topology.multiplex.layers if other != name}
+        for combiner in ('last', 'sum', 'max'):
+            combined = topology.multiplex.combine(weights, combiner)
+            assert (combined != matrix).nnz == 0, (name, combiner)
+
+def test_combiners_on_parallel_ties():
+    # Pair (0, 1) is tied in both layers, the 'b' tie listed first; pair (1, 2) only in 'a'
+    multiplex = MultiplexGraph.from_edges(3, [0, 1, 1], [1, 0, 2], ['b', 'a', 'a'], [0.3, 0.1, 0.2])
+    assert multiplex.combine()[0, 1] == 0.1
+    assert multiplex.combine(combiner='sum')[0, 1] == pytest.approx(0.4)
+    assert multiplex.combine(combiner='max')[1, 0] == 0.3
+    assert multiplex.combine({'a': 0})[0, 1] == 0.3
+    assert multiplex.combine({'a': 0})[1, 2] == 0
+    assert multiplex.combine({'b': 2.0}, 'max')[0, 1] == 0.6
+    assert multiplex.combine({'a': 0}) is multiplex.combine({'a': 0.0, 'b': 1})
+    with pytest.raises(ValueError):
+        multiplex.combine({'c': 0})
+
+def test_set_layers_switches_every_engine(topology):
+    models = []
+    for engine, propagation in (("agent", "agent"), ("vectorized", "staged")):
+        model = ElectionModel(topology, engine=engine, propagation=propagation, seed=0)
+        model.release_manifestos()
+        model.slander_drop("m1", slander_targets(topology))
+        model.step()
+        model.set_layers({'club': 0})
+        for _ in range(4):
+            model.step()
+        models.append(model)
+    reference, model = models
+    assert model.influence is reference.influence
+    assert model.engine.influence is model.influence
+    assert model.propagation.indices is model.influence.indices
+    assert np.array_equal(model.store.state, reference.store.state)
+    assert np.allclose(model.store.opinions, reference.store.opinions, rtol=0, atol=1e-12)
+    assert model.snapshot().fork().layers == {'club': 0}
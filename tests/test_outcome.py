@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from src.batch import BatchSimulation
+from src.outcome import OutcomeEstimator, RunningMoments, estimate_outcome, tally_batch, tally_model
+from tests.conftest import run_reference
+
+SEEDS = [31, 32, 33, 34]
+NUM_STEPS = 6
+SLANDER_STEP = 1
+NUM_TARGETS = 20
+
+@pytest.mark.parametrize("rule", ["argmax", "softmax"])
+def test_batch_tally_matches_tallying_each_model(topology, rule):
+    batch = BatchSimulation(topology, SEEDS, slander_targets=NUM_TARGETS, slander_step=SLANDER_STEP)
+    batch.run(NUM_STEPS)
+    votes = tally_batch(batch, rule)
+    for r, seed in enumerate(SEEDS):
+        model = run_reference(topology, NUM_STEPS, SLANDER_STEP, engine="vectorized", seed=seed)
+        assert np.array_equal(votes[r], tally_model(model, rule)[0]), r
+
+def test_estimator_counts_every_replica_once(topology):
+    batch = BatchSimulation(topology, SEEDS, slander_targets=NUM_TARGETS, slander_step=SLANDER_STEP)
+    batch.run(NUM_STEPS)
+    votes = tally_batch(batch)
+    template = batch.template
+    whole, split = (OutcomeEstimator(template.candidates, template.candidates_by_post) for _ in range(2))
+    whole.update(votes)
+    split.update(votes[:1])
+    split.update(votes[1:])
+    assert whole.count == split.count == len(SEEDS)
+    assert whole.win_probabilities().equals(split.win_probabilities())
+
+def test_running_moments_match_numpy():
+    samples = np.random.default_rng(0).normal(size=(50, 3))
+    moments = RunningMoments(3)
+    for chunk in np.array_split(samples, [7, 8, 30]):
+        moments.update(chunk)
+    assert np.allclose(moments.mean, samples.mean(axis=0)) and np.allclose(moments.variance, samples.var(axis=0, ddof=1))
+
+def test_estimate_stops_at_the_first_converged_batch(topology):
+    estimate = estimate_outcome(topology, 2, tolerance=0.5, batch_size=4, max_runs=12)
+    assert estimate.converged and estimate.runs == 4
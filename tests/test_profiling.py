@@ -0,0 +1,47 @@
+import numpy as np
+
+from src.model import ElectionModel, StudentAgent
+from src.monte_carlo import run_scenario
+from src.profiling import StepProfiler
+from tests.conftest import run_reference, slander_targets
+
+STUDENT_STEP = StudentAgent.step
+
+def test_profiled_run_matches_unprofiled(topology):
+    reference = run_reference(topology, 6, 2, engine="vectorized", seed=8)
+    model = ElectionModel(topology, engine="vectorized", seed=8)
+    attributes = dict(vars(model))
+    profiler = StepProfiler().attach(model)
+    model.release_manifestos()
+    for tick in range(6):
+        if tick == 2:
+            model.slander_drop("m1", slander_targets(topology))
+        model.step()
+    profiler.detach()
+    assert np.array_equal(model.engine.opinions, reference.engine.opinions)
+    assert model.datacollector.get_model_vars_dataframe().equals(reference.datacollector.get_model_vars_dataframe())
+    summary = profiler.summary()
+    assert summary.loc['step', 'calls'] == 6 and summary.loc['engine.step', 'calls'] == 6
+    # Detaching puts back exactly the attributes the model had
+    assert vars(model).keys() == attributes.keys()
+    assert all(vars(model)[name] is value for name, value in attributes.items() if callable(value))
+    assert not any('step' in vars(agent) for agent in model.agents)
+
+def test_agent_phases_count_only_the_profiled_model(topology):
+    model, other = (ElectionModel(topology, seed=8) for _ in range(2))
+    profiler = StepProfiler().attach(model)
+    for m in (model, other):
+        m.release_manifestos()
+    for _ in range(3):
+        model.step()
+        other.step()
+    profiler.detach()
+    summary = profiler.summary()
+    assert summary.loc['agent.step', 'calls'] == 3 * len(model.agents)
+    assert StudentAgent.step is STUDENT_STEP
+
+def test_profiled_scenario_has_a_record_per_tick(topology):
+    profiler = StepProfiler()
+    frame, _ = run_scenario(topology, 30, True, 4, slander_targets(topology), engine="vectorized", profiler=profiler, seed=4)
+    assert len(frame) == 30
+    assert profiler.to_dataframe()['step'].nunique() == profiler.ticks == 30
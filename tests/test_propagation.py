@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.advanced_models import BoundedConfidenceElectionModel
+from src.model import ElectionModel
+from src.propagation import EXPOSED, INFECTED, SLANDER_PENALTY, STATE_CODES, SUSCEPTIBLE
+from tests.conftest import slander_targets
+
+NUM_STEPS = 8
+
+def states(model):
+    return np.array([STATE_CODES[agent.misinformation_state] for agent in model.agents], dtype=np.int8)
+
+def opinion_matrix(model):
+    return np.array([[agent.opinion[cand.post][cand.id] for cand in model.candidates] for agent in model.agents])
+
+def run(topology, model_class=ElectionModel, engine="agent", propagation="agent", rebuttal_enabled=True, seed=7):
+    model = model_class(topology, engine=engine, propagation=propagation, rebuttal_enabled=rebuttal_enabled, seed=seed)
+    model.release_manifestos()
+    history = []
+    for i in range(NUM_STEPS):
+        if i == 1:
+            model.slander_drop("m1", slander_targets(topology))
+        model.step()
+        history.append(states(model))
+    return model, history
+
+@pytest.mark.parametrize("model_class", [ElectionModel, BoundedConfidenceElectionModel])
+@pytest.mark.parametrize("rebuttal_enabled", [False, True])
+def test_staged_replays_agent_propagation(topology, model_class, rebuttal_enabled):
+    reference, expected = run(topology, model_class, rebuttal_enabled=rebuttal_enabled)
+    model, history = run(topology, model_class, propagation="staged", rebuttal_enabled=rebuttal_enabled)
+    for tick, (state, reference_state) in enumerate(zip(history, expected)):
+        assert np.array_equal(state, reference_state), tick
+    assert [a.infected_by for a in model.agents] == [a.infected_by for a in reference.agents]
+    assert np.array_equal(opinion_matrix(model), opinion_matrix(reference))
+    assert [a.turnout_propensity for a in model.agents] == [a.turnout_propensity for a in reference.agents]
+
+def test_staged_matches_agent_propagation_on_vectorized_engine(topology):
+    reference, expected = run(topology, engine="vectorized")
+    model, history = run(topology, engine="vectorized", propagation="staged")
+    assert all(np.array_equal(a, b) for a, b in zip(history, expected))
+    assert np.array_equal(model.engine.opinions, reference.engine.opinions)
+    assert np.array_equal(model.engine.turnout, reference.engine.turnout)
+
+def dropped_mask(topology):
+    dropped = np.zeros(len(topology), dtype=bool)
+    dropped[:len(slander_targets(topology))] = True
+    return dropped
+
+def test_staged_cascades_within_a_tick(topology):
+    # Agents exposed by a slandered agent earlier in the row order believe it on the drop tick
+    _, history = run(topology, propagation="staged", rebuttal_enabled=False)
+    assert np.any((history[1] == INFECTED) & ~dropped_mask(topology))
+
+def test_synchronous_moves_one_step_per_tick(topology):
+    # Synchronous propagation only resolves the exposures held at the start of a tick:
+    # on the drop tick the targets believe but nobody else is reached yet
+    _, history = run(topology, propagation="synchronous", rebuttal_enabled=False)
+    assert np.all(history[1][~dropped_mask(topology)] == SUSCEPTIBLE)
+    for before, after in zip(history[1:], history[2:]):
+        assert np.all(before[after == INFECTED] != SUSCEPTIBLE)
+        assert np.all(np.isin(before[after == EXPOSED], [SUSCEPTIBLE, EXPOSED]))
+
+def test_synchronous_penalty_follows_the_infected(topology):
+    # The penalty array is reused across ticks, so rows that stop believing must be cleared
+    model = ElectionModel(topology, propagation="synchronous", rebuttal_enabled=True, seed=7)
+    model.release_manifestos()
+    model.slander_drop("m1", slander_targets(topology))
+    kernel, severity = model.propagation, model.misinformation[0].severity
+    for _ in range(NUM_STEPS):
+        model.step()
+        expected = np.where(model.store.state == INFECTED, severity * SLANDER_PENALTY, 0.0)
+        assert np.array_equal(kernel.slander_penalty(), expected)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.loader import parse_list_column
+from src.regenerate_edges import create_friendship_edges, generate_edges, sample_pairs
+
+@pytest.mark.parametrize("size", [0, 1, 2, 7, 50])
+def test_sample_pairs_decodes_the_upper_triangle(size):
+    # With p = 1 every pair is kept, in the row-major order of the upper triangle
+    i, j = sample_pairs(size, 1.0, np.random.default_rng(0))
+    expected_i, expected_j = np.triu_indices(size, k=1)
+    assert np.array_equal(i, expected_i) and np.array_equal(j, expected_j)
+
+def test_sampled_pairs_are_distinct_and_ordered():
+    i, j = sample_pairs(200, 0.3, np.random.default_rng(1))
+    assert np.all(i < j)
+    assert len(np.unique(i * 200 + j)) == len(i)
+
+def test_edges_stay_within_their_groups(campus_tables):
+    students = campus_tables[0]
+    edges = generate_edges(students, seed=3)
+    assert generate_edges(students, seed=3).equals(edges)
+    assert not (edges['source'] == edges['target']).any()
+    by_id = students.set_index('id')
+    source, target = by_id.loc[edges['source']].reset_index(), by_id.loc[edges['target']].reset_index()
+    layer = edges['layer'].to_numpy()
+    residence, academic, club = layer == 'residence', layer == 'academic', layer == 'club'
+    assert np.array_equal(source['hostel'][residence], target['hostel'][residence])
+    assert np.array_equal(source['batch'][academic], target['batch'][academic])
+    assert np.array_equal(source['dept'][academic], target['dept'][academic])
+    clubs = parse_list_column(students['clubs']) if isinstance(students['clubs'].iloc[0], str) else students['clubs']
+    clubs = dict(zip(students['id'], map(set, clubs)))
+    assert all(clubs[u] & clubs[v] for u, v in zip(edges['source'][club], edges['target'][club]))
+
+def test_sampled_pair_count_follows_p():
+    counts = [len(sample_pairs(300, 0.4, np.random.default_rng(seed))[0]) for seed in range(20)]
+    total = 300 * 299 // 2
+    assert abs(np.mean(counts) - 0.4 * total) < 4 * np.sqrt(0.4 * 0.6 * total / 20)
+
+def test_friends_are_sampled_without_replacement():
+    # A small campus makes repeated picks common; each student still gets num_friends
+    # distinct picks, less one if they picked themselves
+    students = pd.DataFrame({'id': [f"s{k}" for k in range(30)]})
+    edges = create_friendship_edges(students, 10, np.random.default_rng(5))
+    num_friends = np.minimum(np.random.default_rng(5).integers(1, 20, size=30, endpoint=True), 30)
+    degree = edges['source'].value_counts().reindex(students['id'], fill_value=0).to_numpy()
+    assert np.all((degree == num_friends) | (degree == num_friends - 1))
+    assert not edges.duplicated(['source', 'target']).any()
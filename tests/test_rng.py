@@ -0,0 +1,28 @@
+import random
+
+import numpy as np
+
+from src.rng import RandomStreams, UniformBuffer
+from tests.conftest import assert_same_run, run_reference
+
+NUM_STEPS = 6
+SLANDER_STEP = 1
+
+def test_buffered_draws_match_scalar_draws():
+    draw = UniformBuffer(np.random.default_rng(3), size=7)
+    expected = np.random.default_rng(3).random(50)
+    assert [draw() for _ in range(50)] == expected.tolist()
+
+def test_run_is_reproduced_by_its_seed_alone(topology):
+    reference = run_reference(topology, NUM_STEPS, SLANDER_STEP, rebuttal_enabled=True, seed=11)
+    random.seed(12345)
+    model = run_reference(topology, NUM_STEPS, SLANDER_STEP, rebuttal_enabled=True, seed=11)
+    assert_same_run(model, reference)
+    assert str(model.streams.state()) == str(reference.streams.state())
+    other = run_reference(topology, NUM_STEPS, SLANDER_STEP, rebuttal_enabled=True, seed=12)
+    assert [a.power_broker_score for a in other.agents] != [a.power_broker_score for a in reference.agents]
+
+def test_streams_are_independent():
+    streams, fresh = RandomStreams(5), RandomStreams(5)
+    streams['deals'].random(1000)
+    assert np.array_equal(streams['misinformation'].random(10), fresh['misinformation'].random(10))
@@ -0,0 +1,49 @@
+import itertools
+
+import numpy as np
+
+from src.model import ElectionModel
+from src.seeding import LiveEdgeCascade, greedy_cover
+from tests.conftest import slander_targets
+
+NUM_WORLDS = 50
+
+def test_greedy_totals_are_expected_infections(topology):
+    cascade = LiveEdgeCascade(topology)
+    worlds = cascade.sample_worlds(NUM_WORLDS, np.random.default_rng(0))
+    chosen, totals = greedy_cover(*worlds, 5)
+    assert len(set(chosen)) == 5
+    assert np.all(np.diff(totals) >= 0)
+    for picks in range(1, 6):
+        infected = cascade.infection_probability(chosen[:picks], worlds=worlds)
+        assert np.isclose(infected.sum(), totals[picks - 1])
+
+def test_greedy_first_pick_is_the_best_single_seed(topology):
+    cascade = LiveEdgeCascade(topology)
+    worlds = cascade.sample_worlds(NUM_WORLDS, np.random.default_rng(1))
+    chosen, totals = greedy_cover(*worlds, 1)
+    best = max(cascade.infection_probability([i], worlds=worlds).sum() for i in range(len(topology)))
+    assert np.isclose(totals[0], best)
+
+def test_greedy_pair_is_within_the_guarantee():
+    # Three agents in two worlds; brute force over every pair
+    labels = np.array([[0, 0, 1], [2, 3, -1]])
+    sizes = np.array([4, 1, 2, 3])
+    _, totals = greedy_cover(labels, sizes, 2)
+    best = max(np.append(sizes, 0)[np.unique(labels[:, list(pair)])].sum() / len(labels)
+               for pair in itertools.combinations(range(3), 2))
+    assert (1 - 1 / np.e) * best <= totals[-1] <= best
+
+def test_staged_inoculation_matches_agents(topology):
+    defenders = [node_id for node_id, _ in zip(topology.node_ids, range(30))]
+    runs = []
+    for propagation in ("agent", "staged"):
+        model = ElectionModel(topology, rebuttal_enabled=True, propagation=propagation, seed=3)
+        model.release_manifestos()
+        model.inoculate(defenders)
+        model.slander_drop("m1", slander_targets(topology))
+        for _ in range(4):
+            model.step()
+        runs.append([agent.misinformation_state for agent in model.agents])
+    assert runs[0] == runs[1]
+    assert runs[0][:30].count("fact-checker") == 30
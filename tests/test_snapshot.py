@@ -0,0 +1,31 @@
+import pytest
+
+from src.snapshot import ModelSnapshot
+from tests.conftest import assert_same_run, run_reference
+
+NUM_STEPS = 9
+SLANDER_STEP = 2
+FORK_STEP = 5
+
+@pytest.mark.parametrize("engine, propagation", [("agent", "agent"), ("vectorized", "agent"), ("vectorized", "synchronous")])
+def test_fork_continues_like_the_original(topology, engine, propagation):
+    kwargs = dict(engine=engine, propagation=propagation, rebuttal_enabled=True, seed=9)
+    reference = run_reference(topology, NUM_STEPS, SLANDER_STEP, **kwargs)
+    model = run_reference(topology, FORK_STEP, SLANDER_STEP, **kwargs)
+    fork = ModelSnapshot.capture(model).fork()
+    for _ in range(FORK_STEP, NUM_STEPS):
+        fork.step()
+        model.step()
+    assert_same_run(fork, reference)
+    # Forking leaves the snapshotted model free to run on unchanged
+    assert_same_run(model, reference)
+
+def test_fork_overrides_options_before_the_drop(topology):
+    reference = run_reference(topology, NUM_STEPS, SLANDER_STEP, rebuttal_enabled=True, seed=9)
+    prefix = run_reference(topology, SLANDER_STEP, NUM_STEPS, rebuttal_enabled=False, seed=9)
+    fork = prefix.snapshot().fork(rebuttal_enabled=True)
+    assert fork.rebuttal_enabled
+    fork.slander_drop("m1", list(topology.node_ids[:20]))
+    for _ in range(SLANDER_STEP, NUM_STEPS):
+        fork.step()
+    assert_same_run(fork, reference)
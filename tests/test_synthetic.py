@@ -0,0 +1,22 @@
+import numpy as np
+
+from benchmarks.synthetic import synthetic_campus, synthetic_rosters
+
+def test_synthetic_campus_is_seeded_and_split_by_campus():
+    students, edges = synthetic_campus(1200, seed=4, campus_size=500)
+    again, again_edges = synthetic_campus(1200, seed=4, campus_size=500)
+    assert students.equals(again) and edges.equals(again_edges)
+    assert students['id'].is_unique and set(students['campus']) == {0, 1, 2}
+    # Friendships may cross campuses; the group layers stay within one
+    grouped = edges[edges['layer'] != 'friendship']
+    campus = dict(zip(students['id'], students['campus']))
+    assert len(grouped) and np.array_equal(grouped['source'].map(campus), grouped['target'].map(campus))
+
+def test_synthetic_rosters_name_known_students():
+    students, _ = synthetic_campus(600, seed=4)
+    ids = set(students['id'])
+    junior_senior_df, ssms_df, mess_reps_df, amc_df = synthetic_rosters(students, seed=4)
+    assert len(junior_senior_df) == (students['batch'] == students['batch'].max()).sum()
+    for df, column in ((junior_senior_df, 'junior_id'), (junior_senior_df, 'senior_id'), (ssms_df, 'student_id'),
+                       (mess_reps_df, 'student_id'), (amc_df, 'student_id')):
+        assert set(df[column]) <= ids, column
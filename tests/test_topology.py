@@ -0,0 +1,50 @@
+import networkx as nx
+import numpy as np
+
+from src.model import ElectionModel
+from src.topology import JUNIOR_SENIOR_LAYER, JUNIOR_SENIOR_WEIGHT, CampusTopology
+
+ATTRIBUTES = ('interests', 'baseline_turnout_propensity', 'slander_susceptibility', 'skepticism', 'hostel', 'year')
+
+def test_models_leave_the_graph_untouched(graph, campus_tables):
+    before = nx.to_dict_of_dicts(graph)
+    topology = CampusTopology(graph, rosters=campus_tables[2])
+    for _ in range(2):
+        model = ElectionModel(topology)
+        model.release_manifestos()
+        model.step()
+    assert topology.source is graph and topology._graph is None
+    assert nx.to_dict_of_dicts(graph) == before
+    assert all('agent' not in attrs for _, attrs in graph.nodes(data=True))
+
+def test_campus_data_matches_graph_with_edge_table(campus, campus_tables, topology):
+    from_graph = CampusTopology(campus.to_graph(), rosters=campus_tables[2], edges=campus.edges)
+    assert topology.node_ids == from_graph.node_ids
+    for attribute in ATTRIBUTES:
+        assert topology.node_attribute(attribute) == from_graph.node_attribute(attribute), attribute
+    assert topology.multiplex.layers.keys() == from_graph.multiplex.layers.keys()
+    for name, matrix in topology.multiplex.layers.items():
+        assert (matrix != from_graph.multiplex.layers[name]).nnz == 0, name
+    influential = topology.is_mess_rep | topology.is_amc_member
+    assert (topology.influence_matrix(influential) != from_graph.influence_matrix(influential)).nnz == 0
+    assert np.array_equal(topology.interest_bits, from_graph.interest_bits)
+
+def test_graph_is_built_once_when_read(campus, campus_tables):
+    topology = CampusTopology(campus, rosters=campus_tables[2])
+    assert topology._graph is None
+    built = topology.graph
+    assert topology.graph is built
+    expected = campus.to_graph()
+    junior_senior_df = campus_tables[2][0]
+    expected.add_edges_from(zip(junior_senior_df['junior_id'], junior_senior_df['senior_id']),
+                            layer=JUNIOR_SENIOR_LAYER, weight=JUNIOR_SENIOR_WEIGHT)
+    assert set(built.nodes) == set(topology.node_ids)
+    assert nx.utils.edges_equal(built.edges(data=True), expected.edges(data=True))
+
+def test_role_masks_and_interest_bits_follow_the_rosters(topology, campus_tables):
+    _, ssms_df, mess_reps_df, amc_df = campus_tables[2]
+    for mask, roster in ((topology.is_ssms_winner, ssms_df), (topology.is_mess_rep, mess_reps_df),
+                         (topology.is_amc_member, amc_df)):
+        assert [bool(flag) for flag in mask] == [node_id in set(roster['student_id']) for node_id in topology.node_ids]
+    for interests, bits in zip(topology.interests, topology.interest_bits.tolist()):
+        assert {name for k, name in enumerate(topology.interest_names) if bits >> k & 1} == set(interests)